@@ -0,0 +1,142 @@
+# async_crud.py
+import asyncio
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import bulk, crud, models, schemas
+from .blockchain import lookup_ticket
+from .database import AsyncSessionLocal
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_COLUMNS = ["booking_id", "ticket_hash", "user_phone", "tier_name", "qty", "price_paid", "created_at", "verified"]
+
+# The queries in crud run unchanged through AsyncSession.run_sync, which drives them over the async
+# driver without tying up a thread. ORM objects are converted to schemas inside run_sync so nothing
+# lazy-loads on the event loop.
+
+async def create_event(db: AsyncSession, ev: schemas.EventCreate):
+    return await db.run_sync(lambda s: schemas.Event.model_validate(crud.create_event(s, ev)))
+
+async def list_events(db: AsyncSession, cursor=None, limit=50):
+    return await db.run_sync(crud.list_events, cursor=cursor, limit=limit)
+
+async def search_events(db: AsyncSession, cursor=None, limit=50, **filters):
+    return await db.run_sync(crud.search_events, cursor=cursor, limit=limit, **filters)
+
+async def delete_event(db: AsyncSession, event_id: int, soft: bool = False):
+    # Soft: only mark the event deleted and leave the purge to the caller's background job
+    if not await db.run_sync(crud.mark_event_deleted, event_id):
+        return None
+    if soft:
+        return {}
+    counts = await db.run_sync(crud.purge_event_rows, event_id)
+    # Waits for the ledger writer, so off the event loop
+    await asyncio.to_thread(crud.archive_event_ledger, event_id)
+    return counts
+
+async def get_dynamic_price(db: AsyncSession, price_request: schemas.PriceRequest):
+    return await db.run_sync(crud.get_dynamic_price, price_request)
+
+async def get_dynamic_prices(db: AsyncSession, batch: schemas.BatchPriceRequest):
+    return await db.run_sync(crud.get_dynamic_prices, batch)
+
+async def book_ticket(db: AsyncSession, b: schemas.BookingCreate):
+    booking, ledger_entry = await db.run_sync(crud.commit_booking, b)
+    # The background ledger writer makes the block durable; the booking reports ledger_pending until then
+    crud.write_ledger_entry(ledger_entry)
+    return booking
+
+async def create_hold(db: AsyncSession, h: schemas.HoldCreate):
+    return await db.run_sync(crud.create_hold, h)
+
+async def release_hold(db: AsyncSession, token: str):
+    return await db.run_sync(crud.release_hold, token)
+
+async def get_bookings_for_event(db: AsyncSession, event_id: int, cursor=None, limit=500):
+    return await db.run_sync(crud.get_bookings_for_event, event_id, cursor=cursor, limit=limit)
+
+async def event_exists(db: AsyncSession, event_id: int) -> bool:
+    event = await db.get(models.Event, event_id)
+    return event is not None and event.deleted_at is None
+
+async def export_event_bookings(event_id: int, fmt: str) -> AsyncIterator[str]:
+    # Streams from a server-side cursor one yield_per batch at a time, so memory stays flat for any
+    # event size. Opens its own session because the response body outlives the request's dependencies.
+    stmt = select(
+        models.Booking.id, models.Booking.ticket_hash, models.User.phone, models.Tier.name,
+        models.Booking.qty, models.Booking.price_paid, models.Booking.created_at, models.Booking.verified
+    ).join(models.User, models.Booking.user_id == models.User.id).join(
+        models.Tier, models.Booking.tier_id == models.Tier.id
+    ).where(models.Booking.event_id == event_id).order_by(models.Booking.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    if fmt == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\n"
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer, lineterminator="\n")
+                writer.writerows(
+                    (r[0], r[1], r[2], r[3], r[4], r[5], r[6].isoformat() if r[6] else "", int(bool(r[7]))) for r in rows
+                )
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps({
+                        "booking_id": r[0], "ticket_hash": r[1], "user_phone": r[2], "tier_name": r[3], "qty": r[4],
+                        "price_paid": r[5], "created_at": r[6].isoformat() if r[6] else None, "verified": bool(r[7])
+                    }) + "\n"
+                    for r in rows
+                )
+
+async def verify_ticket(db: AsyncSession, ticket_hash: str):
+    booking = await db.run_sync(crud.find_ticket_booking, ticket_hash)
+    if booking is None:
+        return None
+    # run_sync executes on the event loop, so the ledger file read goes to a worker thread instead
+    ledger_entry = await asyncio.to_thread(lookup_ticket, booking["event_id"], ticket_hash)
+    return crud.ticket_verification(booking, ledger_entry)
+
+async def verify_and_mark_tickets(db: AsyncSession, batch: schemas.BatchVerifyRequest):
+    found, admitted = await db.run_sync(crud.mark_tickets, batch)
+    # As in verify_ticket: up to MAX_BATCH_VERIFY ledger reads, kept off the event loop
+    in_ledger = await asyncio.to_thread(crud.ledger_tickets, found)
+    return crud.ticket_scan_response(batch, found, admitted, in_ledger)
+
+async def create_sponsor(db: AsyncSession, sponsor: schemas.SponsorCreate):
+    return await db.run_sync(lambda s: schemas.Sponsor.model_validate(crud.create_sponsor(s, sponsor)))
+
+async def list_sponsors(db: AsyncSession):
+    return await db.run_sync(lambda s: [schemas.Sponsor.model_validate(sp) for sp in crud.list_sponsors(s)])
+
+async def create_event_rating(db: AsyncSession, event_id: int, rating: schemas.RatingCreate):
+    return await db.run_sync(crud.create_event_rating, event_id, rating)
+
+async def import_stream(db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str, chunk_fn):
+    # Parses the upload as it arrives and hands each full chunk of rows to chunk_fn in its own transaction
+    report = schemas.ImportReport()
+    parser = bulk.RecordParser(fmt, report)
+    rows, pending = [], b""
+    async for data in chunks:
+        *lines, pending = (pending + data).split(b"\n")
+        for line in lines:
+            item = parser.feed(line)
+            if item is not None:
+                rows.append(item)
+            if len(rows) >= bulk.IMPORT_CHUNK_SIZE:
+                await db.run_sync(chunk_fn, rows, report)
+                rows = []
+    if pending:
+        item = parser.feed(pending)
+        if item is not None:
+            rows.append(item)
+    parser.finish()
+    if rows:
+        await db.run_sync(chunk_fn, rows, report)
+    return report
@@ -0,0 +1,734 @@
+# benchmark.py
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+
+TIERS_PER_EVENT = 3
+SEED_CHUNK_SIZE = 50000
+SPONSORS = 50
+# Vocabulary for synthetic titles, descriptions and locations, so text search has realistic selectivity
+GENRES = ["rock", "jazz", "comedy", "theatre", "film", "food", "tech", "art", "dance", "poetry", "folk", "opera"]
+KINDS = ["festival", "night", "concert", "workshop", "meetup", "showcase", "marathon", "expo"]
+CITIES = ["pune", "mumbai", "delhi", "bengaluru", "chennai", "kolkata", "hyderabad", "jaipur", "goa", "kochi"]
+
+# The backend reads DATABASE_URL, LEDGER_DIR and cache sizes at import time, so the
+# package modules are imported only after configure() has pointed them at the workdir.
+
+def configure(workdir: str, no_cache: bool, metrics: bool, database_url: Optional[str] = None):
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["LEDGER_DIR"] = os.path.join(workdir, "ledgers")
+    os.environ["RESPONSE_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["METRICS_ENABLED"] = "1" if metrics else "0"
+    if no_cache:
+        os.environ["QUOTE_CACHE_SIZE"] = "0"
+        os.environ["RESPONSE_CACHE_SIZE"] = "0"
+
+def generate_events(n_events: int, rng: np.random.RandomState):
+    # Same shape as ml_pricing.generate_synthetic_data: exponential hours to event, uniform base price
+    now = datetime.utcnow()
+    hours_to_event = rng.exponential(scale=48, size=n_events)
+    base_price = rng.uniform(20, 300, size=(n_events, TIERS_PER_EVENT))
+    events, tiers = [], []
+    for i in range(n_events):
+        start = now + timedelta(hours=float(hours_to_event[i]))
+        genre, kind, city = GENRES[rng.randint(len(GENRES))], KINDS[rng.randint(len(KINDS))], CITIES[rng.randint(len(CITIES))]
+        events.append({
+            "id": i + 1, "title": f"{genre.title()} {kind.title()} {i + 1}",
+            "description": f"A {genre} {kind} with {GENRES[rng.randint(len(GENRES))]} guests",
+            "location": f"Hall {i % 97}, {city.title()}", "start_time": start, "end_time": start + timedelta(hours=3),
+        })
+        for t in range(TIERS_PER_EVENT):
+            # Seats stay plentiful so the booking scenario never runs a tier dry
+            tiers.append({
+                "id": i * TIERS_PER_EVENT + t + 1, "name": f"Tier {t + 1}", "price": float(base_price[i, t]),
+                "total_seats": 1000000, "seats_sold": int(rng.randint(0, 300)), "event_id": i + 1,
+            })
+    return events, tiers
+
+def generate_users(n_users: int):
+    return [{"id": i + 1, "name": f"Benchmark User {i + 1}", "phone": user_phone(i + 1)} for i in range(n_users)]
+
+def user_phone(user_id: int) -> str:
+    return f"{9000000000 + user_id}"
+
+def generate_bookings(start: int, count: int, n_events: int, n_users: int, rng: np.random.RandomState):
+    event_ids = rng.randint(1, n_events + 1, size=count)
+    tier_offsets = rng.randint(0, TIERS_PER_EVENT, size=count)
+    user_ids = rng.randint(1, n_users + 1, size=count)
+    qtys = rng.randint(1, 5, size=count)
+    prices = rng.uniform(20, 300, size=count) * qtys
+    created_at = datetime.utcnow()
+    return [{
+        "id": start + i + 1, "user_id": int(user_ids[i]), "event_id": int(event_ids[i]),
+        "tier_id": int((event_ids[i] - 1) * TIERS_PER_EVENT + tier_offsets[i] + 1),
+        "qty": int(qtys[i]), "price_paid": float(prices[i]), "ticket_hash": benchmark_ticket_hash(start + i + 1),
+        "created_at": created_at, "verified": False,
+    } for i in range(count)]
+
+def benchmark_ticket_hash(booking_id: int) -> str:
+    return f"{booking_id:064x}"
+
+def generate_ratings(n_ratings: int, n_events: int, n_users: int, rng: np.random.RandomState):
+    # Walk users per event from a random offset so every (event, user) pair is unique
+    offsets = rng.randint(0, n_users, size=n_events)
+    scores = rng.randint(1, 6, size=n_ratings)
+    return [{
+        "id": i + 1, "event_id": i % n_events + 1,
+        "user_id": int((offsets[i % n_events] + i // n_events) % n_users + 1), "rating": int(scores[i]),
+    } for i in range(n_ratings)]
+
+def seed_database(args):
+    from sqlalchemy import insert, text
+    from .database import SessionLocal, engine
+    from . import crud, models, search
+
+    if args.ratings > args.events * args.users:
+        raise SystemExit("--ratings cannot exceed --events x --users (one rating per user per event)")
+    models.Base.metadata.create_all(bind=engine)
+    rng = np.random.RandomState(args.seed)
+    events, tiers = generate_events(args.events, rng)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Event), events)
+        conn.execute(insert(models.Tier), tiers)
+        conn.execute(insert(models.User), generate_users(args.users))
+        conn.execute(insert(models.Sponsor), [{"id": i + 1, "name": f"Benchmark Sponsor {i + 1}"} for i in range(SPONSORS)])
+        conn.execute(insert(models.event_sponsor_association),
+                     [{"event_id": event["id"], "sponsor_id": int(rng.randint(1, SPONSORS + 1))} for event in events])
+    for start in range(0, args.bookings, SEED_CHUNK_SIZE):
+        count = min(SEED_CHUNK_SIZE, args.bookings - start)
+        with engine.begin() as conn:
+            conn.execute(insert(models.Booking), generate_bookings(start, count, args.events, args.users, rng))
+    if args.ratings:
+        with engine.begin() as conn:
+            conn.execute(insert(models.Rating), generate_ratings(args.ratings, args.events, args.users, rng))
+    if engine.dialect.name == "postgresql":
+        # Rows went in with explicit ids, so move each id sequence past them for later inserts
+        with engine.begin() as conn:
+            for table in models.Base.metadata.sorted_tables:
+                if "id" in table.c:
+                    conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                                      f"coalesce(max(id), 1)) FROM {table.name}"))
+    db = SessionLocal()
+    try:
+        crud.rebuild_event_stats(db)
+        search.ensure_search_index(db)
+        search.rebuild_search_index(db)
+    finally:
+        db.close()
+
+def ensure_seeded(args, workdir: str):
+    from sqlalchemy import inspect
+    from .database import engine
+
+    if inspect(engine).has_table("bookings"):
+        print(f"Reusing seeded database {engine.url.render_as_string(hide_password=True)}")
+        return
+    start = time.perf_counter()
+    seed_database(args)
+    print(f"Seeded {args.events} events, {args.bookings} bookings, {args.ratings} ratings "
+          f"in {time.perf_counter() - start:.1f}s")
+
+def summarize(latencies, errors: int, elapsed: float, rows: int = 0) -> dict:
+    ms = np.array(latencies) * 1000.0
+    if not len(ms):
+        return {"requests": 0, "errors": errors, "throughput_rps": 0.0}
+    summary = {
+        "requests": len(ms),
+        "errors": errors,
+        "throughput_rps": round(len(ms) / elapsed, 1),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+    if rows:
+        # Wall time spread over the rows returned, for comparing the cost of building responses
+        summary["us_per_row"] = round(elapsed * 1e6 / rows, 2)
+    return summary
+
+async def run_scenario(operation, requests: int, concurrency: int, warmup: int) -> dict:
+    # Operations that return a page return its row count, which gives the per-row cost
+    for i in range(warmup):
+        await operation(i)
+    latencies, errors, rows = [], 0, 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed_call(i):
+        nonlocal errors, rows
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                count = await operation(i)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            rows += count or 0
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed_call(warmup + i) for i in range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - start, rows)
+
+def run_sync_scenario(operation, requests: int, warmup: int) -> dict:
+    for i in range(warmup):
+        operation(i)
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for i in range(requests):
+        call_start = time.perf_counter()
+        try:
+            operation(warmup + i)
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+async def run_api_scenarios(args, rng: np.random.RandomState) -> dict:
+    import httpx
+    from .main import app
+    from .ml_pricing import warm_model
+
+    n_tiers = args.events * TIERS_PER_EVENT
+    booked_hashes = []
+
+    def expect(response, status=200):
+        if response.status_code != status:
+            raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text[:200]}")
+        return response
+
+    async with app.router.lifespan_context(app):
+        # Benchmark inference, not the one-off model load
+        await asyncio.to_thread(warm_model)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            page_cursors = [None]
+            page = expect(await client.get("/api/events", params={"limit": args.page_size})).json()
+            while page["next_cursor"] and len(page_cursors) < 200:
+                page_cursors.append(page["next_cursor"])
+                page = expect(await client.get("/api/events", params={"limit": args.page_size, "cursor": page["next_cursor"]})).json()
+
+            async def list_events(i):
+                params = {"limit": args.page_size}
+                cursor = page_cursors[i % len(page_cursors)]
+                if cursor:
+                    params["cursor"] = cursor
+                return len(expect(await client.get("/api/events", params=params)).json()["items"])
+
+            async def search_events(i):
+                # A text term, a one-week start window, or a sponsor, each with a price range on some calls
+                params = {"limit": args.page_size}
+                choice = i % 3
+                if choice == 0:
+                    params["q"] = (GENRES + KINDS + CITIES)[rng.randint(len(GENRES) + len(KINDS) + len(CITIES))]
+                elif choice == 1:
+                    start = datetime.utcnow() + timedelta(hours=float(rng.exponential(scale=48)))
+                    params["start_from"], params["start_to"] = start.isoformat(), (start + timedelta(days=7)).isoformat()
+                else:
+                    params["sponsor_id"] = int(rng.randint(1, SPONSORS + 1))
+                if i % 2:
+                    low = float(rng.uniform(20, 250))
+                    params["min_price"], params["max_price"] = low, low + 50
+                return len(expect(await client.get("/api/events/search", params=params)).json()["items"])
+
+            async def get_dynamic_price(i):
+                payload = {"tier_id": int(rng.randint(1, n_tiers + 1)), "qty": int(rng.randint(1, 9))}
+                expect(await client.post("/api/events/price", json=payload))
+
+            async def book_ticket(i):
+                tier_id = int(rng.randint(1, n_tiers + 1))
+                payload = {
+                    "user_phone": user_phone(int(rng.randint(1, args.users + 1))),
+                    "event_id": (tier_id - 1) // TIERS_PER_EVENT + 1, "tier_id": tier_id, "qty": int(rng.randint(1, 5)),
+                }
+                booked_hashes.append(expect(await client.post("/api/book", json=payload)).json()["ticket_hash"])
+
+            async def verify_ticket(i):
+                # Alternate tickets booked above (on the ledger) with seeded ones (database only)
+                if i % 2 and booked_hashes:
+                    ticket_hash = booked_hashes[i % len(booked_hashes)]
+                else:
+                    ticket_hash = benchmark_ticket_hash(int(rng.randint(1, args.bookings + 1)))
+                expect(await client.get(f"/api/verify/{ticket_hash}"))
+
+            async def get_bookings_for_event(i):
+                event_id = int(rng.randint(1, args.events + 1))
+                return len(expect(await client.get(f"/api/events/{event_id}/bookings", params={"limit": args.page_size})).json()["items"])
+
+            scenarios = {
+                "list_events": list_events,
+                "search_events": search_events,
+                "get_dynamic_price": get_dynamic_price,
+                "book_ticket": book_ticket,
+                "verify_ticket": verify_ticket,
+                "get_bookings_for_event": get_bookings_for_event,
+            }
+            results = {}
+            for name, operation in scenarios.items():
+                if args.only and name not in args.only:
+                    continue
+                results[name] = await run_scenario(operation, args.requests, args.concurrency, args.warmup)
+                print_result(name, results[name])
+    return results
+
+def build_sync_app():
+    # The reads the stacks suite times, served the way every route was before the async stack: sync def
+    # routes on the blocking session, which FastAPI runs on its worker threadpool
+    from fastapi import Depends, FastAPI, HTTPException
+    from sqlalchemy.orm import Session
+    from . import crud, schemas
+    from .database import get_db
+    from .serialization import FastJSONResponse
+
+    app = FastAPI()
+
+    @app.get("/api/events", response_model=schemas.EventPage)
+    def read_events(cursor: Optional[str] = None, limit: int = 100, db: Session = Depends(get_db)):
+        return FastJSONResponse(crud.list_events(db, cursor=cursor, limit=limit))
+
+    @app.post("/api/events/price", response_model=schemas.PriceResponse)
+    def get_event_price(price_request: schemas.PriceRequest, db: Session = Depends(get_db)):
+        try:
+            return crud.get_dynamic_price(db, price_request)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+    @app.get("/api/verify/{ticket_hash}", response_model=schemas.VerifiedBookingDetail)
+    def verify_ticket(ticket_hash: str, db: Session = Depends(get_db)):
+        booking_details = crud.verify_ticket(db, ticket_hash)
+        if not booking_details:
+            raise HTTPException(status_code=404, detail="Ticket hash not found or invalid.")
+        return booking_details
+
+    return app
+
+async def run_stack_scenarios(args, rng: np.random.RandomState) -> dict:
+    # One mixed workload (event pages, price quotes, ticket checks) through the sync and the async
+    # stack at each concurrency level. Caches are off, so every request reaches the database.
+    import httpx
+    from .main import app as async_app
+    from .ml_pricing import warm_model
+
+    n_tiers = args.events * TIERS_PER_EVENT
+    results = {}
+    async with async_app.router.lifespan_context(async_app):
+        await asyncio.to_thread(warm_model)
+        for stack, app in (("sync", build_sync_app()), ("async", async_app)):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                async def mixed(i):
+                    choice = i % 3
+                    if choice == 0:
+                        response = await client.get("/api/events", params={"limit": args.page_size})
+                    elif choice == 1:
+                        payload = {"tier_id": int(rng.randint(1, n_tiers + 1)), "qty": int(rng.randint(1, 9))}
+                        response = await client.post("/api/events/price", json=payload)
+                    else:
+                        ticket_hash = benchmark_ticket_hash(int(rng.randint(1, args.bookings + 1)))
+                        response = await client.get(f"/api/verify/{ticket_hash}")
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text[:200]}")
+
+                for concurrency in args.stack_concurrency:
+                    name = f"{stack}_c{concurrency}"
+                    if args.only and name not in args.only:
+                        continue
+                    results[name] = await run_scenario(mixed, args.requests, concurrency, args.warmup)
+                    print_result(name, results[name])
+    return results
+
+# SQLite settings compared by the sqlite-writes suite, as overrides of database.SQLITE_PRAGMAS and the pool
+WRITE_CONFIGS = {
+    "writes_default": ({}, {}),
+    "writes_delete_full": ({"journal_mode": "DELETE", "synchronous": "FULL"}, {}),
+    "writes_wal_full": ({"synchronous": "FULL"}, {}),
+    "writes_no_busy_timeout": ({"busy_timeout": 0}, {}),
+    "writes_pool_1": ({}, {"pool_size": 1, "max_overflow": 0}),
+}
+
+def run_write_scenarios(args, workdir: str, rng: np.random.RandomState) -> dict:
+    # Concurrent bookings (the database half, without the ledger) on threads against a fresh SQLite file
+    # for each setting, so only the PRAGMAs and pool size differ between runs
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from . import crud, models, schemas
+    from .database import SQLITE_PRAGMAS, _pool_options
+    from .ml_pricing import warm_model
+
+    warm_model()
+    results = {}
+    for name, (pragma_overrides, pool_overrides) in WRITE_CONFIGS.items():
+        if args.only and name not in args.only:
+            continue
+        path = os.path.join(workdir, f"{name}.db")
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        url = f"sqlite:///{path}"
+        engine = create_engine(url, connect_args={"check_same_thread": False}, **dict(_pool_options(url), **pool_overrides))
+        pragmas = dict(SQLITE_PRAGMAS, **pragma_overrides)
+
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+            cursor.close()
+
+        event.listen(engine, "connect", apply_pragmas)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        models.Base.metadata.create_all(bind=engine)
+        setup = Session()
+        try:
+            events, tiers = generate_events(args.write_events, rng)
+            setup.bulk_insert_mappings(models.Event, events)
+            setup.bulk_insert_mappings(models.Tier, tiers)
+            setup.commit()
+        finally:
+            setup.close()
+
+        def book(i):
+            tier_id = int(rng.randint(1, args.write_events * TIERS_PER_EVENT + 1))
+            db = Session()
+            try:
+                start = time.perf_counter()
+                crud.commit_booking(db, schemas.BookingCreate(
+                    user_phone=user_phone(i % args.users + 1), event_id=(tier_id - 1) // TIERS_PER_EVENT + 1, tier_id=tier_id, qty=1
+                ))
+                return time.perf_counter() - start
+            except Exception:
+                return None
+            finally:
+                db.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.write_threads) as pool:
+            outcomes = list(pool.map(book, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        engine.dispose()
+        latencies = [t for t in outcomes if t is not None]
+        results[name] = summarize(latencies, len(outcomes) - len(latencies), elapsed)
+        print_result(name, results[name])
+    return results
+
+def seed_export_event(args):
+    # One event holding every booking, the shape a full finance export has to stream
+    from sqlalchemy import insert, inspect
+    from .database import engine
+    from . import models
+
+    if inspect(engine).has_table("bookings"):
+        print(f"Reusing seeded export database {engine.url.render_as_string(hide_password=True)}")
+        return
+    models.Base.metadata.create_all(bind=engine)
+    rng = np.random.RandomState(args.seed)
+    events, tiers = generate_events(1, rng)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Event), events)
+        conn.execute(insert(models.Tier), tiers)
+        conn.execute(insert(models.User), generate_users(args.users))
+    start = time.perf_counter()
+    for offset in range(0, args.export_bookings, SEED_CHUNK_SIZE):
+        count = min(SEED_CHUNK_SIZE, args.export_bookings - offset)
+        with engine.begin() as conn:
+            conn.execute(insert(models.Booking), generate_bookings(offset, count, 1, args.users, rng))
+    print(f"Seeded one event with {args.export_bookings} bookings in {time.perf_counter() - start:.1f}s")
+
+async def run_export_scenarios(args) -> dict:
+    # Streams the whole event through the export endpoint once per format for the time, then again
+    # under tracemalloc for the peak memory, which should not grow with the number of rows. The app is
+    # called as plain ASGI with each chunk counted and dropped; httpx's ASGI transport would hold the
+    # whole body in memory.
+    import tracemalloc
+    from .main import app
+
+    async def export(fmt):
+        status, rows, size = None, 0, 0
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()  # the client never disconnects
+
+        async def send(message):
+            nonlocal status, rows, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                rows += message.get("body", b"").count(b"\n")
+
+        path = "/api/events/1/bookings/export"
+        await app({
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "root_path": "", "query_string": f"format={fmt}".encode(),
+            "headers": [(b"host", b"benchmark")], "server": ("benchmark", 80), "client": ("127.0.0.1", 0),
+        }, receive, send)
+        if status != 200:
+            raise RuntimeError(f"export {fmt}: {status}")
+        return rows - (fmt == "csv"), size
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        for fmt in ("ndjson", "csv"):
+            name = f"export_{fmt}"
+            if args.only and name not in args.only:
+                continue
+            start = time.perf_counter()
+            rows, size = await export(fmt)
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            await export(fmt)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = dict(summarize([elapsed], 0, elapsed, rows), rows=rows,
+                                 size_mb=round(size / 2 ** 20, 1), peak_memory_mb=round(peak / 2 ** 20, 2))
+            print(f"{name:<24} {rows} rows, {results[name]['size_mb']} MB in {elapsed:.1f}s "
+                  f"({rows / elapsed:,.0f} rows/s), peak traced memory {results[name]['peak_memory_mb']} MB")
+    return results
+
+def run_ledger_scenarios(args, rng: np.random.RandomState) -> dict:
+    from .blockchain import SimpleChain
+
+    # A dedicated event id keeps this ledger apart from the ones the booking scenario writes
+    ledger_event_id = args.events + 1
+    chain = SimpleChain(event_id=ledger_event_id)
+    appended = []
+
+    def ledger_append(i):
+        ticket_hash = f"ledger-{i:058x}"
+        chain.add_block({"ticket_hash": ticket_hash, "event_id": ledger_event_id, "user_phone": user_phone(1), "qty": 1, "price_paid": 1.0})
+        appended.append(ticket_hash)
+
+    def ledger_verify(i):
+        if chain.verify_ticket(appended[int(rng.randint(0, len(appended)))]) is None:
+            raise RuntimeError("Appended ticket missing from ledger")
+
+    results = {}
+    for name, operation in (("ledger_append", ledger_append), ("ledger_verify", ledger_verify)):
+        if args.only and name not in args.only:
+            continue
+        if name == "ledger_verify" and not appended:
+            ledger_append(0)
+        results[name] = run_sync_scenario(operation, args.requests, args.warmup)
+        print_result(name, results[name])
+    return results
+
+def size_label(n: int) -> str:
+    return f"{n // 1000}k" if n >= 1000 and n % 1000 == 0 else str(n)
+
+def run_ledger_size_scenarios(args, workdir: str, rng: np.random.RandomState) -> dict:
+    # Verify latency should not depend on how long the chain is: each size gets its own ledger, built
+    # in batches, then random tickets are looked up with the index warm. The first lookup after a
+    # restart loads the .idx sidecar, which does grow with the chain, so it is reported separately.
+    from .blockchain import SimpleChain, clear_ticket_indexes
+
+    results, batch = {}, 5000
+    for size in args.ledger_sizes:
+        ledger_dir = os.path.join(workdir, "ledger-sizes", str(size))
+        chain = SimpleChain(event_id=1, ledger_dir=ledger_dir)
+        built = sum(1 for _ in chain.iter_blocks()) - 1
+        for start in range(built, size, batch):
+            chain.add_blocks([
+                {"ticket_hash": f"ledger-{i:058x}", "event_id": 1, "user_phone": user_phone(1), "qty": 1, "price_paid": 1.0}
+                for i in range(start, min(start + batch, size))
+            ])
+
+        def ledger_verify(i):
+            if chain.verify_ticket(f"ledger-{int(rng.randint(0, size)):058x}") is None:
+                raise RuntimeError("Appended ticket missing from ledger")
+
+        label = size_label(size)
+        clear_ticket_indexes()
+        load_start = time.perf_counter()
+        ledger_verify(0)
+        first = summarize([time.perf_counter() - load_start], 0, time.perf_counter() - load_start)
+        results[f"ledger_first_verify_{label}"] = first
+        results[f"ledger_verify_{label}"] = run_sync_scenario(ledger_verify, args.requests, args.warmup)
+        print_result(f"ledger_verify_{label}", results[f"ledger_verify_{label}"])
+
+    print(f"\n{'blocks':>10} {'verify p50 ms':>14} {'verify p99 ms':>14} {'first lookup ms':>16}")
+    for size in args.ledger_sizes:
+        label = size_label(size)
+        warm, first = results[f"ledger_verify_{label}"], results[f"ledger_first_verify_{label}"]
+        print(f"{size:>10} {warm['p50_ms']:>14.3f} {warm['p99_ms']:>14.3f} {first['p50_ms']:>16.2f}")
+    return results
+
+# Runs in a fresh interpreter: prints seconds to import the app, then seconds until the pricing model is ready
+COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+import {package}.main
+imported = time.perf_counter()
+from {package}.ml_pricing import warm_model
+warm_model()
+print(imported - start, time.perf_counter() - imported)
+"""
+
+def run_cold_start(args, workdir: str) -> dict:
+    # A worker serves requests once imported but prices at base price until the model is loaded, so both
+    # times are reported: loading an existing compiled artifact, and a first start that must train one
+    package = __package__ or os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+    model_dir = os.path.join(workdir, "cold-start")
+    env = dict(os.environ, MODEL_PATH=os.path.join(model_dir, "pricing_model.joblib"),
+               COMPILED_MODEL_PATH=os.path.join(model_dir, "pricing_model.compiled.joblib"))
+    timings = {"cold_start_import": [], "cold_start_model_compiled": [], "cold_start_model_untrained": []}
+    errors = {name: 0 for name in timings}
+    for i in range(args.cold_start_runs * 2):
+        untrained = i % 2 == 0
+        if untrained:
+            shutil.rmtree(model_dir, ignore_errors=True)
+            os.makedirs(model_dir)
+        model_name = "cold_start_model_untrained" if untrained else "cold_start_model_compiled"
+        result = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT.format(package=package)], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env)
+        if result.returncode:
+            errors["cold_start_import"] += 1
+            errors[model_name] += 1
+            print(result.stderr[-2000:])
+            continue
+        import_seconds, model_seconds = map(float, result.stdout.strip().splitlines()[-1].split())
+        timings["cold_start_import"].append(import_seconds)
+        timings[model_name].append(model_seconds)
+
+    results = {}
+    for name, latencies in timings.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = summarize(latencies, errors[name], sum(latencies) or 1.0)
+        print_result(name, results[name])
+    return results
+
+def print_result(name: str, result: dict):
+    if not result["requests"]:
+        print(f"{name:<24} all {result['errors']} requests failed")
+        return
+    per_row = f"  {result['us_per_row']:>7.1f} us/row" if "us_per_row" in result else ""
+    print(f"{name:<24} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f} ms  "
+          f"p90 {result['p90_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}{per_row}")
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # A scenario regresses when p99 latency grows, or throughput drops, by more than the tolerance
+    regressions = []
+    print(f"\nCompared with baseline ({baseline.get('meta', {}).get('git_commit') or 'unknown commit'}):")
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not result["requests"] or not before.get("requests"):
+            print(f"{name:<24} no baseline")
+            continue
+        throughput_change = result["throughput_rps"] / before["throughput_rps"] - 1
+        p99_change = result["p99_ms"] / before["p99_ms"] - 1
+        regressed = p99_change > tolerance or throughput_change < -tolerance or result["errors"] > before["errors"]
+        if regressed:
+            regressions.append(name)
+        per_row = ""
+        if "us_per_row" in result and before.get("us_per_row"):
+            per_row = f"  per row {result['us_per_row'] / before['us_per_row'] - 1:+7.1%}"
+        print(f"{name:<24} throughput {throughput_change:+7.1%}  p99 {p99_change:+7.1%}{per_row}  {'REGRESSION' if regressed else 'ok'}")
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the API hot paths against a seeded synthetic dataset")
+    parser.add_argument("--suite", choices=("api", "stacks", "sqlite-writes", "export", "ledger", "cold-start"), default="api",
+                        help="api: request scenarios against the seeded dataset; stacks: the same reads through "
+                             "sync and async routes; sqlite-writes: concurrent bookings under each SQLite setting; "
+                             "export: streaming one very large event's bookings; ledger: ticket verify latency "
+                             "across chain sizes; cold-start: fresh worker startup")
+    parser.add_argument("--database-url", default=None, help="Benchmark this database (e.g. Postgres) instead of SQLite in the workdir")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--bookings", type=int, default=1000000)
+    parser.add_argument("--ratings", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=2000, help="Timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="Untimed requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="In-flight API requests")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", default=None, help="Run only these scenarios")
+    parser.add_argument("--workdir", default=None, help="Keep the seeded database and ledgers here; an existing one is reused")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the quote and response caches")
+    parser.add_argument("--metrics", action="store_true", help="Leave hot-path instrumentation on while benchmarking")
+    parser.add_argument("--output", default=None, help="Write results as JSON (use as a later --baseline)")
+    parser.add_argument("--baseline", default=None, help="Compare against an earlier --output file")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed p99/throughput change before failing")
+    parser.add_argument("--cold-start-runs", type=int, default=5, help="Fresh interpreters per cold-start case")
+    parser.add_argument("--stack-concurrency", type=int, nargs="+", default=[10, 64], help="In-flight requests for the stacks suite")
+    parser.add_argument("--write-threads", type=int, default=16, help="Booking threads for the sqlite-writes suite")
+    parser.add_argument("--write-events", type=int, default=100, help="Events (three tiers each) the sqlite-writes suite books into")
+    parser.add_argument("--export-bookings", type=int, default=1000000, help="Bookings in the event the export suite streams")
+    parser.add_argument("--ledger-sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Chain lengths for the ledger suite")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="eventmgmt-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    database_url = args.database_url
+    if args.suite == "export" and not database_url:
+        # Kept apart from bench.db, whose events the other suites rely on
+        database_url = f"sqlite:///{os.path.join(workdir, 'export.db')}"
+    configure(workdir, args.no_cache or args.suite == "stacks", args.metrics, database_url)
+    try:
+        if args.suite == "cold-start":
+            results = run_cold_start(args, workdir)
+        elif args.suite == "sqlite-writes":
+            results = run_write_scenarios(args, workdir, np.random.RandomState(args.seed + 1))
+        elif args.suite == "export":
+            seed_export_event(args)
+            results = asyncio.run(run_export_scenarios(args))
+        elif args.suite == "ledger":
+            results = run_ledger_size_scenarios(args, workdir, np.random.RandomState(args.seed + 1))
+        else:
+            ensure_seeded(args, workdir)
+            rng = np.random.RandomState(args.seed + 1)
+            if args.suite == "stacks":
+                results = asyncio.run(run_stack_scenarios(args, rng))
+            else:
+                results = asyncio.run(run_api_scenarios(args, rng))
+                results.update(run_ledger_scenarios(args, rng))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "workdir", "database_url")},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            raise SystemExit(f"Regressed: {', '.join(regressions)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,21 @@
 # blockchain.py
 import hashlib
 import json
+import queue
 import time
-from typing import List, Dict, Optional
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Dict, Optional
 import os
+import re
+import threading
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock still serialises writers within one worker
+    fcntl = None
+
+from .metrics import timed
 
 class Block:
     def __init__(self, index: int, timestamp: float, data: Dict, previous_hash: str, hash: Optional[str] = None):
@@ -31,43 +43,563 @@ class Block:
             "hash": self.hash
         }
 
+LEDGER_DIR = os.getenv("LEDGER_DIR", "ledgers")
+LEDGER_BATCH_SIZE = int(os.getenv("LEDGER_BATCH_SIZE", "500"))
+LEDGER_FLUSH_INTERVAL_MS = float(os.getenv("LEDGER_FLUSH_INTERVAL_MS", "5"))
+# A failed background write is retried after this delay, doubling up to LEDGER_RETRY_MAX_SECONDS
+LEDGER_RETRY_SECONDS = float(os.getenv("LEDGER_RETRY_SECONDS", "1"))
+LEDGER_RETRY_MAX_SECONDS = float(os.getenv("LEDGER_RETRY_MAX_SECONDS", "60"))
+# Ticket entries kept in memory across all ledger indexes; the least recently used ledgers are dropped
+# first and reload from their .idx files when next looked up
+TICKET_INDEX_MAX_ENTRIES = int(os.getenv("TICKET_INDEX_MAX_ENTRIES", "1000000"))
+
+def _chain_file(event_id: int, ledger_dir: str) -> str:
+    return os.path.join(ledger_dir, f"blockchain_event_{event_id}.jsonl")
+
+class TicketIndex:
+    # ticket_hash -> (offset, length) of the block's line in the ledger, persisted as a tab-separated .idx sidecar
+    def __init__(self, chain_file: str):
+        self.chain_file = chain_file
+        self.index_file = os.path.splitext(chain_file)[0] + ".idx"
+        self.entries: Dict[str, tuple] = {}
+        self.index_pos = 0
+        self.index_inode = None
+        self.indexed_end = 0
+        self.lock = threading.Lock()
+        # Entries counted towards TICKET_INDEX_MAX_ENTRIES when this index was last fetched
+        self.counted_entries = 0
+
+    def _read_index_file(self):
+        # Pick up lines appended since the last read, including ones written by other processes
+        if not os.path.exists(self.index_file):
+            return
+        with open(self.index_file, 'rb') as f:
+            inode = os.fstat(f.fileno()).st_ino
+            if inode != self.index_inode:
+                # Rebuilt by another process; read the new file from the start
+                self.entries.clear()
+                self.index_pos = self.indexed_end = 0
+                self.index_inode = inode
+            f.seek(self.index_pos)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        self.index_pos += len(complete)
+        for line in complete.splitlines():
+            parts = line.split(b"\t")
+            if len(parts) != 3 or not parts[1].isdigit() or not parts[2].isdigit():
+                continue
+            offset, length = int(parts[1]), int(parts[2])
+            self.entries[parts[0].decode()] = (offset, length)
+            self.indexed_end = max(self.indexed_end, offset + length)
+
+    def _scan_ledger(self):
+        # Index blocks that have no index line yet, e.g. migrated ledgers or a crash between the two writes
+        entries = []
+        start = offset = self.indexed_end
+        with open(self.chain_file, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                data = json.loads(line).get("data")
+                if isinstance(data, dict) and data.get("ticket_hash"):
+                    entries.append((data["ticket_hash"], offset, len(line)))
+                offset += len(line)
+        self._record(entries, start, offset)
+
+    def _rebuild(self):
+        # The index points at lines that are no longer there (the ledger was truncated, repaired or
+        # replaced), so index the whole ledger again into a new .idx file. Other processes see its new
+        # inode and reread it from the start.
+        self.entries.clear()
+        self.index_pos = self.indexed_end = 0
+        if os.path.exists(self.index_file):
+            os.remove(self.index_file)
+        self._scan_ledger()
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'rb') as f:
+                self.index_inode = os.fstat(f.fileno()).st_ino
+                self.index_pos = f.seek(0, os.SEEK_END)
+
+    def _record(self, entries: List[tuple], start: int, end: int):
+        if entries:
+            with open(self.index_file, 'ab') as f:
+                f.write("".join(f"{h}\t{o}\t{l}\n" for h, o, l in entries).encode())
+        for ticket_hash, offset, length in entries:
+            self.entries[ticket_hash] = (offset, length)
+        # Only advance over a contiguous range, so blocks appended by another writer still get scanned
+        if self.indexed_end == start:
+            self.indexed_end = end
+
+    def record(self, entries: List[tuple], start: int, end: int):
+        with self.lock:
+            self._record(entries, start, end)
+
+    def lookup(self, ticket_hash: str) -> Optional[Dict]:
+        with timed("ledger", "ticket_lookup"):
+            return self._lookup(ticket_hash)
+
+    def _lookup(self, ticket_hash: str) -> Optional[Dict]:
+        with self.lock:
+            entry = self.entries.get(ticket_hash)
+            if entry is None:
+                self._read_index_file()
+                entry = self.entries.get(ticket_hash)
+            if entry is None and os.path.getsize(self.chain_file) > self.indexed_end:
+                self._scan_ledger()
+                entry = self.entries.get(ticket_hash)
+        if entry is None:
+            return None
+        data = self._read_block_data(entry, ticket_hash)
+        if data is not None:
+            return data
+        # A stale offset; writers append under the ledger lock, so nothing moves while reindexing
+        with _ledger_lock(self.chain_file), self.lock:
+            self._rebuild()
+            entry = self.entries.get(ticket_hash)
+        return self._read_block_data(entry, ticket_hash) if entry is not None else None
+
+    def missing(self, ticket_hashes: List[str]) -> List[str]:
+        # The hashes with no block in the ledger. Callers hold the ledger lock, so nothing is
+        # appended or rewritten while checking.
+        with self.lock:
+            self._read_index_file()
+            if os.path.getsize(self.chain_file) > self.indexed_end:
+                self._scan_ledger()
+            found = {h: self.entries[h] for h in ticket_hashes if h in self.entries}
+            if any(self._read_block_data(entry, h) is None for h, entry in found.items()):
+                self._rebuild()
+                found = {h: self.entries[h] for h in ticket_hashes if h in self.entries}
+        return [h for h in ticket_hashes if h not in found]
+
+    def _read_block_data(self, entry: tuple, ticket_hash: str) -> Optional[Dict]:
+        offset, length = entry
+        with open(self.chain_file, 'rb') as f:
+            f.seek(offset)
+            line = f.read(length)
+        try:
+            data = json.loads(line).get("data") if line.endswith(b"\n") else None
+        except (ValueError, AttributeError):
+            return None
+        if isinstance(data, dict) and data.get("ticket_hash") == ticket_hash:
+            return data
+        return None
+
+_ticket_indexes: "OrderedDict[str, TicketIndex]" = OrderedDict()
+_ticket_indexes_lock = threading.Lock()
+# Running total of counted_entries over the cached indexes, so a fetch never walks every ledger
+_ticket_index_entries = 0
+
+def get_ticket_index(chain_file: str) -> TicketIndex:
+    global _ticket_index_entries
+    with _ticket_indexes_lock:
+        index = _ticket_indexes.get(chain_file)
+        if index is None:
+            index = _ticket_indexes[chain_file] = TicketIndex(chain_file)
+        _ticket_indexes.move_to_end(chain_file)
+        # Indexes grow after they are handed out; count this one's growth since its last fetch
+        size = len(index.entries)
+        _ticket_index_entries += size - index.counted_entries
+        index.counted_entries = size
+        # Evict whole ledgers, least recently used first; the one being returned always stays
+        while _ticket_index_entries > TICKET_INDEX_MAX_ENTRIES and len(_ticket_indexes) > 1:
+            _, evicted = _ticket_indexes.popitem(last=False)
+            _ticket_index_entries -= evicted.counted_entries
+        return index
+
+def _forget_ticket_index(chain_file: str):
+    # Callers hold _ticket_indexes_lock
+    global _ticket_index_entries
+    index = _ticket_indexes.pop(chain_file, None)
+    if index is not None:
+        _ticket_index_entries -= index.counted_entries
+
+def clear_ticket_indexes():
+    global _ticket_index_entries
+    with _ticket_indexes_lock:
+        _ticket_indexes.clear()
+        _ticket_index_entries = 0
+
+def lookup_ticket(event_id: int, ticket_hash: str, ledger_dir: str = LEDGER_DIR) -> Optional[Dict]:
+    chain_file = _chain_file(event_id, ledger_dir)
+    if not os.path.exists(chain_file):
+        return None
+    return get_ticket_index(chain_file).lookup(ticket_hash)
+
+_ledger_locks: Dict[str, threading.Lock] = {}
+_held_ledger_locks = threading.local()
+
+@contextmanager
+def _ledger_lock(chain_file: str):
+    # Held while reading the tail and appending, so concurrent writers (threads or worker
+    # processes) always extend the real last block instead of forking the chain. Re-entrant
+    # within a thread, so a caller holding it can still open and extend the chain.
+    held = _held_ledger_locks.__dict__.setdefault("files", set())
+    if chain_file in held:
+        yield
+        return
+    with _ticket_indexes_lock:
+        lock = _ledger_locks.setdefault(chain_file, threading.Lock())
+    with lock:
+        held.add(chain_file)
+        try:
+            if fcntl is None:
+                yield
+                return
+            # Callers may lock a ledger before anything has created its folder
+            os.makedirs(os.path.dirname(chain_file) or ".", exist_ok=True)
+            with open(os.path.splitext(chain_file)[0] + ".lock", 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        finally:
+            held.discard(chain_file)
+
+def ledger_lock(event_id: int, ledger_dir: str = LEDGER_DIR):
+    return _ledger_lock(_chain_file(event_id, ledger_dir))
+
 class SimpleChain:
-    def __init__(self, event_id: int):
-        if not os.path.exists("ledgers"):
-            os.makedirs("ledgers")
-        self.chain_file = f"ledgers/blockchain_event_{event_id}.json"
-        self.chain: List[Block] = self._load_chain()
-
-    def _load_chain(self) -> List[Block]:
-        if not os.path.exists(self.chain_file):
+    # Ledger is JSON Lines, one block per line; only the tail block is read to extend the chain
+    def __init__(self, event_id: int, ledger_dir: str = LEDGER_DIR):
+        if not os.path.exists(ledger_dir):
+            os.makedirs(ledger_dir)
+        self.chain_file = _chain_file(event_id, ledger_dir)
+        self.legacy_chain_file = os.path.join(ledger_dir, f"blockchain_event_{event_id}.json")
+        with _ledger_lock(self.chain_file):
+            if not os.path.exists(self.chain_file) and os.path.exists(self.legacy_chain_file):
+                self.migrate_legacy()
+            with timed("ledger", "load_tail"):
+                self._last_block = self._load_last_block()
+
+    def _load_last_block(self) -> Block:
+        if not os.path.exists(self.chain_file) or os.path.getsize(self.chain_file) == 0:
             genesis = Block(0, time.time(), {"genesis": True}, "0")
-            self.chain = [genesis]
-            self._save_chain()
-            return self.chain
-        with open(self.chain_file, 'r') as f:
-            chain_data = json.load(f)
-            return [Block(**block) for block in chain_data]
+            self._append([genesis])
+            return genesis
+        with open(self.chain_file, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            pos, tail = end, b""
+            while True:
+                # Only newline-terminated lines count; a torn final write never reached its newline.
+                # Keep reading back until the last complete line has the newline before it too.
+                complete = tail[:tail.rfind(b"\n") + 1]
+                if pos == 0 or complete.rstrip(b"\n").count(b"\n"):
+                    break
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                tail = f.read(step) + tail
+            if len(complete) < len(tail):
+                f.truncate(pos + len(complete))
+        last_line = complete.rstrip(b"\n").rsplit(b"\n", 1)[-1]
+        if not last_line.strip():
+            # Nothing but a torn write was ever in the file
+            return self._load_last_block()
+        return Block(**json.loads(last_line))
 
-    def _save_chain(self):
-        with open(self.chain_file, 'w') as f:
-            json.dump([block.to_dict() for block in self.chain], f, indent=4)
+    def _append(self, blocks: List[Block]):
+        lines = [(json.dumps(block.to_dict()) + "\n").encode() for block in blocks]
+        with timed("ledger", "append_fsync"), open(self.chain_file, 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            start = f.tell()
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        entries, offset = [], start
+        for block, line in zip(blocks, lines):
+            if isinstance(block.data, dict) and block.data.get("ticket_hash"):
+                entries.append((block.data["ticket_hash"], offset, len(line)))
+            offset += len(line)
+        get_ticket_index(self.chain_file).record(entries, start, offset)
+
+    def migrate_legacy(self):
+        with open(self.legacy_chain_file, 'r') as f:
+            chain_data = json.load(f)
+        tmp_file = self.chain_file + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            for block in chain_data:
+                f.write((json.dumps(Block(**block).to_dict()) + "\n").encode())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.chain_file)
+        os.replace(self.legacy_chain_file, self.legacy_chain_file + ".migrated")
 
     @property
     def last_block(self) -> Block:
-        return self.chain[-1]
+        return self._last_block
 
     def add_block(self, data: Dict) -> Block:
-        index = len(self.chain)
-        timestamp = time.time()
-        previous_hash = self.last_block.hash
-        block = Block(index, timestamp, data, previous_hash)
-        self.chain.append(block)
-        self._save_chain()
-        return block
+        return self.add_blocks([data])[0]
+
+    def add_blocks(self, data_items: List[Dict], skip_written: bool = False) -> List[Block]:
+        # One write and one fsync for the whole batch. With skip_written, tickets that already have a
+        # block are dropped first, so a retry or recovery pass racing another writer can't duplicate them.
+        if not data_items:
+            return []
+        with _ledger_lock(self.chain_file):
+            if skip_written:
+                hashes = [data["ticket_hash"] for data in data_items if data.get("ticket_hash")]
+                missing = set(get_ticket_index(self.chain_file).missing(hashes)) if hashes else set()
+                data_items = [data for data in data_items if not data.get("ticket_hash") or data["ticket_hash"] in missing]
+                if not data_items:
+                    return []
+            # Another writer may have appended since this chain was opened
+            previous = self._load_last_block()
+            blocks = []
+            for data in data_items:
+                previous = Block(previous.index + 1, time.time(), data, previous.hash)
+                blocks.append(previous)
+            self._append(blocks)
+            self._last_block = blocks[-1]
+        return blocks
+
+    def iter_blocks(self) -> Iterator[Block]:
+        with open(self.chain_file, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield Block(**json.loads(line))
+
+    def verify_chain(self) -> Optional[str]:
+        return _verify_blocks(self.iter_blocks())
 
     def verify_ticket(self, ticket_hash: str) -> Optional[Dict]:
-        for b in self.chain:
-            if isinstance(b.data, dict) and b.data.get("ticket_hash") == ticket_hash:
-                return b.data
-        return None
+        return get_ticket_index(self.chain_file).lookup(ticket_hash)
+
+def _verify_blocks(blocks: Iterator[Block]) -> Optional[str]:
+    # Returns None when the chain is intact, otherwise a description of the first bad block
+    previous = None
+    for block in blocks:
+        if block.hash != block.compute_hash():
+            return f"block {block.index}: hash does not match its contents"
+        if previous is None:
+            if block.index != 0:
+                return f"block {block.index}: chain does not start at genesis"
+        elif block.index != previous.index + 1:
+            return f"block {block.index}: expected index {previous.index + 1}"
+        elif block.previous_hash != previous.hash:
+            return f"block {block.index}: previous_hash does not match block {previous.index}"
+        previous = block
+    if previous is None:
+        return "ledger is empty"
+    return None
+
+def verify_ledger(event_id: int, ledger_dir: str = LEDGER_DIR) -> Optional[str]:
+    # Read-only check of an event's ledger as it is on disk. Opening a SimpleChain instead would convert
+    # a legacy file, drop a torn final write and create a missing ledger.
+    chain_file = _chain_file(event_id, ledger_dir)
+    legacy_chain_file = os.path.join(ledger_dir, f"blockchain_event_{event_id}.json")
+    if not os.path.exists(chain_file):
+        if not os.path.exists(legacy_chain_file):
+            return "ledger file is missing"
+        try:
+            with open(legacy_chain_file, 'r') as f:
+                blocks = [Block(**block) for block in json.load(f)]
+        except (ValueError, TypeError) as e:
+            return f"legacy ledger is unreadable: {e}"
+        return _verify_blocks(iter(blocks))
+
+    blocks = []
+    with open(chain_file, 'rb') as f:
+        for number, line in enumerate(f, 1):
+            if not line.endswith(b"\n"):
+                return f"line {number}: final block is incomplete (torn write)"
+            if not line.strip():
+                continue
+            try:
+                blocks.append(Block(**json.loads(line)))
+            except (ValueError, TypeError) as e:
+                return f"line {number}: not a valid block: {e}"
+    return _verify_blocks(iter(blocks))
+
+def ledger_event_ids(ledger_dir: str = LEDGER_DIR) -> List[int]:
+    event_ids = set()
+    if os.path.exists(ledger_dir):
+        for name in os.listdir(ledger_dir):
+            match = re.fullmatch(r"blockchain_event_(\d+)\.jsonl?", name)
+            if match:
+                event_ids.add(int(match.group(1)))
+    return sorted(event_ids)
+
+def archive_ledger(event_id: int, ledger_dir: str = LEDGER_DIR) -> List[str]:
+    # Moves a deleted event's ledger into ledger_dir/archive with a timestamp suffix, keeping it for
+    # audit while it no longer counts as a live ledger. Returns the archived paths.
+    chain_file = _chain_file(event_id, ledger_dir)
+    base = os.path.splitext(chain_file)[0]
+    archive_dir = os.path.join(ledger_dir, "archive")
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    archived = []
+    with _ledger_lock(chain_file):
+        for path in (chain_file, base + ".json", base + ".json.migrated"):
+            if os.path.exists(path):
+                os.makedirs(archive_dir, exist_ok=True)
+                target = os.path.join(archive_dir, f"{os.path.basename(path)}.{stamp}")
+                os.replace(path, target)
+                archived.append(target)
+        # The .idx sidecar is rebuilt from the ledger whenever it is needed, so it is not kept
+        if os.path.exists(base + ".idx"):
+            os.remove(base + ".idx")
+        with _ticket_indexes_lock:
+            _forget_ticket_index(chain_file)
+    # The .lock file stays: a writer in another process may be waiting on it
+    return archived
+
+class LedgerWriter:
+    # Single background writer for all ledgers. Bookings queue their blocks and return at once;
+    # the writer drains the queue and gives each event's share of a batch one write and one fsync.
+    # Blocks whose write fails are kept and retried with backoff until they are written.
+    # creates_ledger(event_id) is asked, under the ledger lock, before a write would create a
+    # ledger that does not exist; returning False drops the blocks, e.g. for a deleted event
+    # whose ledger was archived.
+    def __init__(self, on_written: Optional[Callable[[List[Dict]], None]] = None,
+                 batch_size: int = LEDGER_BATCH_SIZE, flush_interval_ms: float = LEDGER_FLUSH_INTERVAL_MS,
+                 retry_seconds: float = LEDGER_RETRY_SECONDS, creates_ledger: Optional[Callable[[int], bool]] = None):
+        self.on_written = on_written
+        self.creates_ledger = creates_ledger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.retry_seconds = retry_seconds
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = object()
+        self._failed: List[Dict] = []
+        self._failed_lock = threading.Lock()
+        self._retry_at = 0.0
+        self._retry_delay = retry_seconds
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        # Writes everything already queued before returning
+        if self.running:
+            self._queue.put(self._stop)
+            self._thread.join()
+        self._thread = None
+
+    def submit(self, entry: Dict):
+        self.submit_many([entry])
+
+    def submit_many(self, entries: List[Dict]):
+        if self.running:
+            for entry in entries:
+                self._queue.put(entry)
+        else:
+            # No writer thread (scripts, maintenance commands): write in the caller
+            self.write(entries)
+
+    def flush(self):
+        self._queue.join()
+
+    def write_event(self, event_id: int) -> List[Dict]:
+        # Writes one event's queued and failed blocks in the caller, without waiting for the rest of
+        # the queue. Returns the entries whose write failed.
+        with self._queue.mutex:
+            queued = self._queue.queue
+            taken = [item for item in queued if item is not self._stop and item["event_id"] == event_id]
+            if taken:
+                self._queue.queue = type(queued)(
+                    item for item in queued if item is self._stop or item["event_id"] != event_id
+                )
+        for _ in taken:
+            self._queue.task_done()
+        with self._failed_lock:
+            taken += [entry for entry in self._failed if entry["event_id"] == event_id]
+            self._failed = [entry for entry in self._failed if entry["event_id"] != event_id]
+        return self.write(taken) if taken else []
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            if self._failed and time.monotonic() >= self._retry_at:
+                self._retry_failed()
+            try:
+                item = self._queue.get(timeout=max(0.0, self._retry_at - time.monotonic()) if self._failed else None)
+            except queue.Empty:
+                continue
+            if item is self._stop:
+                self._queue.task_done()
+                break
+            batch = [item]
+            # Linger briefly so bookings arriving together share a write
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is self._stop:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._defer(self.write(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        if self._failed:
+            # The bookings stay ledger-pending; recovery appends them after a restart
+            print(f"Ledger writer stopped with {len(self._failed)} blocks still failing; they are left pending.")
+
+    def _defer(self, failed: List[Dict]):
+        if failed:
+            with self._failed_lock:
+                if not self._failed:
+                    self._retry_at = time.monotonic() + self._retry_delay
+                self._failed.extend(failed)
+
+    def _retry_failed(self):
+        with self._failed_lock:
+            entries, self._failed = self._failed, []
+        failed = self.write(entries)
+        if failed:
+            self._retry_delay = min(self._retry_delay * 2, LEDGER_RETRY_MAX_SECONDS)
+            print(f"Retrying {len(failed)} ledger blocks in {self._retry_delay:g}s.")
+            self._defer(failed)
+        else:
+            self._retry_delay = self.retry_seconds
+
+    def write(self, entries: List[Dict]) -> List[Dict]:
+        # Returns the entries whose write failed; those bookings stay marked ledger-pending
+        by_event: Dict[int, List[Dict]] = {}
+        for entry in entries:
+            by_event.setdefault(entry["event_id"], []).append(entry)
+        failed = []
+        for event_id, event_entries in by_event.items():
+            try:
+                with timed("ledger", "group_commit"):
+                    written = self._write_event_blocks(event_id, event_entries)
+            except Exception as e:
+                print(f"Ledger write for event {event_id} failed for {len(event_entries)} blocks: {e}")
+                failed.extend(event_entries)
+                continue
+            if not written:
+                print(f"Dropped {len(event_entries)} ledger blocks for event {event_id}; its ledger was archived.")
+                continue
+            if self.on_written:
+                try:
+                    self.on_written(event_entries)
+                except Exception as e:
+                    print(f"Could not mark {len(event_entries)} ledger blocks for event {event_id} as written: {e}")
+        return failed
 
+    def _write_event_blocks(self, event_id: int, entries: List[Dict]) -> bool:
+        chain_file = _chain_file(event_id, LEDGER_DIR)
+        with _ledger_lock(chain_file):
+            if self.creates_ledger and not os.path.exists(chain_file) and not self.creates_ledger(event_id):
+                return False
+            # A failed write may still have reached the file, so never append a ticket twice
+            SimpleChain(event_id=event_id).add_blocks(entries, skip_written=True)
+        return True
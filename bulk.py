@@ -0,0 +1,333 @@
+# bulk.py
+import csv
+import json
+import os
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .cache import quote_cache, response_cache
+from .crud import bump_event_stats, write_ledger_entries
+from .search import index_events
+from .utils import gen_ticket_hash
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+# A CSV record whose quoted field is still open after this many characters is rejected
+IMPORT_MAX_RECORD_CHARS = int(os.getenv("IMPORT_MAX_RECORD_CHARS", str(1024 * 1024)))
+MAX_REPORTED_ERRORS = 1000
+
+class _LineQueue:
+    # Input for the parser's csv.reader, which is only asked for a record once all its lines are queued
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+class RecordParser:
+    # Turns NDJSON or CSV input into dicts as lines arrive, so uploads can be streamed.
+    # CSV goes through a single csv.reader; lines are held back until the quotes balance,
+    # so quoted fields may contain newlines.
+    def __init__(self, fmt: str, report: schemas.ImportReport):
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError(f"Unsupported import format: {fmt}")
+        self.fmt = fmt
+        self.report = report
+        self.header: Optional[List[str]] = None
+        self.row = 0
+        self._record_row = 0
+        self._lines = _LineQueue()
+        self._reader = csv.reader(self._lines)
+        self._quotes = 0
+        self._chars = 0
+
+    def feed(self, line) -> Optional[Tuple[int, Dict]]:
+        # Returns (row number of the record's first line, record), or None for blank, header,
+        # unparseable and incomplete input
+        self.row += 1
+        if not self._lines.lines:
+            self._record_row = self.row
+        try:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            record = self.parse(line)
+        except ValueError as e:
+            self._discard()
+            _fail(self.report, self._record_row, str(e))
+            return None
+        return (self._record_row, record) if record is not None else None
+
+    def finish(self):
+        # Call once the input ends; reports a CSV record left open by a missing closing quote
+        if self._lines.lines:
+            self._discard()
+            _fail(self.report, self._record_row, "Unterminated quoted field")
+
+    def parse(self, line: str) -> Optional[Dict]:
+        if self.fmt == "csv":
+            return self._parse_csv(line)
+        if not line.strip():
+            return None
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if not isinstance(record, dict):
+            raise ValueError("Each line must be a JSON object")
+        return record
+
+    def _parse_csv(self, line: str) -> Optional[Dict]:
+        if not self._lines.lines and not line.strip():
+            return None
+        if not line.endswith("\n"):
+            line += "\n"
+        self._lines.lines.append(line)
+        self._quotes += line.count('"')
+        self._chars += len(line)
+        if self._quotes % 2:
+            # Inside a quoted field; the record continues on the next line
+            if self._chars > IMPORT_MAX_RECORD_CHARS:
+                raise ValueError("Unterminated quoted field")
+            return None
+        try:
+            values = next(self._reader)
+        except csv.Error as e:
+            raise ValueError(f"Invalid CSV: {e}")
+        finally:
+            self._discard()
+        if self.header is None:
+            self.header = [name.strip() for name in values]
+            return None
+        if len(values) != len(self.header):
+            raise ValueError(f"Expected {len(self.header)} columns, got {len(values)}")
+        return {name: value for name, value in zip(self.header, values) if value != ""}
+
+    def _discard(self):
+        self._lines.lines.clear()
+        self._quotes = self._chars = 0
+
+def format_for(name: Optional[str]) -> str:
+    # Accepts a content type or a file name
+    return "csv" if name and "csv" in name.lower() else "ndjson"
+
+def _fail(report: schemas.ImportReport, row: int, error: str):
+    report.failed += 1
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append(schemas.ImportRowError(row=row, error=error))
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+def _rejection(e: Exception) -> str:
+    return str(e) if isinstance(e, ValueError) else f"Rejected by the database: {e.__class__.__name__}"
+
+def _insert_rows(db: Session, rows: List[Tuple], insert_fn, report: schemas.ImportReport) -> List[Dict]:
+    # Inserts the chunk in one transaction; if the database rejects it, retries row by row so
+    # one bad record only fails itself. Returns whatever insert_fn collected for the inserted rows.
+    try:
+        results = insert_fn(db, rows)
+        report.inserted += len(rows)
+        return results
+    except Exception as e:
+        db.rollback()
+        if len(rows) == 1:
+            _fail(report, rows[0][0], _rejection(e))
+            return []
+    results = []
+    for item in rows:
+        try:
+            results.extend(insert_fn(db, [item]))
+        except Exception as e:
+            db.rollback()
+            _fail(report, item[0], _rejection(e))
+            continue
+        report.inserted += 1
+    return results
+
+def import_event_chunk(db: Session, chunk: List[Tuple[int, Dict]], report: schemas.ImportReport):
+    known_sponsor_ids = None
+    rows = []
+    for row, record in chunk:
+        # CSV carries tiers as a JSON array and sponsor ids separated by ';'
+        if isinstance(record.get("tiers"), str):
+            try:
+                record["tiers"] = json.loads(record["tiers"])
+            except json.JSONDecodeError:
+                _fail(report, row, "tiers: must be a JSON array")
+                continue
+        if isinstance(record.get("sponsor_ids"), str):
+            record["sponsor_ids"] = [part for part in record["sponsor_ids"].split(";") if part.strip()]
+        try:
+            ev = schemas.EventCreate(**record)
+        except ValidationError as e:
+            _fail(report, row, _validation_message(e))
+            continue
+        if ev.sponsor_ids:
+            if known_sponsor_ids is None:
+                known_sponsor_ids = set(db.scalars(select(models.Sponsor.id)).all())
+            missing = set(ev.sponsor_ids) - known_sponsor_ids
+            if missing:
+                _fail(report, row, f"Unknown sponsor ids: {sorted(missing)}")
+                continue
+        rows.append((row, ev))
+    if not rows:
+        return
+
+    inserted = report.inserted
+    _insert_rows(db, rows, _insert_events, report)
+    if report.inserted > inserted:
+        response_cache.bump("events")
+
+def _insert_events(db: Session, rows: List[Tuple[int, schemas.EventCreate]]) -> List[Dict]:
+    event_ids = db.scalars(
+        insert(models.Event).returning(models.Event.id, sort_by_parameter_order=True),
+        [ev.dict(exclude={"tiers", "sponsor_ids"}) for _, ev in rows]
+    ).all()
+    db.execute(insert(models.EventStats), [{"event_id": event_id} for event_id in event_ids])
+    tier_rows = [
+        dict(tier.dict(), event_id=event_id, seats_sold=0)
+        for event_id, (_, ev) in zip(event_ids, rows) for tier in ev.tiers
+    ]
+    if tier_rows:
+        db.execute(insert(models.Tier), tier_rows)
+    sponsor_rows = [
+        {"event_id": event_id, "sponsor_id": sponsor_id}
+        for event_id, (_, ev) in zip(event_ids, rows) for sponsor_id in set(ev.sponsor_ids)
+    ]
+    if sponsor_rows:
+        db.execute(insert(models.event_sponsor_association), sponsor_rows)
+    index_events(db, [
+        {"id": event_id, "title": ev.title, "description": ev.description, "location": ev.location}
+        for event_id, (_, ev) in zip(event_ids, rows)
+    ])
+    db.commit()
+    return []
+
+def import_booking_chunk(db: Session, chunk: List[Tuple[int, Dict]], report: schemas.ImportReport):
+    rows = []
+    for row, record in chunk:
+        try:
+            rows.append((row, schemas.HistoricalBooking(**record)))
+        except ValidationError as e:
+            _fail(report, row, _validation_message(e))
+    if not rows:
+        return
+
+    # Tiers of soft-deleted events count as missing, as in book_ticket
+    tiers = {
+        tier.id: tier for tier in db.query(models.Tier).join(models.Tier.event).filter(
+            models.Tier.id.in_({b.tier_id for _, b in rows}), models.Event.deleted_at.is_(None)
+        ).all()
+    }
+    given_hashes = [b.ticket_hash for _, b in rows if b.ticket_hash]
+    taken_hashes = set(db.scalars(
+        select(models.Booking.ticket_hash).where(models.Booking.ticket_hash.in_(given_hashes))
+    ).all()) if given_hashes else set()
+
+    accepted, qty_by_tier = [], {}
+    for row, b in rows:
+        tier = tiers.get(b.tier_id)
+        if tier is None:
+            _fail(report, row, "Tier not found")
+        elif b.ticket_hash and b.ticket_hash in taken_hashes:
+            _fail(report, row, "Duplicate ticket_hash")
+        elif tier.seats_sold + tier.seats_held + qty_by_tier.get(tier.id, 0) + b.qty > tier.total_seats:
+            _fail(report, row, "Not enough tickets available in this tier")
+        else:
+            if b.ticket_hash:
+                taken_hashes.add(b.ticket_hash)
+            qty_by_tier[tier.id] = qty_by_tier.get(tier.id, 0) + b.qty
+            # Plain values, since a rollback during the per-row retry expires the loaded tiers
+            accepted.append((row, b, {"id": tier.id, "event_id": tier.event_id, "name": tier.name}))
+    if not accepted:
+        db.rollback()
+        return
+
+    ledger_entries = _insert_rows(db, accepted, _insert_bookings, report)
+    if not ledger_entries:
+        return
+    response_cache.bump("events")
+    for event_id in {entry["event_id"] for entry in ledger_entries}:
+        quote_cache.invalidate_event(event_id)
+    # Queued behind the app's ledger writer, or written here when it isn't running; a failed
+    # write leaves the bookings ledger-pending for the next recovery pass
+    write_ledger_entries(ledger_entries)
+
+def _insert_bookings(db: Session, rows: List[Tuple[int, schemas.HistoricalBooking, Dict]]) -> List[Dict]:
+    phones = {b.user_phone for _, b, _ in rows}
+    user_ids = dict(db.query(models.User.phone, models.User.id).filter(models.User.phone.in_(phones)).all())
+    new_phones = sorted(phones - set(user_ids))
+    if new_phones:
+        new_ids = db.scalars(
+            insert(models.User).returning(models.User.id, sort_by_parameter_order=True),
+            [{"name": f"User {phone}", "phone": phone} for phone in new_phones]
+        ).all()
+        user_ids.update(zip(new_phones, new_ids))
+
+    # Same conditional increment as book_ticket, once per tier for the whole chunk. It also requires the
+    # event to still be live, in case it was deleted after the tiers were read.
+    live_events = select(models.Event.id).where(models.Event.deleted_at.is_(None))
+    qty_by_tier = {}
+    for _, b, tier in rows:
+        qty_by_tier[tier["id"]] = qty_by_tier.get(tier["id"], 0) + b.qty
+    for tier_id, qty in qty_by_tier.items():
+        reserved = db.query(models.Tier).filter(
+            models.Tier.id == tier_id,
+            models.Tier.event_id.in_(live_events),
+            models.Tier.seats_sold + models.Tier.seats_held + qty <= models.Tier.total_seats
+        ).update({models.Tier.seats_sold: models.Tier.seats_sold + qty}, synchronize_session=False)
+        if not reserved:
+            raise ValueError(f"Tier {tier_id} sold out or its event was deleted during import")
+
+    booking_rows, ledger_entries, stats = [], [], {}
+    for _, b, tier in rows:
+        created_at = b.created_at or datetime.utcnow()
+        ticket_hash = b.ticket_hash or gen_ticket_hash(b.user_phone, tier["event_id"], created_at.isoformat())
+        booking_rows.append({
+            "user_id": user_ids[b.user_phone],
+            "event_id": tier["event_id"],
+            "tier_id": tier["id"],
+            "qty": b.qty,
+            "price_paid": b.price_paid,
+            "ticket_hash": ticket_hash,
+            "created_at": created_at,
+            "verified": b.verified,
+            "ledger_pending": True,
+        })
+        ledger_entries.append(
+            {"ticket_hash": ticket_hash, "user_phone": b.user_phone, "event_id": tier["event_id"], "tier": tier["name"]}
+        )
+        totals = stats.setdefault(tier["event_id"], [0.0, 0])
+        totals[0] += b.price_paid
+        totals[1] += 1
+    db.execute(insert(models.Booking), booking_rows)
+    for event_id, (total_collection, booking_count) in stats.items():
+        bump_event_stats(db, event_id, total_collection=total_collection, booking_count=booking_count)
+    db.commit()
+    return ledger_entries
+
+def import_lines(db: Session, lines: Iterable[str], fmt: str, chunk_fn, chunk_size: int = IMPORT_CHUNK_SIZE) -> schemas.ImportReport:
+    report = schemas.ImportReport()
+    parser = RecordParser(fmt, report)
+    chunk = []
+    for line in lines:
+        item = parser.feed(line)
+        if item is not None:
+            chunk.append(item)
+        if len(chunk) >= chunk_size:
+            chunk_fn(db, chunk, report)
+            chunk = []
+    parser.finish()
+    if chunk:
+        chunk_fn(db, chunk, report)
+    return report
@@ -0,0 +1,215 @@
+# cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "4096"))
+QUOTE_CACHE_TTL = int(os.getenv("QUOTE_CACHE_TTL", "60"))
+
+class QuoteCache:
+    """LRU cache of price quotes keyed on (tier_id, qty, time bucket).
+
+    Every invalidate_event advances a generation counter and records it for the event. A quote is
+    stored with the generation read before its tier was loaded and is discarded once its event has
+    been invalidated since, including by a booking that raced the pricing of the quote itself.
+    The time bucket bounds staleness from the hours-to-event feature and from bookings made by other workers.
+    """
+
+    def __init__(self, maxsize: int = QUOTE_CACHE_SIZE, ttl: int = QUOTE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._generation = 0
+        # event_id -> generation of its latest invalidation, least recently invalidated first. Only
+        # maxsize events are remembered; the rest count as invalidated at _forgotten_generation,
+        # which can only discard quotes early, never keep a stale one.
+        self._invalidated = OrderedDict()
+        self._forgotten_generation = 0
+        self._lock = threading.Lock()
+
+    def _key(self, tier_id: int, qty: int):
+        return (tier_id, qty, int(time.time() // self.ttl))
+
+    def _is_stale(self, event_id: int, generation: int) -> bool:
+        return generation < self._invalidated.get(event_id, self._forgotten_generation)
+
+    def generation(self) -> int:
+        # Read before loading the tier being priced, and pass the value to put()
+        with self._lock:
+            return self._generation
+
+    def get(self, tier_id: int, qty: int):
+        with self._lock:
+            key = self._key(tier_id, qty)
+            entry = self._entries.get(key)
+            if entry is not None:
+                quote, event_id, generation = entry
+                if not self._is_stale(event_id, generation):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return quote
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, tier_id: int, event_id: int, qty: int, quote, generation: int):
+        with self._lock:
+            if self._is_stale(event_id, generation):
+                return
+            key = self._key(tier_id, qty)
+            self._entries[key] = (quote, event_id, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_event(self, event_id: int):
+        with self._lock:
+            self._generation += 1
+            self._invalidated[event_id] = self._generation
+            self._invalidated.move_to_end(event_id)
+            while len(self._invalidated) > self.maxsize:
+                _, generation = self._invalidated.popitem(last=False)
+                self._forgotten_generation = max(self._forgotten_generation, generation)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidated.clear()
+            self._forgotten_generation = self._generation
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+quote_cache = QuoteCache()
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", "cache")
+
+class ResponseCache:
+    """Serialized listing responses keyed on a generation that writers bump.
+
+    Each generation is the mtime of a marker file, so a write in one worker process
+    invalidates every worker's cache and ETags agree across workers.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, directory: str = RESPONSE_CACHE_DIR):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _marker(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.generation")
+
+    def generation(self, name: str) -> int:
+        try:
+            return os.stat(self._marker(name)).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def bump(self, *names: str):
+        os.makedirs(self.directory, exist_ok=True)
+        for name in names:
+            marker = self._marker(name)
+            if not os.path.exists(marker):
+                open(marker, 'a').close()
+            # Strictly increasing even if the clock has not ticked since the last bump
+            generation = max(time.time_ns(), self.generation(name) + 1)
+            os.utime(marker, ns=(generation, generation))
+
+    def etag(self, name: str, *params) -> str:
+        digest = hashlib.sha1(repr(params).encode()).hexdigest()[:12]
+        return f'W/"{name}-{self.generation(name)}-{digest}"'
+
+    def is_not_modified(self, etag: str, if_none_match) -> bool:
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            with self._lock:
+                self.not_modified += 1
+            return True
+        return False
+
+    def get(self, etag: str):
+        with self._lock:
+            body = self._entries.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: bytes):
+        with self._lock:
+            self._entries[etag] = body
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses + self.not_modified
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_rate": (self.hits + self.not_modified) / requests if requests else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+response_cache = ResponseCache()
+
+SEAT_COUNTER_TTL = float(os.getenv("SEAT_COUNTER_TTL", "1"))
+
+class SeatCounter:
+    """Free seats per tier (total - sold - held) as last seen by this process's own writes.
+
+    A hold or booking asking for more seats than a fresh entry shows is refused without touching the
+    tier row, which is what a sold-out tier takes the brunt of during a flash sale. Seats freed by
+    other workers become visible once the entry is older than the ttl; 0 turns the counter off.
+    """
+
+    def __init__(self, ttl: float = SEAT_COUNTER_TTL):
+        self.ttl = ttl
+        self._free = {}
+        self._lock = threading.Lock()
+
+    def can_fit(self, tier_id: int, qty: int) -> bool:
+        with self._lock:
+            entry = self._free.get(tier_id)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                return True
+            return qty <= entry[0]
+
+    def set(self, tier_id: int, free: int):
+        with self._lock:
+            self._free[tier_id] = (free, time.monotonic())
+
+    def release(self, tier_id: int, qty: int):
+        with self._lock:
+            entry = self._free.get(tier_id)
+            if entry is not None:
+                self._free[tier_id] = (entry[0] + qty, entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+
+seat_counter = SeatCounter()
@@ -1,30 +1,52 @@
-from sqlalchemy.orm import Session, joinedload, subqueryload
-from sqlalchemy import func
-from datetime import datetime
-from passlib.context import CryptContext
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from sqlalchemy import and_, delete, func, insert, inspect, select, text, tuple_, update
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+import os
 
 # Corrected relative imports
 from . import models, schemas
-from .utils import gen_ticket_hash
-from .ml_pricing import load_model, predict_price
-from .blockchain import SimpleChain
+from .utils import gen_hold_token, gen_ticket_hash, encode_cursor, decode_cursor, decode_sort_cursor
+from .ml_pricing import get_model, predict_price
+from .blockchain import LedgerWriter, SimpleChain, archive_ledger, ledger_lock, lookup_ticket
+from .database import SessionLocal
+from .cache import quote_cache, response_cache, seat_counter
+from .search import index_events, text_filter, unindex_events
+from .metrics import timed
 
-model = load_model()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    # passlib and bcrypt load on first use instead of on every worker start
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def get_or_create_user_by_phone(db: Session, phone: str):
+def get_or_create_user_by_phone(db: Session, phone: str, commit: bool = True):
+    # With commit=False the new user is only flushed, so callers can keep it in their own transaction
     user = db.query(models.User).filter(models.User.phone == phone).first()
     if user:
         return user
     new_user = models.User(name=f"User {phone}", phone=phone)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Another request created the same phone first
+        db.rollback()
+        return db.query(models.User).filter(models.User.phone == phone).one()
+    if commit:
+        db.commit()
+        db.refresh(new_user)
     return new_user
 
 def create_event(db: Session, ev: schemas.EventCreate):
     event_data = ev.dict(exclude={"tiers", "sponsor_ids"})
     new_event = models.Event(**event_data)
+    new_event.stats = models.EventStats()
     
     for tier_data in ev.tiers:
         new_tier = models.Tier(**tier_data.dict(), event=new_event)
@@ -35,149 +57,849 @@ def create_event(db: Session, ev: schemas.EventCreate):
         new_event.sponsors.extend(sponsors)
 
     db.add(new_event)
+    db.flush()
+    index_events(db, [{"id": new_event.id, **event_data}])
     db.commit()
     db.refresh(new_event)
+    response_cache.bump("events")
     return new_event
 
-def list_events(db: Session, skip=0, limit=50):
-    events = db.query(models.Event).options(
-        subqueryload(models.Event.tiers),
-        subqueryload(models.Event.sponsors)
-    ).offset(skip).limit(limit).all()
-    
-    event_details = []
-    for event in events:
-        total_collection = db.query(func.sum(models.Booking.price_paid)).filter(models.Booking.event_id == event.id).scalar() or 0.0
-        average_rating = db.query(func.avg(models.Rating.rating)).filter(models.Rating.event_id == event.id).scalar()
-        event_detail = schemas.EventDetail(
-            **event.__dict__,
-            total_collection=total_collection,
-            average_rating=average_rating
-        )
-        event_details.append(event_detail)
-    return event_details
+def _event_rows_query(db: Session):
+    # Column rows rather than ORM objects; _event_page builds the response dicts from them
+    return db.query(
+        models.Event.id, models.Event.title, models.Event.description, models.Event.location,
+        models.Event.start_time, models.Event.end_time, models.EventStats.total_collection,
+        models.EventStats.rating_sum, models.EventStats.rating_count
+    ).outerjoin(models.EventStats, models.EventStats.event_id == models.Event.id).filter(models.Event.deleted_at.is_(None))
+
+def list_events(db: Session, cursor=None, limit=50):
+    return _event_page(_event_rows_query(db), cursor, limit, "list_events")
+
+def search_events(db: Session, q=None, start_from=None, start_to=None, end_from=None, end_to=None,
+                  sponsor_id=None, min_price=None, max_price=None, cursor=None, limit=50):
+    query = _event_rows_query(db)
+    if q:
+        match = text_filter(db, q)
+        if match is not None:
+            query = query.filter(match)
+    if start_from is not None:
+        query = query.filter(models.Event.start_time >= start_from)
+    if start_to is not None:
+        query = query.filter(models.Event.start_time <= start_to)
+    if end_from is not None:
+        query = query.filter(models.Event.end_time >= end_from)
+    if end_to is not None:
+        query = query.filter(models.Event.end_time <= end_to)
+    if sponsor_id is not None:
+        query = query.filter(models.Event.sponsors.any(models.Sponsor.id == sponsor_id))
+    if min_price is not None or max_price is not None:
+        # Matches events with at least one tier in the range
+        price_filters = []
+        if min_price is not None:
+            price_filters.append(models.Tier.price >= min_price)
+        if max_price is not None:
+            price_filters.append(models.Tier.price <= max_price)
+        query = query.filter(models.Event.tiers.any(and_(*price_filters)))
+    return _event_page(query, cursor, limit, "search_events", by_start_time=True)
+
+def _event_page(query, cursor, limit, operation, by_start_time=False):
+    # Keyset pages by id, or by (start_time, id) for search, where the start_time index then serves
+    # both the date filter and the order and the query stops after one page
+    if by_start_time:
+        if cursor:
+            last_start, last_id = decode_sort_cursor(cursor, "start_time")
+            try:
+                last_start = datetime.fromisoformat(last_start)
+            except (TypeError, ValueError):
+                raise ValueError("Invalid pagination cursor")
+            query = query.filter(tuple_(models.Event.start_time, models.Event.id) > tuple_(last_start, last_id))
+        query = query.order_by(models.Event.start_time, models.Event.id)
+    else:
+        if cursor:
+            query = query.filter(models.Event.id > decode_cursor(cursor))
+        query = query.order_by(models.Event.id)
+    # Fetch one extra row to learn whether another page exists
+    with timed(operation, "query"):
+        events = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(events) > limit:
+            last = events[limit - 1]
+            next_cursor = encode_cursor(last.id, start_time=last.start_time.isoformat()) if by_start_time else encode_cursor(last.id)
+        events = events[:limit]
+        tiers, sponsors = _event_children(query.session, [event.id for event in events])
+
+    # Keys follow schemas.EventDetail, so the page serializes exactly as an EventPage would
+    with timed(operation, "build_response"):
+        items = [{
+            "title": event.title,
+            "description": event.description,
+            "location": event.location,
+            "start_time": event.start_time,
+            "end_time": event.end_time,
+            "id": event.id,
+            "tiers": tiers[event.id],
+            "sponsors": sponsors[event.id],
+            "total_collection": event.total_collection or 0.0,
+            "average_rating": event.rating_sum / event.rating_count if event.rating_count else None,
+        } for event in events]
+    return {"items": items, "next_cursor": next_cursor}
+
+def _event_children(db: Session, event_ids):
+    # Tiers and sponsors for a page of events as schemas.Tier / schemas.Sponsor shaped dicts
+    tiers = {event_id: [] for event_id in event_ids}
+    sponsors = {event_id: [] for event_id in event_ids}
+    if not event_ids:
+        return tiers, sponsors
+    tier_rows = db.query(
+        models.Tier.event_id, models.Tier.name, models.Tier.price, models.Tier.total_seats, models.Tier.id,
+        models.Tier.seats_sold, models.Tier.seats_held
+    ).filter(models.Tier.event_id.in_(event_ids)).order_by(models.Tier.id)
+    for event_id, name, price, total_seats, tier_id, seats_sold, seats_held in tier_rows:
+        tiers[event_id].append({
+            "name": name, "price": price, "total_seats": total_seats, "id": tier_id, "seats_sold": seats_sold, "seats_held": seats_held
+        })
+    association = models.event_sponsor_association
+    sponsor_rows = db.query(
+        association.c.event_id, models.Sponsor.name, models.Sponsor.website, models.Sponsor.logo_url, models.Sponsor.id
+    ).join(models.Sponsor, models.Sponsor.id == association.c.sponsor_id).filter(association.c.event_id.in_(event_ids))
+    for event_id, name, website, logo_url, sponsor_id in sponsor_rows:
+        sponsors[event_id].append({"name": name, "website": website, "logo_url": logo_url, "id": sponsor_id})
+    return tiers, sponsors
+
+def bump_event_stats(db: Session, event_id: int, **deltas):
+    # Relative UPDATE so concurrent writers never lose each other's increments. Call once the change
+    # is in the session: an event with no stats row yet (e.g. created before the table existed) is
+    # seeded from its bookings and ratings, which then already include the change.
+    values = {getattr(models.EventStats, name): getattr(models.EventStats, name) + delta for name, delta in deltas.items()}
+    stats = db.query(models.EventStats).filter(models.EventStats.event_id == event_id)
+    if stats.update(values, synchronize_session=False):
+        return
+    db.flush()
+    if _seed_event_stats(db, _event_stats_select().where(models.Event.id == event_id)):
+        return
+    # Another writer seeded the row first, from data without this change
+    stats.update(values, synchronize_session=False)
+
+_EVENT_STATS_COLUMNS = ["event_id", "total_collection", "booking_count", "rating_sum", "rating_count"]
+
+def _event_stats_select():
+    # One row per event, in _EVENT_STATS_COLUMNS order, aggregated from bookings and ratings
+    booking_subq = select(
+        models.Booking.event_id,
+        func.sum(models.Booking.price_paid).label("total_collection"),
+        func.count(models.Booking.id).label("booking_count")
+    ).group_by(models.Booking.event_id).subquery()
+    rating_subq = select(
+        models.Rating.event_id,
+        func.sum(models.Rating.rating).label("rating_sum"),
+        func.count(models.Rating.id).label("rating_count")
+    ).group_by(models.Rating.event_id).subquery()
+    return select(
+        models.Event.id,
+        func.coalesce(booking_subq.c.total_collection, 0.0),
+        func.coalesce(booking_subq.c.booking_count, 0),
+        func.coalesce(rating_subq.c.rating_sum, 0),
+        func.coalesce(rating_subq.c.rating_count, 0)
+    ).outerjoin(
+        booking_subq, booking_subq.c.event_id == models.Event.id
+    ).outerjoin(
+        rating_subq, rating_subq.c.event_id == models.Event.id
+    )
+
+def _seed_event_stats(db: Session, stats_select) -> int:
+    # INSERT ... SELECT that skips events whose row another writer inserted first. The select needs a
+    # WHERE clause: SQLite cannot otherwise tell the SELECT from the ON CONFLICT clause.
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql_insert(models.EventStats).from_select(_EVENT_STATS_COLUMNS, stats_select).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(models.EventStats).from_select(_EVENT_STATS_COLUMNS, stats_select).on_conflict_do_nothing()
+    else:
+        stmt = insert(models.EventStats).from_select(_EVENT_STATS_COLUMNS, stats_select)
+    return db.execute(stmt).rowcount
+
+def seed_missing_event_stats(db: Session) -> int:
+    # Gives every event without a stats row one computed from its bookings and ratings, e.g. after
+    # the event_stats table was added to an existing database
+    missing = _event_stats_select().where(
+        ~select(models.EventStats.event_id).where(models.EventStats.event_id == models.Event.id).exists()
+    )
+    seeded = _seed_event_stats(db, missing)
+    db.commit()
+    if seeded:
+        response_cache.bump("events")
+    return seeded
+
+def create_missing_columns(db: Session):
+    # create_all never alters existing tables; add columns declared since the database was created that
+    # are nullable or have a server default to fill existing rows
+    bind = db.get_bind()
+    preparer = bind.dialect.identifier_preparer
+    added = []
+    for table in models.Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspect(bind).get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and (column.nullable or column.server_default is not None):
+                db.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {CreateColumn(column).compile(dialect=bind.dialect)}"))
+                added.append(f"{table.name}.{column.name}")
+    db.commit()
+    return added
+
+def create_missing_indexes(db: Session):
+    # create_all only builds indexes with new tables; add any declared since an existing database was created
+    bind = db.get_bind()
+    # Keep each user's latest rating so the unique ratings index can be built
+    keep_ids = select(func.max(models.Rating.id)).group_by(models.Rating.event_id, models.Rating.user_id)
+    removed = db.query(models.Rating).filter(models.Rating.id.not_in(keep_ids)).delete(synchronize_session=False)
+    # Collapse repeated sponsor links to one row each so the unique event_sponsor index can be built
+    links = models.event_sponsor_association
+    duplicate_links = db.execute(
+        select(links.c.event_id, links.c.sponsor_id).where(
+            links.c.event_id.is_not(None), links.c.sponsor_id.is_not(None)
+        ).group_by(links.c.event_id, links.c.sponsor_id).having(func.count() > 1)
+    ).all()
+    for event_id, sponsor_id in duplicate_links:
+        db.execute(links.delete().where(links.c.event_id == event_id, links.c.sponsor_id == sponsor_id))
+        db.execute(links.insert().values(event_id=event_id, sponsor_id=sponsor_id))
+    db.commit()
+    if removed:
+        rebuild_event_stats(db)
+    elif duplicate_links:
+        response_cache.bump("events")
+    created = []
+    for table in models.Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspect(bind).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=bind)
+                created.append(index.name)
+    return created
+
+def rebuild_event_stats(db: Session):
+    db.query(models.EventStats).delete(synchronize_session=False)
+    result = db.execute(insert(models.EventStats).from_select(_EVENT_STATS_COLUMNS, _event_stats_select()))
+    db.commit()
+    response_cache.bump("events")
+    return result.rowcount
+
+# Rows removed per DELETE statement when purging an event; each batch commits on its own
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "5000"))
+
+def mark_event_deleted(db: Session, event_id: int) -> bool:
+    # Hides the event from listings, search, pricing and booking in one small write; its rows
+    # stay until purge_event removes them
+    updated = db.query(models.Event).filter(
+        models.Event.id == event_id, models.Event.deleted_at.is_(None)
+    ).update({models.Event.deleted_at: datetime.utcnow()}, synchronize_session=False)
+    if not updated:
+        return False
+    unindex_events(db, [event_id])
+    db.commit()
+    quote_cache.invalidate_event(event_id)
+    response_cache.bump("events")
+    return True
+
+def _delete_in_batches(db: Session, model, condition) -> int:
+    # DELETE ... WHERE id IN (SELECT id ... LIMIT n): nothing is loaded into the session and no
+    # single transaction holds the write lock for the whole event
+    deleted = 0
+    while True:
+        batch = select(model.id).where(condition).limit(DELETE_BATCH_SIZE).scalar_subquery()
+        count = db.execute(delete(model).where(model.id.in_(batch)).execution_options(synchronize_session=False)).rowcount
+        db.commit()
+        deleted += count
+        if count < DELETE_BATCH_SIZE:
+            return deleted
+
+def purge_event_rows(db: Session, event_id: int):
+    # Children before parents, so an interrupted purge leaves no dangling references and can be rerun
+    counts = {}
+    for model in (models.Booking, models.SeatHold, models.Rating, models.Service, models.Tier):
+        counts[model.__tablename__] = _delete_in_batches(db, model, model.event_id == event_id)
+    db.execute(delete(models.event_sponsor_association).where(models.event_sponsor_association.c.event_id == event_id))
+    db.execute(delete(models.EventStats).where(models.EventStats.event_id == event_id))
+    db.execute(delete(models.Event).where(models.Event.id == event_id))
+    db.commit()
+    return counts
+
+def archive_event_ledger(event_id: int):
+    # Under the ledger lock, this worker's queued blocks for the event are written first; a writer
+    # that gets the lock afterwards finds no ledger and a deleted event, and drops its blocks
+    with ledger_lock(event_id):
+        ledger_writer.write_event(event_id)
+        return archive_ledger(event_id)
+
+def purge_event(db: Session, event_id: int):
+    counts = purge_event_rows(db, event_id)
+    archive_event_ledger(event_id)
+    return counts
 
 def delete_event(db: Session, event_id: int):
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
-    if not event:
+    if not mark_event_deleted(db, event_id):
         return None
-    db.delete(event)
-    db.commit()
-    return event
+    return purge_event(db, event_id)
 
-def compute_dynamic_price(tier: models.Tier, qty: int):
-    event = tier.event
-    total_tickets_sold_in_event = sum(t.seats_sold for t in event.tiers)
-    hours_to_event = max((event.start_time - datetime.utcnow()).total_seconds() / 3600.0, 0.1)
-    base_price = tier.price
-    
-    predicted_price_per_ticket = predict_price(model, total_tickets_sold_in_event + qty, hours_to_event, base_price)
-    
-    min_price = base_price 
+def purge_deleted_events(db: Session) -> list:
+    # Finishes soft deletes, including any a previous run left unpurged
+    event_ids = db.scalars(select(models.Event.id).where(models.Event.deleted_at.is_not(None))).all()
+    for event_id in event_ids:
+        purge_event(db, event_id)
+    return event_ids
+
+def purge_event_job(event_id=None):
+    # Background entry point with its own session: purges one event, or every soft-deleted event
+    db = SessionLocal()
+    try:
+        if event_id is None:
+            return purge_deleted_events(db)
+        return purge_event(db, event_id)
+    finally:
+        db.close()
+
+MAX_BATCH_QUOTES = 1000
+
+def compute_dynamic_prices(tiers, qtys):
+    # Scores every (tier, qty) row with a single model call; tier.event.tiers must be loaded
+    now = datetime.utcnow()
+    sold_by_event = {}
+    tickets_booked, hours_to_event = [], []
+    for tier in tiers:
+        event = tier.event
+        if event.id not in sold_by_event:
+            sold_by_event[event.id] = sum(t.seats_sold for t in event.tiers)
+        tickets_booked.append(sold_by_event[event.id])
+        hours_to_event.append(max((event.start_time - now).total_seconds() / 3600.0, 0.1))
+
+    qtys = np.asarray(qtys, dtype=np.float64)
+    base_price = np.array([tier.price for tier in tiers], dtype=np.float64)
+    model = get_model()
+    if model is None:
+        # Pricing model still loading: sell at base price rather than block the request
+        predicted_price_per_ticket = base_price
+    else:
+        with timed("compute_dynamic_prices", "model_inference"):
+            predicted_price_per_ticket = predict_price(model, np.array(tickets_booked) + qtys, np.array(hours_to_event), base_price)
+
+    min_price = base_price
     max_price = base_price * 1.5
-    capped_price = max(min_price, min(predicted_price_per_ticket, max_price))
-    
-    return capped_price * qty
+    capped_price = np.minimum(np.maximum(predicted_price_per_ticket, min_price), max_price)
+
+    return capped_price * qtys
+
+def compute_dynamic_price(tier: models.Tier, qty: int):
+    return float(compute_dynamic_prices([tier], [qty])[0])
 
 def get_dynamic_price(db: Session, price_request: schemas.PriceRequest):
-    tier = db.query(models.Tier).filter(models.Tier.id == price_request.tier_id).first()
+    if price_request.qty < 1:
+        raise ValueError("Quantity must be at least 1")
+    cached = quote_cache.get(price_request.tier_id, price_request.qty)
+    if cached is not None:
+        return cached
+    # Taken before the tier is read, so a booking that lands while this quote is priced keeps it out of the cache
+    generation = quote_cache.generation()
+
+    with timed("get_dynamic_price", "tier_query"):
+        tier = db.query(models.Tier).join(models.Tier.event).filter(
+            models.Tier.id == price_request.tier_id, models.Event.deleted_at.is_(None)
+        ).first()
     if not tier:
         raise ValueError("Tier not found")
     
-    price = compute_dynamic_price(tier, price_request.qty)
+    with timed("get_dynamic_price", "pricing"):
+        price = compute_dynamic_price(tier, price_request.qty)
     
-    return schemas.PriceResponse(
+    quote = schemas.PriceResponse(
         dynamic_price=price,
         base_price=tier.price * price_request.qty,
         quantity=price_request.qty
     )
+    if get_model() is not None:
+        quote_cache.put(tier.id, tier.event_id, price_request.qty, quote, generation)
+    return quote
 
-def book_ticket(db: Session, b: schemas.BookingCreate):
-    user_obj = get_or_create_user_by_phone(db, phone=b.user_phone)
-    
-    tier = db.query(models.Tier).options(joinedload(models.Tier.event)).filter(models.Tier.id == b.tier_id).first()
-    if not tier:
+def get_dynamic_prices(db: Session, batch: schemas.BatchPriceRequest):
+    tier_query = db.query(models.Tier).join(models.Tier.event).filter(models.Event.deleted_at.is_(None)).options(
+        contains_eager(models.Tier.event).selectinload(models.Event.tiers)
+    )
+    batch_limit_error = f"A batch can price at most {MAX_BATCH_QUOTES} rows"
+    if batch.event_id is not None:
+        if batch.items:
+            raise ValueError("Pass either items or event_id, not both")
+        if batch.min_qty < 1 or batch.max_qty < batch.min_qty:
+            raise ValueError("Invalid quantity range")
+        tiers = tier_query.filter(models.Tier.event_id == batch.event_id).order_by(models.Tier.id).all()
+        if not tiers:
+            raise ValueError("Event not found")
+        # Checked before the rows exist, so a huge max_qty is refused without building them
+        if len(tiers) * (batch.max_qty - batch.min_qty + 1) > MAX_BATCH_QUOTES:
+            raise ValueError(batch_limit_error)
+        rows = [(tier, qty) for tier in tiers for qty in range(batch.min_qty, batch.max_qty + 1)]
+    else:
+        if len(batch.items) > MAX_BATCH_QUOTES:
+            raise ValueError(batch_limit_error)
+        if any(item.qty < 1 for item in batch.items):
+            raise ValueError("Quantity must be at least 1")
+        tier_ids = {item.tier_id for item in batch.items}
+        tiers_by_id = {tier.id: tier for tier in tier_query.filter(models.Tier.id.in_(tier_ids)).all()}
+        if len(tiers_by_id) != len(tier_ids):
+            raise ValueError("Tier not found")
+        rows = [(tiers_by_id[item.tier_id], item.qty) for item in batch.items]
+
+    if not rows:
+        return schemas.BatchPriceResponse(quotes=[])
+
+    prices = compute_dynamic_prices([tier for tier, _ in rows], [qty for _, qty in rows])
+    return schemas.BatchPriceResponse(quotes=[
+        schemas.PriceQuote(
+            tier_id=tier.id,
+            dynamic_price=float(price),
+            base_price=tier.price * qty,
+            quantity=qty
+        )
+        for (tier, qty), price in zip(rows, prices)
+    ])
+
+# Returned by the seat-reserving UPDATEs to keep seat_counter current
+_FREE_SEATS = models.Tier.total_seats - models.Tier.seats_sold - models.Tier.seats_held
+
+def commit_booking(db: Session, b: schemas.BookingCreate):
+    # Database half of book_ticket; returns the booking and the block still to be written to the ledger
+    if b.qty < 1:
+        raise ValueError("Quantity must be at least 1")
+    if b.hold_token is None and not seat_counter.can_fit(b.tier_id, b.qty):
+        raise ValueError("Not enough tickets available in this tier")
+
+    with timed("book_ticket", "tier_query"):
+        tier = db.query(models.Tier).options(joinedload(models.Tier.event)).filter(models.Tier.id == b.tier_id).first()
+    if not tier or tier.event.deleted_at is not None:
         raise ValueError("Tier not found")
     
     event = tier.event
-    if tier.seats_sold + b.qty > tier.total_seats:
+    free_seats = tier.total_seats - tier.seats_sold - tier.seats_held
+    if b.hold_token is None and b.qty > free_seats:
+        seat_counter.set(tier.id, free_seats)
         raise ValueError("Not enough tickets available in this tier")
+
+    # User, seats, booking and stats all commit together below
+    with timed("book_ticket", "user"):
+        user_obj = get_or_create_user_by_phone(db, phone=b.user_phone, commit=False)
         
     timestamp = datetime.utcnow().isoformat()
     ticket_hash = gen_ticket_hash(user_obj.phone, event.id, timestamp)
     
-    price = compute_dynamic_price(tier, b.qty)
-    
+    if b.hold_token is None:
+        with timed("book_ticket", "pricing"):
+            price = compute_dynamic_price(tier, b.qty)
+        # Conditional UPDATE so the capacity check and increment are one atomic statement; concurrent
+        # bookings can no longer both pass a stale Python-side check and oversell
+        with timed("book_ticket", "reserve_seats"):
+            free_seats = db.execute(
+                update(models.Tier).where(
+                    models.Tier.id == tier.id,
+                    models.Tier.seats_sold + models.Tier.seats_held + b.qty <= models.Tier.total_seats
+                ).values(seats_sold=models.Tier.seats_sold + b.qty).returning(_FREE_SEATS)
+            ).scalar()
+        if free_seats is None:
+            db.rollback()
+            raise ValueError("Not enough tickets available in this tier")
+    else:
+        # The hold already reserved the seats and fixed the price
+        with timed("book_ticket", "redeem_hold"):
+            price, free_seats = _redeem_hold(db, b)
+
     booking = models.Booking(
         user_id=user_obj.id, 
         event_id=event.id,
         tier_id=tier.id,
         qty=b.qty, 
         price_paid=price, 
-        ticket_hash=ticket_hash
+        ticket_hash=ticket_hash,
+        ledger_pending=True
     )
     db.add(booking)
-    tier.seats_sold += b.qty
+    bump_event_stats(db, event.id, total_collection=price, booking_count=1)
 
     new_price_per_ticket = price / b.qty
     tier.price = new_price_per_ticket
     
-    db.commit()
-    db.refresh(booking)
-
-    chain = SimpleChain(event_id=event.id)
-    chain.add_block({"ticket_hash": ticket_hash, "user_phone": user_obj.phone, "event_id": event.id, "tier": tier.name})
-    
-    return schemas.Booking(
+    # Built before the commit so nothing reloads afterwards: the session then holds no connection
+    # while the caller writes the ledger, which may itself need one
+    db.flush()
+    result = schemas.Booking(
         id=booking.id,
         user_phone=user_obj.phone,
         event_id=booking.event_id,
         tier_id=booking.tier_id,
         qty=booking.qty,
         price_paid=booking.price_paid,
-        ticket_hash=booking.ticket_hash
+        ticket_hash=booking.ticket_hash,
+        ledger_pending=True
     )
+    ledger_entry = {"ticket_hash": ticket_hash, "user_phone": user_obj.phone, "event_id": event.id, "tier": tier.name}
+    tier_id, event_id = tier.id, event.id
+    with timed("book_ticket", "commit"):
+        db.commit()
+    seat_counter.set(tier_id, free_seats)
+    quote_cache.invalidate_event(event_id)
+    response_cache.bump("events")
+    return result, ledger_entry
 
-def get_bookings_for_event(db: Session, event_id: int):
-    bookings = db.query(models.Booking).options(
-        joinedload(models.Booking.user),
-        joinedload(models.Booking.tier)
-    ).filter(models.Booking.event_id == event_id).all()
-    
-    booking_details = []
-    for b in bookings:
-        booking_details.append(
-            schemas.BookingDetail(
-                ticket_hash=b.ticket_hash,
-                qty=b.qty,
-                user_phone=b.user.phone,
-                tier_name=b.tier.name
-            )
+def _redeem_hold(db: Session, b: schemas.BookingCreate):
+    # Deleting the hold claims it, so a redeem racing the sweeper or another redeem wins at most once.
+    # Returns the locked price and the tier's free seats.
+    hold = db.execute(
+        delete(models.SeatHold).where(
+            models.SeatHold.token == b.hold_token,
+            models.SeatHold.tier_id == b.tier_id,
+            models.SeatHold.qty == b.qty,
+            models.SeatHold.user_phone == b.user_phone,
+            models.SeatHold.expires_at > datetime.utcnow()
+        ).returning(models.SeatHold.quoted_price)
+    ).first()
+    if hold is None:
+        db.rollback()
+        raise ValueError("Hold not found or expired")
+    free_seats = db.execute(
+        update(models.Tier).where(models.Tier.id == b.tier_id).values(
+            seats_held=models.Tier.seats_held - b.qty, seats_sold=models.Tier.seats_sold + b.qty
+        ).returning(_FREE_SEATS)
+    ).scalar()
+    return hold.quoted_price, free_seats
+
+# Seat holds: a buyer reserves seats at a quoted price for a few minutes, then books with the token.
+# Tier.seats_held counts held seats, so availability never needs to look at bookings or holds.
+HOLD_MINUTES = int(os.getenv("HOLD_MINUTES", "10"))
+MAX_HOLD_MINUTES = int(os.getenv("MAX_HOLD_MINUTES", "30"))
+HOLD_SWEEP_INTERVAL = float(os.getenv("HOLD_SWEEP_INTERVAL", "5"))
+HOLD_SWEEP_BATCH_SIZE = int(os.getenv("HOLD_SWEEP_BATCH_SIZE", "1000"))
+MAX_ACTIVE_HOLDS_PER_PHONE = int(os.getenv("MAX_ACTIVE_HOLDS_PER_PHONE", "5"))
+
+def create_hold(db: Session, h: schemas.HoldCreate):
+    if h.qty < 1:
+        raise ValueError("Quantity must be at least 1")
+    minutes = HOLD_MINUTES if h.minutes is None else h.minutes
+    if not 1 <= minutes <= MAX_HOLD_MINUTES:
+        raise ValueError(f"A hold lasts between 1 and {MAX_HOLD_MINUTES} minutes")
+    # A hold locks its quote, so none are given out at the base price used while the model loads
+    if get_model() is None:
+        raise ValueError("Pricing is not ready yet; try again shortly")
+    if not seat_counter.can_fit(h.tier_id, h.qty):
+        raise ValueError("Not enough tickets available in this tier")
+
+    with timed("create_hold", "tier_query"):
+        tier = db.query(models.Tier).options(joinedload(models.Tier.event)).filter(models.Tier.id == h.tier_id).first()
+    if not tier or tier.event.deleted_at is not None:
+        raise ValueError("Tier not found")
+    known_free = tier.total_seats - tier.seats_sold - tier.seats_held
+    if h.qty > known_free:
+        seat_counter.set(tier.id, known_free)
+        raise ValueError("Not enough tickets available in this tier")
+
+    with timed("create_hold", "pricing"):
+        price = compute_dynamic_price(tier, h.qty)
+    with timed("create_hold", "reserve_seats"):
+        free_seats = db.execute(
+            update(models.Tier).where(
+                models.Tier.id == tier.id,
+                models.Tier.seats_sold + models.Tier.seats_held + h.qty <= models.Tier.total_seats
+            ).values(seats_held=models.Tier.seats_held + h.qty).returning(_FREE_SEATS)
+        ).scalar()
+    if free_seats is None:
+        db.rollback()
+        raise ValueError("Not enough tickets available in this tier")
+    # Counted after the seat UPDATE, so concurrent holds for one phone queue behind each other's writes
+    now = datetime.utcnow()
+    active_holds = db.query(func.count(models.SeatHold.id)).filter(
+        models.SeatHold.user_phone == h.user_phone, models.SeatHold.expires_at > now
+    ).scalar()
+    if active_holds >= MAX_ACTIVE_HOLDS_PER_PHONE:
+        db.rollback()
+        raise ValueError(f"A phone number can hold seats in at most {MAX_ACTIVE_HOLDS_PER_PHONE} holds at a time")
+
+    hold = models.SeatHold(
+        token=gen_hold_token(),
+        tier_id=tier.id,
+        event_id=tier.event_id,
+        user_phone=h.user_phone,
+        qty=h.qty,
+        quoted_price=price,
+        expires_at=now + timedelta(minutes=minutes)
+    )
+    db.add(hold)
+    with timed("create_hold", "commit"):
+        db.commit()
+    seat_counter.set(tier.id, free_seats)
+    response_cache.bump("events")
+    return schemas.SeatHold(
+        token=hold.token,
+        tier_id=hold.tier_id,
+        event_id=hold.event_id,
+        qty=hold.qty,
+        quoted_price=hold.quoted_price,
+        expires_at=hold.expires_at
+    )
+
+def _release_holds(db: Session, condition) -> int:
+    # Deletes the matching holds and gives their seats back, one UPDATE per tier
+    released = db.execute(
+        delete(models.SeatHold).where(condition).returning(models.SeatHold.tier_id, models.SeatHold.qty)
+    ).all()
+    qty_by_tier = {}
+    for tier_id, qty in released:
+        qty_by_tier[tier_id] = qty_by_tier.get(tier_id, 0) + qty
+    for tier_id, qty in qty_by_tier.items():
+        db.query(models.Tier).filter(models.Tier.id == tier_id).update(
+            {models.Tier.seats_held: models.Tier.seats_held - qty}, synchronize_session=False
         )
-    return booking_details
+    db.commit()
+    for tier_id, qty in qty_by_tier.items():
+        seat_counter.release(tier_id, qty)
+    if released:
+        response_cache.bump("events")
+    return len(released)
 
-def verify_ticket(db: Session, ticket_hash: str):
-    booking = db.query(models.Booking).options(
-        joinedload(models.Booking.user),
-        joinedload(models.Booking.event)
-    ).filter(models.Booking.ticket_hash == ticket_hash).first()
+def release_hold(db: Session, token: str) -> bool:
+    return _release_holds(db, models.SeatHold.token == token) > 0
 
-    if not booking:
+def release_expired_holds(db: Session) -> int:
+    # Batches of HOLD_SWEEP_BATCH_SIZE, each its own short transaction. Expired holds are found with a
+    # read first, so a sweep with nothing to release never takes the write lock from bookings.
+    released = 0
+    while True:
+        hold_ids = db.scalars(select(models.SeatHold.id).where(
+            models.SeatHold.expires_at <= datetime.utcnow()
+        ).limit(HOLD_SWEEP_BATCH_SIZE)).all()
+        db.rollback()
+        if not hold_ids:
+            return released
+        # A hold redeemed since the read is already gone and is simply not deleted again
+        released += _release_holds(db, models.SeatHold.id.in_(hold_ids))
+        if len(hold_ids) < HOLD_SWEEP_BATCH_SIZE:
+            return released
+
+def run_hold_sweeper(stop, interval: float = HOLD_SWEEP_INTERVAL):
+    # Thread target: releases expired holds every interval until the stop event is set
+    while not stop.wait(interval):
+        db = SessionLocal()
+        try:
+            release_expired_holds(db)
+        except Exception as e:
+            print(f"Releasing expired seat holds failed; retrying in {interval}s: {e}")
+        finally:
+            db.close()
+
+def mark_ledger_written(db: Session, ticket_hashes):
+    if ticket_hashes:
+        db.query(models.Booking).filter(
+            models.Booking.ticket_hash.in_(ticket_hashes)
+        ).update({models.Booking.ledger_pending: False}, synchronize_session=False)
+        db.commit()
+
+def _mark_entries_written(ledger_entries):
+    db = SessionLocal()
+    try:
+        mark_ledger_written(db, [entry["ticket_hash"] for entry in ledger_entries])
+    finally:
+        db.close()
+
+def _event_is_live(event_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(models.Event.id).filter(
+            models.Event.id == event_id, models.Event.deleted_at.is_(None)
+        ).first() is not None
+    finally:
+        db.close()
+
+# Started and stopped by the app lifespan; without it running, submit() writes in the caller
+ledger_writer = LedgerWriter(on_written=_mark_entries_written, creates_ledger=_event_is_live)
+
+def write_ledger_entry(ledger_entry: dict):
+    ledger_writer.submit(ledger_entry)
+
+def write_ledger_entries(ledger_entries: list):
+    ledger_writer.submit_many(ledger_entries)
+
+# Recovery only takes bookings pending for longer than this, well past the writer's flush window and
+# first retries, so blocks another live worker still has queued are left to that worker
+LEDGER_RECOVERY_MIN_AGE_SECONDS = float(os.getenv("LEDGER_RECOVERY_MIN_AGE_SECONDS", "60"))
+LEDGER_RECOVERY_INTERVAL = float(os.getenv("LEDGER_RECOVERY_INTERVAL", "300"))
+
+def recover_pending_ledger_entries(db: Session, min_age_seconds: float = LEDGER_RECOVERY_MIN_AGE_SECONDS):
+    # Append blocks for bookings that committed but never reached the ledger, e.g. when the
+    # process stopped with blocks still queued or a write kept failing. Appends skip tickets that
+    # are already in the ledger, checked under its lock, so racing a live writer can't duplicate them.
+    cutoff = datetime.utcnow() - timedelta(seconds=min_age_seconds)
+    rows = db.query(
+        models.Booking.ticket_hash, models.Booking.event_id, models.User.phone, models.Tier.name
+    ).join(models.User, models.Booking.user_id == models.User.id).join(
+        models.Tier, models.Booking.tier_id == models.Tier.id
+    ).filter(
+        models.Booking.ledger_pending == True, models.Booking.created_at <= cutoff
+    ).order_by(models.Booking.id).all()
+
+    by_event = {}
+    for ticket_hash, event_id, phone, tier_name in rows:
+        by_event.setdefault(event_id, []).append(
+            {"ticket_hash": ticket_hash, "user_phone": phone, "event_id": event_id, "tier": tier_name}
+        )
+    appended = 0
+    for event_id, entries in by_event.items():
+        # A crash between the ledger fsync and clearing the flag leaves blocks that are already durable
+        appended += len(SimpleChain(event_id=event_id).add_blocks(entries, skip_written=True))
+        mark_ledger_written(db, [entry["ticket_hash"] for entry in entries])
+    return len(rows), appended
+
+def run_ledger_recovery(stop, interval: float = LEDGER_RECOVERY_INTERVAL):
+    # Thread target: picks up bookings whose ledger write was lost or gave up, without waiting for a restart
+    while not stop.wait(interval):
+        db = SessionLocal()
+        try:
+            pending, appended = recover_pending_ledger_entries(db)
+            if pending:
+                print(f"Ledger recovery: {pending} pending bookings, {appended} blocks appended.")
+        except Exception as e:
+            print(f"Ledger recovery failed; retrying in {interval}s: {e}")
+        finally:
+            db.close()
+
+def book_ticket(db: Session, b: schemas.BookingCreate):
+    booking, ledger_entry = commit_booking(db, b)
+    write_ledger_entry(ledger_entry)
+    return booking
+
+def get_bookings_for_event(db: Session, event_id: int, cursor=None, limit=500):
+    # A BookingPage shaped dict built from column rows
+    query = db.query(
+        models.Booking.id, models.Booking.ticket_hash, models.Booking.qty, models.User.phone, models.Tier.name
+    ).join(models.User, models.Booking.user_id == models.User.id).join(
+        models.Tier, models.Booking.tier_id == models.Tier.id
+    ).join(models.Event, models.Booking.event_id == models.Event.id).filter(
+        models.Booking.event_id == event_id, models.Event.deleted_at.is_(None)
+    )
+    if cursor:
+        query = query.filter(models.Booking.id > decode_cursor(cursor))
+    bookings = query.order_by(models.Booking.id).limit(limit + 1).all()
+    next_cursor = encode_cursor(bookings[limit - 1].id) if len(bookings) > limit else None
+
+    items = [
+        {"ticket_hash": ticket_hash, "qty": qty, "user_phone": phone, "tier_name": tier_name}
+        for _, ticket_hash, qty, phone, tier_name in bookings[:limit]
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+def find_ticket_booking(db: Session, ticket_hash: str):
+    # Database half of verify_ticket: the booking's columns as a dict, or None
+    row = db.query(
+        models.Booking.event_id, models.Event.title, models.User.phone, models.Booking.qty, models.Booking.ledger_pending
+    ).join(models.Event, models.Booking.event_id == models.Event.id).join(
+        models.User, models.Booking.user_id == models.User.id
+    ).filter(models.Booking.ticket_hash == ticket_hash, models.Event.deleted_at.is_(None)).first()
+    if row is None:
         return None
+    event_id, title, phone, qty, ledger_pending = row
+    return {"event_id": event_id, "event_title": title, "user_phone": phone, "qty": qty,
+            "ticket_hash": ticket_hash, "ledger_pending": bool(ledger_pending)}
 
+def ticket_verification(booking: dict, ledger_entry) -> schemas.VerifiedBookingDetail:
     return schemas.VerifiedBookingDetail(
         status="Ticket Verified Successfully",
-        event_title=booking.event.title,
-        user_phone=booking.user.phone,
-        qty=booking.qty,
-        ticket_hash=booking.ticket_hash
+        event_title=booking["event_title"],
+        user_phone=booking["user_phone"],
+        qty=booking["qty"],
+        ticket_hash=booking["ticket_hash"],
+        ledger_verified=ledger_entry is not None,
+        ledger_pending=booking["ledger_pending"] and ledger_entry is None
     )
 
+def verify_ticket(db: Session, ticket_hash: str):
+    booking = find_ticket_booking(db, ticket_hash)
+    if booking is None:
+        return None
+    return ticket_verification(booking, lookup_ticket(booking["event_id"], ticket_hash))
+
+MAX_BATCH_VERIFY = 1000
+
+def mark_tickets(db: Session, batch: schemas.BatchVerifyRequest):
+    # Database half of verify_and_mark_tickets: {ticket_hash: (event_id, phone, qty)} for the tickets
+    # found, and the set this call admitted
+    if len(batch.ticket_hashes) > MAX_BATCH_VERIFY:
+        raise ValueError(f"A batch can verify at most {MAX_BATCH_VERIFY} tickets")
+    ticket_hashes = set(batch.ticket_hashes)
+    if not ticket_hashes:
+        return {}, set()
+
+    found = {
+        ticket_hash: (event_id, phone, qty)
+        for ticket_hash, event_id, phone, qty in db.query(
+            models.Booking.ticket_hash, models.Booking.event_id, models.User.phone, models.Booking.qty
+        ).join(models.User, models.Booking.user_id == models.User.id).join(
+            models.Event, models.Booking.event_id == models.Event.id
+        ).filter(models.Booking.ticket_hash.in_(ticket_hashes), models.Event.deleted_at.is_(None))
+    }
+    if not found:
+        return found, set()
+    # One conditional UPDATE flips every unused ticket; RETURNING reports which ones this call
+    # admitted, so a ticket scanned at two gates at once is only let in once. Tickets of deleted
+    # events were left out of found and are never admitted.
+    mark = update(models.Booking).where(
+        models.Booking.ticket_hash.in_(list(found)),
+        models.Booking.verified.is_not(True)
+    )
+    if batch.event_id is not None:
+        mark = mark.where(models.Booking.event_id == batch.event_id)
+    admitted = set(db.execute(
+        mark.values(verified=True).returning(models.Booking.ticket_hash),
+        execution_options={"synchronize_session": False}
+    ).scalars())
+    db.commit()
+    return found, admitted
+
+def ledger_tickets(found: dict) -> set:
+    # Ledger half: which of the found tickets have a block. Reads ledger files, so async callers
+    # run it in a worker thread
+    return {
+        ticket_hash for ticket_hash, (event_id, _, _) in found.items()
+        if lookup_ticket(event_id, ticket_hash) is not None
+    }
+
+def ticket_scan_response(batch: schemas.BatchVerifyRequest, found: dict, admitted: set, in_ledger: set):
+    results, seen = [], set()
+    for ticket_hash in batch.ticket_hashes:
+        if ticket_hash in seen:
+            results.append(schemas.TicketScanResult(ticket_hash=ticket_hash, status="duplicate"))
+            continue
+        seen.add(ticket_hash)
+        if ticket_hash not in found:
+            results.append(schemas.TicketScanResult(ticket_hash=ticket_hash, status="not_found"))
+            continue
+        event_id, phone, qty = found[ticket_hash]
+        if ticket_hash in admitted:
+            status = "admitted"
+        elif batch.event_id is not None and event_id != batch.event_id:
+            status = "wrong_event"
+        else:
+            status = "already_used"
+        results.append(schemas.TicketScanResult(
+            ticket_hash=ticket_hash,
+            status=status,
+            event_id=event_id,
+            user_phone=phone,
+            qty=qty,
+            ledger_verified=ticket_hash in in_ledger
+        ))
+    return schemas.BatchVerifyResponse(results=results, admitted=len(admitted))
+
+def verify_and_mark_tickets(db: Session, batch: schemas.BatchVerifyRequest):
+    found, admitted = mark_tickets(db, batch)
+    return ticket_scan_response(batch, found, admitted, ledger_tickets(found))
+
 def create_sponsor(db: Session, sponsor: schemas.SponsorCreate):
     new_sponsor = models.Sponsor(**sponsor.dict())
     db.add(new_sponsor)
     db.commit()
     db.refresh(new_sponsor)
+    response_cache.bump("sponsors")
     return new_sponsor
 
 def list_sponsors(db: Session):
@@ -186,11 +908,14 @@ def list_sponsors(db: Session):
 # ======================================================================
 # THIS IS THE CORRECTED FUNCTION
 # ======================================================================
-def create_event_rating(db: Session, event_id: int, rating: schemas.RatingCreate):
+def create_event_rating(db: Session, event_id: int, rating: schemas.RatingCreate, _retried: bool = False):
     user = db.query(models.User).filter(models.User.phone == rating.user_phone).first()
     if not user:
         raise ValueError("User with this phone number not found.")
 
+    if not db.query(models.Event.id).filter(models.Event.id == event_id, models.Event.deleted_at.is_(None)).first():
+        raise ValueError("Event not found.")
+
     booking = db.query(models.Booking).filter(
         models.Booking.event_id == event_id,
         models.Booking.user_id == user.id
@@ -205,9 +930,12 @@ def create_event_rating(db: Session, event_id: int, rating: schemas.RatingCreate
     ).first()
 
     if existing_rating:
+        previous = existing_rating.rating
         existing_rating.rating = rating.rating
+        bump_event_stats(db, event_id, rating_sum=rating.rating - previous)
         db.commit()
         db.refresh(existing_rating)
+        response_cache.bump("events")
         # Manually create the response to include the user's phone
         return schemas.Rating(
             id=existing_rating.id,
@@ -222,8 +950,17 @@ def create_event_rating(db: Session, event_id: int, rating: schemas.RatingCreate
         rating=rating.rating
     )
     db.add(new_rating)
-    db.commit()
+    bump_event_stats(db, event_id, rating_sum=rating.rating, rating_count=1)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request inserted this user's rating first; retry once, which finds it and updates
+        db.rollback()
+        if _retried:
+            raise
+        return create_event_rating(db, event_id, rating, _retried=True)
     db.refresh(new_rating)
+    response_cache.bump("events")
 
     # Manually create the response to include the user's phone
     return schemas.Rating(
@@ -0,0 +1,76 @@
+# import_benchmark.py
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, Tuple
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+# Training and password-hashing dependencies that must stay out of worker startup
+DEFERRED_MODULES = ("pandas", "sklearn", "scipy", "joblib", "passlib", "bcrypt")
+
+def measure(module: str, env: dict) -> Dict[str, Tuple[int, int]]:
+    # One fresh interpreter per run; returns module -> (self, cumulative) import time in microseconds
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=os.path.dirname(PACKAGE_DIR), env=env)
+    if result.returncode:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def by_package(timings: Dict[str, Tuple[int, int]]) -> Dict[str, int]:
+    totals = {}
+    for name, (self_us, _) in timings.items():
+        root = name.split(".")[0]
+        totals[root] = totals.get(root, 0) + self_us
+    return totals
+
+def main(argv=None):
+    package = __package__ or os.path.basename(PACKAGE_DIR)
+    parser = argparse.ArgumentParser(description="Measure how long a worker takes to import the app (python -X importtime)")
+    parser.add_argument("--module", default=f"{package}.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS, help="Fail when the median import time exceeds this")
+    parser.add_argument("--top", type=int, default=10, help="Show this many of the slowest packages")
+    args = parser.parse_args(argv)
+
+    # Keep the import away from the real database, ledgers and response cache
+    workdir = tempfile.mkdtemp(prefix="eventmgmt-importtime-")
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'event.db')}",
+               LEDGER_DIR=os.path.join(workdir, "ledgers"),
+               RESPONSE_CACHE_DIR=os.path.join(workdir, "cache"))
+    try:
+        runs = [measure(args.module, env) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    totals = [run[args.module][1] / 1000 for run in runs]
+    median_ms = statistics.median(totals)
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    print(f"import {args.module}: median {median_ms:.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f} ms, max {max(totals):.0f} ms), budget {args.budget_ms:.0f} ms")
+    print("Slowest packages (self time, median run):")
+    for root, self_us in sorted(by_package(median_run).items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {root:<24} {self_us / 1000:>8.1f} ms")
+
+    failures = []
+    loaded = sorted({name.split(".")[0] for name in median_run} & set(DEFERRED_MODULES))
+    if loaded:
+        failures.append(f"imported at startup but should load on first use: {', '.join(loaded)}")
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    if failures:
+        raise SystemExit("Import budget failed: " + "; ".join(failures))
+
+if __name__ == "__main__":
+    main()
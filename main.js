@@ -58,15 +58,30 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw error;
             }
         },
-        getEvents: () => api.request('/events'),
+        async requestAllPages(endpoint) {
+            const items = [];
+            let cursor = null;
+            do {
+                const separator = endpoint.includes('?') ? '&' : '?';
+                const page = await api.request(cursor ? `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}` : endpoint);
+                items.push(...page.items);
+                cursor = page.next_cursor;
+            } while (cursor);
+            return items;
+        },
+        getEvents: () => api.request('/events').then(page => page.items),
+        searchEvents: (filters) => api.request(`/events/search?${new URLSearchParams(filters)}`),
         createEvent: (data) => api.request('/events', { method: 'POST', body: data }),
         deleteEvent: (id) => api.request(`/events/${id}`, { method: 'DELETE' }),
         createSponsor: (data) => api.request('/sponsors', { method: 'POST', body: data }),
         getSponsors: () => api.request('/sponsors'),
-        getBookings: (eventId) => api.request(`/events/${eventId}/bookings`),
+        getBookings: (eventId) => api.requestAllPages(`/events/${eventId}/bookings`),
         bookTicket: (data) => api.request('/book', { method: 'POST', body: data }),
+        holdSeats: (data) => api.request('/holds', { method: 'POST', body: data }),
+        releaseHold: (token) => api.request(`/holds/${token}`, { method: 'DELETE' }),
         verifyTicket: (hash) => api.request(`/verify/${hash}`),
         getPrice: (data) => api.request('/events/price', { method: 'POST', body: data }),
+        getPrices: (data) => api.request('/events/price/batch', { method: 'POST', body: data }),
         rateEvent: (eventId, data) => api.request(`/events/${eventId}/rate`, { method: 'POST', body: data }),
     };
 
@@ -143,7 +158,7 @@ document.addEventListener('DOMContentLoaded', () => {
             event.tiers.forEach(tier => {
                 const tierDiv = document.createElement('div');
                 tierDiv.className = 'tier-booking-area';
-                const availableSeats = tier.total_seats - tier.seats_sold;
+                const availableSeats = tier.total_seats - tier.seats_sold - (tier.seats_held || 0);
                 tierDiv.innerHTML = `
                     <div class="flex justify-between items-center">
                         <span class="font-semibold">${tier.name} (₹${tier.price.toFixed(2)})</span>
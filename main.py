@@ -1,23 +1,83 @@
+import asyncio
 import sys
 import os
-from fastapi import FastAPI, Depends, HTTPException, Response
-from sqlalchemy.orm import Session
+import threading
+import time
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Corrected relative imports
-from .database import Base, engine, get_db
+from .database import Base, SessionLocal, engine, async_engine, get_async_db
 from fastapi.middleware.cors import CORSMiddleware
-from . import crud, models, schemas
+from . import async_crud, bulk, crud, models, schemas, search
+from .serialization import FastJSONResponse, dumps
+from .cache import quote_cache, response_cache
+from .ml_pricing import start_model_loading
+from . import metrics
+from contextlib import asynccontextmanager
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from typing import List
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from typing import List, Optional
+from datetime import datetime
+from pydantic import TypeAdapter
 
 # --- Determine the project's root and frontend directories ---
 ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-FRONTEND_DIRECTORY = os.path.join(ROOT_DIRECTORY, 'frontend')
+FRONTEND_DIRECTORY = os.getenv("FRONTEND_DIR", os.path.join(ROOT_DIRECTORY, 'frontend'))
 
-models.Base.metadata.create_all(bind=engine)
+# Schema setup runs at startup, not on import. With several workers, set AUTO_MIGRATE=0 and run
+# "python -m backend.manage migrate-schema" once before starting them.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1") != "0"
 
-app = FastAPI(title="Event Management API")
+def prepare_database():
+    db = SessionLocal()
+    try:
+        if AUTO_MIGRATE:
+            models.Base.metadata.create_all(bind=engine)
+            crud.create_missing_columns(db)
+            search.ensure_search_index(db)
+            crud.seed_missing_event_stats(db)
+        pending, appended = crud.recover_pending_ledger_entries(db)
+    finally:
+        db.close()
+    if pending:
+        print(f"Ledger recovery: {pending} pending bookings, {appended} blocks appended.")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the pricing model off the startup path; pricing uses base prices until it is ready
+    start_model_loading()
+    # Create missing tables, then finish ledger writes a previous run left queued, before accepting requests.
+    # Bookings younger than LEDGER_RECOVERY_MIN_AGE_SECONDS are left to the periodic recovery pass.
+    await asyncio.to_thread(prepare_database)
+    crud.ledger_writer.start()
+    # Finish purging events a previous run soft-deleted; a purge cut short by shutdown resumes here
+    threading.Thread(target=crud.purge_event_job, name="event-purge", daemon=True).start()
+    stop_background = threading.Event()
+    threading.Thread(target=crud.run_hold_sweeper, args=(stop_background,), name="hold-sweeper", daemon=True).start()
+    threading.Thread(target=crud.run_ledger_recovery, args=(stop_background,), name="ledger-recovery", daemon=True).start()
+    yield
+    stop_background.set()
+    # Drains the queue so every committed booking reaches the ledger
+    await asyncio.to_thread(crud.ledger_writer.stop)
+    await async_engine.dispose()
+
+app = FastAPI(title="Event Management API", lifespan=lifespan)
+
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    if not metrics.METRICS_ENABLED:
+        return await call_next(request)
+    token = metrics.start_request()
+    start = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        route = request.scope.get("route")
+        metrics.finish_request(token, request.method, getattr(route, "path", "unmatched"), time.perf_counter() - start)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,65 +89,193 @@ app.add_middleware(
 
 # --- Event Endpoints ---
 @app.post("/api/events", response_model=schemas.Event)
-def create_event(event: schemas.EventCreate, db: Session = Depends(get_db)):
-    return crud.create_event(db=db, ev=event)
+async def create_event(event: schemas.EventCreate, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_event(db=db, ev=event)
+
+def _cached_json(request: Request, name: str, params: tuple):
+    # Returns (etag, response): a 304 or cached body when possible, otherwise response is None
+    etag = response_cache.etag(name, *params)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if response_cache.is_not_modified(etag, request.headers.get("if-none-match")):
+        return etag, Response(status_code=304, headers=headers)
+    body = response_cache.get(etag)
+    if body is not None:
+        return etag, Response(content=body, media_type="application/json", headers=headers)
+    return etag, None
+
+def _store_json(etag: str, body: bytes):
+    response_cache.put(etag, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+@app.get("/api/events", response_model=schemas.EventPage)
+async def read_events(request: Request, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=500), db: AsyncSession = Depends(get_async_db)):
+    etag, cached = _cached_json(request, "events", (cursor, limit))
+    if cached is not None:
+        return cached
+    try:
+        page = await async_crud.list_events(db, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _store_json(etag, dumps(page))
+
+# Text matches every word as a prefix of the title, description or location (FTS5 on SQLite)
+@app.get("/api/events/search", response_model=schemas.EventPage)
+async def search_events(
+    request: Request,
+    q: Optional[str] = None,
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    end_from: Optional[datetime] = None,
+    end_to: Optional[datetime] = None,
+    sponsor_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    filters = dict(q=q, start_from=start_from, start_to=start_to, end_from=end_from, end_to=end_to,
+                   sponsor_id=sponsor_id, min_price=min_price, max_price=max_price)
+    etag, cached = _cached_json(request, "events", ("search", *filters.values(), cursor, limit))
+    if cached is not None:
+        return cached
+    try:
+        page = await async_crud.search_events(db, cursor=cursor, limit=limit, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _store_json(etag, dumps(page))
 
-@app.get("/api/events", response_model=List[schemas.EventDetail])
-def read_events(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    events = crud.list_events(db, skip=skip, limit=limit)
-    return events
+@app.get("/api/events/{event_id}/bookings", response_model=schemas.BookingPage)
+async def get_event_bookings(event_id: int, cursor: Optional[str] = None, limit: int = Query(500, ge=1, le=5000), db: AsyncSession = Depends(get_async_db)):
+    try:
+        return FastJSONResponse(await async_crud.get_bookings_for_event(db, event_id=event_id, cursor=cursor, limit=limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/events/{event_id}/bookings", response_model=List[schemas.BookingDetail])
-def get_event_bookings(event_id: int, db: Session = Depends(get_db)):
-    return crud.get_bookings_for_event(db, event_id=event_id)
+@app.get("/api/events/{event_id}/bookings/export")
+async def export_event_bookings(event_id: int, format: str = Query("ndjson", pattern="^(ndjson|csv)$"), db: AsyncSession = Depends(get_async_db)):
+    if not await async_crud.event_exists(db, event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        async_crud.export_event_bookings(event_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="bookings_event_{event_id}.{format}"'}
+    )
 
 @app.delete("/api/events/{event_id}")
-def delete_event(event_id: int, db: Session = Depends(get_db)):
-    deleted_event = crud.delete_event(db, event_id=event_id)
-    if deleted_event is None:
+async def delete_event(event_id: int, background_tasks: BackgroundTasks, mode: str = Query("hard", pattern="^(hard|soft)$"),
+                       db: AsyncSession = Depends(get_async_db)):
+    # hard: rows are purged in batches before responding. soft: the event disappears at once and
+    # its bookings, tiers and ledger are purged after the response (202).
+    soft = mode == "soft"
+    deleted = await async_crud.delete_event(db, event_id=event_id, soft=soft)
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Event not found")
+    if soft:
+        background_tasks.add_task(crud.purge_event_job, event_id)
+        return Response(status_code=202)
     return Response(status_code=204)
 
 # --- Rating Endpoint ---
 @app.post("/api/events/{event_id}/rate", response_model=schemas.Rating)
-def rate_event(event_id: int, rating: schemas.RatingCreate, db: Session = Depends(get_db)):
+async def rate_event(event_id: int, rating: schemas.RatingCreate, db: AsyncSession = Depends(get_async_db)):
     try:
-        return crud.create_event_rating(db, event_id=event_id, rating=rating)
+        return await async_crud.create_event_rating(db, event_id=event_id, rating=rating)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # --- Price & Booking Endpoints ---
 @app.post("/api/events/price", response_model=schemas.PriceResponse)
-def get_event_price(price_request: schemas.PriceRequest, db: Session = Depends(get_db)):
+async def get_event_price(price_request: schemas.PriceRequest, db: AsyncSession = Depends(get_async_db)):
     try:
-        return crud.get_dynamic_price(db, price_request)
+        return await async_crud.get_dynamic_price(db, price_request)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@app.post("/api/events/price/batch", response_model=schemas.BatchPriceResponse)
+async def get_event_prices(batch: schemas.BatchPriceRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await async_crud.get_dynamic_prices(db, batch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/api/book", response_model=schemas.Booking)
-def book_ticket(booking: schemas.BookingCreate, db: Session = Depends(get_db)):
+async def book_ticket(booking: schemas.BookingCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await async_crud.book_ticket(db, b=booking)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# --- Seat Hold Endpoints ---
+# A hold reserves seats at a locked price for a few minutes; pass its token to /api/book as hold_token
+@app.post("/api/holds", response_model=schemas.SeatHold)
+async def create_hold(hold: schemas.HoldCreate, db: AsyncSession = Depends(get_async_db)):
     try:
-        return crud.book_ticket(db, b=booking)
+        return await async_crud.create_hold(db, h=hold)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.delete("/api/holds/{token}")
+async def release_hold(token: str, db: AsyncSession = Depends(get_async_db)):
+    if not await async_crud.release_hold(db, token=token):
+        raise HTTPException(status_code=404, detail="Hold not found")
+    return Response(status_code=204)
+
 # --- Sponsor Endpoints ---
+# Built once: creating a TypeAdapter compiles a serializer for the type
+SPONSOR_LIST = TypeAdapter(List[schemas.Sponsor])
+
 @app.post("/api/sponsors", response_model=schemas.Sponsor)
-def create_sponsor(sponsor: schemas.SponsorCreate, db: Session = Depends(get_db)):
-    return crud.create_sponsor(db=db, sponsor=sponsor)
+async def create_sponsor(sponsor: schemas.SponsorCreate, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_sponsor(db=db, sponsor=sponsor)
 
 @app.get("/api/sponsors", response_model=List[schemas.Sponsor])
-def get_sponsors(db: Session = Depends(get_db)):
-    return crud.list_sponsors(db)
+async def get_sponsors(request: Request, db: AsyncSession = Depends(get_async_db)):
+    etag, cached = _cached_json(request, "sponsors", ())
+    if cached is not None:
+        return cached
+    sponsors = await async_crud.list_sponsors(db)
+    return _store_json(etag, SPONSOR_LIST.dump_json(sponsors))
 
 # --- Verification Endpoint ---
 @app.get("/api/verify/{ticket_hash}", response_model=schemas.VerifiedBookingDetail)
-def verify_ticket(ticket_hash: str, db: Session = Depends(get_db)):
-    booking_details = crud.verify_ticket(db, ticket_hash=ticket_hash)
+async def verify_ticket(ticket_hash: str, db: AsyncSession = Depends(get_async_db)):
+    booking_details = await async_crud.verify_ticket(db, ticket_hash=ticket_hash)
     if not booking_details:
         raise HTTPException(status_code=404, detail="Ticket hash not found or invalid.")
     return booking_details
 
+# Verifies and marks tickets as used in one call; scanners that buffered scans offline sync through here
+@app.post("/api/verify/batch", response_model=schemas.BatchVerifyResponse)
+async def verify_tickets(batch: schemas.BatchVerifyRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await async_crud.verify_and_mark_tickets(db, batch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# --- Bulk Import Endpoints ---
+# Bodies are NDJSON (default) or CSV with a header row, chosen by Content-Type
+@app.post("/api/import/events", response_model=schemas.ImportReport)
+async def import_events(request: Request, db: AsyncSession = Depends(get_async_db)):
+    fmt = bulk.format_for(request.headers.get("content-type"))
+    return await async_crud.import_stream(db, request.stream(), fmt, bulk.import_event_chunk)
+
+@app.post("/api/import/bookings", response_model=schemas.ImportReport)
+async def import_bookings(request: Request, db: AsyncSession = Depends(get_async_db)):
+    fmt = bulk.format_for(request.headers.get("content-type"))
+    return await async_crud.import_stream(db, request.stream(), fmt, bulk.import_booking_chunk)
+
+# --- Cache Stats Endpoint ---
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    return {"quotes": quote_cache.stats(), "responses": response_cache.stats()}
+
+# --- Prometheus Metrics ---
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # --- Frontend Serving ---
 app.mount("/static", StaticFiles(directory=FRONTEND_DIRECTORY), name="static")
 
@@ -0,0 +1,137 @@
+# manage.py
+import argparse
+
+from .database import SessionLocal, engine
+from . import bulk, crud, models, search
+from .ml_pricing import COMPILED_MODEL_PATH, build_compiled_model
+from .blockchain import SimpleChain, ledger_event_ids, verify_ledger
+
+def rebuild_stats(args):
+    db = SessionLocal()
+    try:
+        count = crud.rebuild_event_stats(db)
+    finally:
+        db.close()
+    print(f"Rebuilt stats for {count} events.")
+
+def build_model(args):
+    build_compiled_model()
+    print(f"Trained pricing model and wrote compiled artifact to {COMPILED_MODEL_PATH}.")
+
+def migrate_schema(args):
+    db = SessionLocal()
+    try:
+        added = crud.create_missing_columns(db)
+        created = crud.create_missing_indexes(db)
+        if search.ensure_search_index(db):
+            created.append(search.SEARCH_TABLE if search.search_backend(db) == "fts5" else search.SEARCH_INDEX)
+        seeded = crud.seed_missing_event_stats(db)
+    finally:
+        db.close()
+    print(f"Added {len(added)} columns: {', '.join(added) or 'none missing'}.")
+    print(f"Created {len(created)} indexes: {', '.join(created) or 'none missing'}.")
+    print(f"Computed stats for {seeded} events that had none.")
+
+def rebuild_search(args):
+    db = SessionLocal()
+    try:
+        search.ensure_search_index(db)
+        count = search.rebuild_search_index(db)
+    finally:
+        db.close()
+    print(f"Rebuilt the search index for {count} events.")
+
+def purge_deleted(args):
+    db = SessionLocal()
+    try:
+        crud.create_missing_columns(db)
+        event_ids = crud.purge_deleted_events(db)
+    finally:
+        db.close()
+    print(f"Purged {len(event_ids)} deleted events and archived their ledgers.")
+
+def release_holds(args):
+    db = SessionLocal()
+    try:
+        released = crud.release_expired_holds(db)
+    finally:
+        db.close()
+    print(f"Released {released} expired seat holds.")
+
+def migrate_ledgers(args):
+    # Opening a chain converts a legacy JSON ledger to JSON Lines
+    event_ids = ledger_event_ids()
+    for event_id in event_ids:
+        SimpleChain(event_id=event_id)
+    print(f"Checked {len(event_ids)} ledgers; legacy JSON files were converted to JSON Lines.")
+
+def recover_ledgers(args):
+    db = SessionLocal()
+    try:
+        crud.create_missing_columns(db)
+        pending, appended = crud.recover_pending_ledger_entries(db, min_age_seconds=args.min_age_seconds)
+    finally:
+        db.close()
+    print(f"Found {pending} bookings pending a ledger write; appended {appended} missing blocks.")
+
+def verify_ledgers(args):
+    existing = ledger_event_ids()
+    event_ids = [args.event_id] if args.event_id is not None else existing
+    failures = 0
+    for event_id in event_ids:
+        if args.repair and event_id in existing:
+            # Opening the chain converts a legacy ledger and drops a torn final write
+            SimpleChain(event_id=event_id)
+        error = verify_ledger(event_id)
+        if error:
+            failures += 1
+            print(f"Event {event_id}: {error}")
+    print(f"Verified {len(event_ids)} ledgers, {failures} invalid.")
+    if failures:
+        raise SystemExit(1)
+
+def import_file(args):
+    chunk_fn = bulk.import_event_chunk if args.command == "import-events" else bulk.import_booking_chunk
+    fmt = args.format or bulk.format_for(args.path)
+    db = SessionLocal()
+    try:
+        with open(args.path, 'r', encoding="utf-8", newline="") as f:
+            report = bulk.import_lines(db, f, fmt, chunk_fn, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+    for error in report.errors:
+        print(f"Row {error.row}: {error.error}")
+    print(f"Imported {report.inserted} rows, {report.failed} failed.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Event Management maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("rebuild-stats", help="Recompute the event_stats table from bookings and ratings").set_defaults(func=rebuild_stats)
+    subparsers.add_parser("migrate-schema", aliases=["migrate-indexes"], help="Add columns and indexes declared in models.py to an existing database").set_defaults(func=migrate_schema)
+    subparsers.add_parser("rebuild-search", help="Rebuild the full-text event search index from the events table").set_defaults(func=rebuild_search)
+    subparsers.add_parser("purge-deleted", help="Remove the rows and archive the ledgers of soft-deleted events").set_defaults(func=purge_deleted)
+    subparsers.add_parser("release-holds", help="Release expired seat holds and return their seats to sale").set_defaults(func=release_holds)
+    subparsers.add_parser("migrate-ledgers", help="Convert legacy JSON ledgers to the append-only JSON Lines format").set_defaults(func=migrate_ledgers)
+    recover_parser = subparsers.add_parser("recover-ledgers", help="Append ledger blocks for committed bookings that never reached the ledger")
+    recover_parser.add_argument("--min-age-seconds", type=float, default=crud.LEDGER_RECOVERY_MIN_AGE_SECONDS,
+                                help="Skip bookings newer than this; use 0 when no server is running")
+    recover_parser.set_defaults(func=recover_ledgers)
+    verify_parser = subparsers.add_parser("verify-ledgers", help="Check every block's hash and link in the ledgers")
+    verify_parser.add_argument("--event-id", type=int, default=None)
+    verify_parser.add_argument("--repair", action="store_true", help="Drop torn final writes and convert legacy ledgers before checking")
+    verify_parser.set_defaults(func=verify_ledgers)
+    for command, what in (("import-events", "events with tiers and sponsor links"), ("import-bookings", "historical bookings")):
+        import_parser = subparsers.add_parser(command, help=f"Bulk import {what} from an NDJSON or CSV file")
+        import_parser.add_argument("path")
+        import_parser.add_argument("--format", choices=["ndjson", "csv"], default=None)
+        import_parser.add_argument("--chunk-size", type=int, default=bulk.IMPORT_CHUNK_SIZE)
+        import_parser.set_defaults(func=import_file)
+    subparsers.add_parser("build-model", help="Train the pricing model and write the compiled artifact workers load").set_defaults(func=build_model)
+
+    args = parser.parse_args(argv)
+    models.Base.metadata.create_all(bind=engine)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
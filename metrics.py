@@ -0,0 +1,119 @@
+# metrics.py
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event
+
+# METRICS_ENABLED=0 turns timers into no-ops and skips the SQL event hooks entirely
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(snapshot):
+            label_text = ",".join(f'{name}="{value}"' for name, value in zip(self.labelnames, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+stage_seconds = Histogram("eventmgmt_stage_duration_seconds", "Time spent in each stage of a hot-path operation.", ("operation", "stage"))
+sql_statement_seconds = Histogram("eventmgmt_sql_statement_duration_seconds", "Duration of individual SQL statements.", ())
+request_seconds = Histogram("eventmgmt_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+request_sql_statements = Histogram("eventmgmt_http_request_sql_statements", "SQL statements issued per HTTP request.", ("method", "route"), COUNT_BUCKETS)
+request_sql_seconds = Histogram("eventmgmt_http_request_sql_duration_seconds", "Total SQL time per HTTP request.", ("method", "route"))
+HISTOGRAMS = [stage_seconds, sql_statement_seconds, request_seconds, request_sql_statements, request_sql_seconds]
+
+class timed:
+    # with timed("book_ticket", "commit"): ...
+    __slots__ = ("operation", "stage", "start")
+
+    def __init__(self, operation: str, stage: str):
+        self.operation = operation
+        self.stage = stage
+
+    def __enter__(self):
+        if METRICS_ENABLED:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if METRICS_ENABLED:
+            stage_seconds.observe(time.perf_counter() - self.start, self.operation, self.stage)
+        return False
+
+# [statement count, SQL seconds] for the current request; a list so run_sync greenlets and
+# to_thread workers, which run on copies of the context, still update the same totals
+_request_sql: contextvars.ContextVar = contextvars.ContextVar("request_sql", default=None)
+
+def start_request():
+    return _request_sql.set([0, 0.0])
+
+def finish_request(token, method: str, route: str, elapsed: float):
+    totals = _request_sql.get()
+    _request_sql.reset(token)
+    request_seconds.observe(elapsed, method, route)
+    request_sql_statements.observe(totals[0], method, route)
+    request_sql_seconds.observe(totals[1], method, route)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    sql_statement_seconds.observe(elapsed)
+    totals = _request_sql.get()
+    if totals is not None:
+        totals[0] += 1
+        totals[1] += elapsed
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time so the stack on a
+    # pooled connection does not grow and pair later statements with stale starts
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts and context.execution_context is not None:
+        starts.pop()
+
+def instrument_engine(engine):
+    if METRICS_ENABLED:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+def render() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
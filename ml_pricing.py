@@ -1,15 +1,28 @@
 # ml_pricing.py
-import pandas as pd
+import hashlib
 import numpy as np
-from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler
-import joblib
 import os
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+# pandas, scikit-learn and joblib take seconds to import and are only needed to train, compile or
+# load the model, so they are imported inside those functions rather than when workers start
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
 
 MODEL_PATH = os.getenv("MODEL_PATH", "pricing_model.joblib")
+COMPILED_MODEL_PATH = os.getenv("COMPILED_MODEL_PATH", "pricing_model.compiled.joblib")
+# How long the background loader waits before trying again after a failed load
+MODEL_RETRY_SECONDS = float(os.getenv("MODEL_RETRY_SECONDS", "30"))
+
+_model = None
+_model_lock = threading.Lock()
 
 def generate_synthetic_data(n=2000):
+    import pandas as pd
+
     rng = np.random.RandomState(42)
     tickets_booked = rng.randint(0, 300, size=n)
     hours_to_event = rng.exponential(scale=48, size=n)
@@ -32,6 +45,11 @@ def generate_synthetic_data(n=2000):
     })
 
 def train_and_save_model(path=MODEL_PATH):
+    import joblib
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
     df = generate_synthetic_data()
     X = df[["tickets_booked", "hours_to_event", "base_price"]]
     y = df["price"]
@@ -40,21 +58,132 @@ def train_and_save_model(path=MODEL_PATH):
         ("reg", GradientBoostingRegressor(n_estimators=100, learning_rate=0.1, max_depth=3, random_state=42))
     ])
     pipeline.fit(X, y)
-    joblib.dump(pipeline, path)
+    _dump_atomic(pipeline, path)
     return pipeline
 
+def _dump_atomic(obj, path):
+    # Workers starting together may each build an artifact; writing a private temp file and renaming
+    # it into place means nobody ever loads a half-written one
+    import joblib
+
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _file_hash(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def load_model(path=MODEL_PATH):
+    import joblib
+
     if not os.path.exists(path):
         print("Pricing model not found. Training a new one...")
         return train_and_save_model(path)
     print("Loading existing pricing model.")
     return joblib.load(path)
 
-def predict_price(model, tickets_booked: int, hours_to_event: float, base_price: float):
-    X = pd.DataFrame([{
-        "tickets_booked": tickets_booked,
-        "hours_to_event": hours_to_event,
-        "base_price": base_price
-    }])
-    return float(model.predict(X)[0])
+class CompiledPricingModel:
+    """Flat NumPy copy of the scaler + gradient boosted trees, evaluated without pandas or sklearn checks."""
+
+    def __init__(self, pipeline: "Pipeline", source_hash: Optional[str] = None):
+        # Hash of the trained model file this was compiled from, so a retrained model is noticed
+        self.source_hash = source_hash
+        scaler = pipeline.named_steps["scaler"]
+        reg = pipeline.named_steps["reg"]
+        n_features = reg.n_features_in_
+        self.mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+        self.scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+        self.learning_rate = reg.learning_rate
+        self.baseline = 0.0 if reg.init_ == "zero" else float(reg.init_.predict(np.zeros((1, n_features)))[0])
+
+        # Concatenate every tree's node arrays, shifting child indices by each tree's offset
+        trees = [est[0].tree_ for est in reg.estimators_]
+        offsets = np.cumsum([0] + [t.node_count for t in trees[:-1]])
+        self.roots = offsets.astype(np.intp)
+        self.is_leaf = np.concatenate([t.children_left == -1 for t in trees])
+        self.left = np.concatenate([np.where(t.children_left == -1, 0, t.children_left) + o for t, o in zip(trees, offsets)]).astype(np.intp)
+        self.right = np.concatenate([np.where(t.children_right == -1, 0, t.children_right) + o for t, o in zip(trees, offsets)]).astype(np.intp)
+        self.feature = np.concatenate([np.maximum(t.feature, 0) for t in trees]).astype(np.intp)
+        self.threshold = np.concatenate([t.threshold for t in trees])
+        self.value = np.concatenate([t.value[:, 0, 0] for t in trees])
+        self.max_depth = max(t.max_depth for t in trees)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        # sklearn trees compare features as float32, so do the same to land on identical leaves
+        X = X.astype(np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0])).copy()
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            child = np.where(go_left, self.left[node], self.right[node])
+            node = np.where(self.is_leaf[node], node, child)
+        return self.baseline + self.learning_rate * self.value[node].sum(axis=1)
+
+def compile_model(pipeline: "Pipeline", source_hash: Optional[str] = None) -> CompiledPricingModel:
+    return CompiledPricingModel(pipeline, source_hash)
+
+def build_compiled_model(path=COMPILED_MODEL_PATH, model_path=MODEL_PATH):
+    compiled = compile_model(train_and_save_model(model_path), _file_hash(model_path))
+    _dump_atomic(compiled, path)
+    return compiled
+
+def load_compiled_model(path=COMPILED_MODEL_PATH, model_path=MODEL_PATH):
+    # Uncompressed joblib artifacts let every worker memory-map the node arrays instead of training
+    import joblib
+
+    source_hash = _file_hash(model_path) if os.path.exists(model_path) else None
+    if os.path.exists(path):
+        compiled = joblib.load(path, mmap_mode="r")
+        # Without the trained model alongside, the compiled artifact is all there is to trust
+        if source_hash is None or getattr(compiled, "source_hash", None) == source_hash:
+            print("Loading compiled pricing model.")
+            return compiled
+        print("Compiled pricing model does not match the trained model; recompiling.")
+    pipeline = load_model(model_path)
+    compiled = compile_model(pipeline, _file_hash(model_path))
+    _dump_atomic(compiled, path)
+    return compiled
+
+def get_model():
+    # None until warm_model() has finished; callers fall back to base prices meanwhile
+    return _model
+
+def warm_model():
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = load_compiled_model()
+    return _model
+
+def _load_in_background():
+    # Sales go at base price until a load succeeds, so failures are logged and retried, not left for good
+    while True:
+        try:
+            warm_model()
+            return
+        except Exception as e:
+            print(f"Loading the pricing model failed; retrying in {MODEL_RETRY_SECONDS:.0f}s: {e}")
+            time.sleep(MODEL_RETRY_SECONDS)
+
+def start_model_loading():
+    threading.Thread(target=_load_in_background, name="pricing-model-loader", daemon=True).start()
 
+def predict_price(model: CompiledPricingModel, tickets_booked, hours_to_event, base_price):
+    # Accepts scalars (returns a float) or equally-shaped arrays (returns an array)
+    columns = np.broadcast_arrays(tickets_booked, hours_to_event, base_price)
+    X = np.column_stack([np.atleast_1d(c) for c in columns]).astype(np.float64)
+    prices = model.predict(X)
+    if columns[0].ndim == 0:
+        return float(prices[0])
+    return prices
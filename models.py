@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Text, Table
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Text, Table, Index, text
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
@@ -7,7 +7,9 @@ import datetime
 # Association table for the many-to-many relationship between events and sponsors
 event_sponsor_association = Table('event_sponsor', Base.metadata,
     Column('event_id', Integer, ForeignKey('events.id')),
-    Column('sponsor_id', Integer, ForeignKey('sponsors.id'))
+    Column('sponsor_id', Integer, ForeignKey('sponsors.id'), index=True),
+    # Leads with event_id for loading an event's sponsors; also stops duplicate links
+    Index('uq_event_sponsor_event_id_sponsor_id', 'event_id', 'sponsor_id', unique=True)
 )
 
 class User(Base):
@@ -27,13 +29,26 @@ class Event(Base):
     title = Column(String(255), index=True)
     description = Column(Text)
     location = Column(String(255))
-    start_time = Column(DateTime)
+    start_time = Column(DateTime, index=True)
     end_time = Column(DateTime)
+    # Set when the event is deleted; its rows are purged in batches afterwards
+    deleted_at = Column(DateTime, nullable=True)
     tiers = relationship("Tier", back_populates="event", cascade="all, delete-orphan")
     services = relationship("Service", back_populates="event", cascade="all, delete-orphan")
     bookings = relationship("Booking", back_populates="event", cascade="all, delete-orphan")
     sponsors = relationship("Sponsor", secondary=event_sponsor_association, back_populates="events")
     ratings = relationship("Rating", back_populates="event", cascade="all, delete-orphan")
+    stats = relationship("EventStats", back_populates="event", uselist=False, cascade="all, delete-orphan")
+
+class EventStats(Base):
+    # Running totals kept in step with bookings/ratings so listings never aggregate those tables
+    __tablename__ = "event_stats"
+    event_id = Column(Integer, ForeignKey("events.id"), primary_key=True)
+    total_collection = Column(Float, nullable=False, default=0.0)
+    booking_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    event = relationship("Event", back_populates="stats")
 
 class Tier(Base):
     __tablename__ = "tiers"
@@ -42,17 +57,37 @@ class Tier(Base):
     price = Column(Float, nullable=False)
     total_seats = Column(Integer, nullable=False)
     seats_sold = Column(Integer, default=0)
-    event_id = Column(Integer, ForeignKey("events.id"))
+    # Seats reserved by unexpired holds; free seats are total_seats - seats_sold - seats_held
+    seats_held = Column(Integer, nullable=False, default=0, server_default="0")
+    event_id = Column(Integer, ForeignKey("events.id"), index=True)
     event = relationship("Event", back_populates="tiers")
     bookings = relationship("Booking", back_populates="tier")
 
+class SeatHold(Base):
+    # Seats reserved at a locked price until expires_at; deleted when redeemed, released or swept
+    __tablename__ = "seat_holds"
+    __table_args__ = (
+        # Active holds per phone, for the per-phone hold limit
+        Index("ix_seat_holds_user_phone_expires_at", "user_phone", "expires_at"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    token = Column(String(64), unique=True, nullable=False)
+    tier_id = Column(Integer, ForeignKey("tiers.id"), nullable=False, index=True)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    user_phone = Column(String(50), nullable=False)
+    qty = Column(Integer, nullable=False)
+    quoted_price = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # The sweeper finds expired holds through this index
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 class Service(Base):
     __tablename__ = "services"
     id = Column(Integer, primary_key=True, index=True)
     provider_name = Column(String(200), index=True)
     description = Column(Text)
     price = Column(Float)
-    event_id = Column(Integer, ForeignKey("events.id"))
+    event_id = Column(Integer, ForeignKey("events.id"), index=True)
     contact = Column(String(200))
     event = relationship("Event", back_populates="services")
 
@@ -66,24 +101,39 @@ class Sponsor(Base):
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Event booking pages filter on event_id and page on id
+        Index("ix_bookings_event_id_id", "event_id", "id"),
+        # Rating eligibility looks up a user's booking for an event
+        Index("ix_bookings_user_id_event_id", "user_id", "event_id"),
+        # Partial index: only bookings still waiting on the ledger writer, which recovery scans at startup
+        Index("ix_bookings_ledger_pending", "ledger_pending",
+              sqlite_where=text("ledger_pending = 1"), postgresql_where=text("ledger_pending")),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     event_id = Column(Integer, ForeignKey("events.id"))
-    tier_id = Column(Integer, ForeignKey("tiers.id"))
+    tier_id = Column(Integer, ForeignKey("tiers.id"), index=True)
     qty = Column(Integer, default=1)
     price_paid = Column(Float)
     ticket_hash = Column(String(128), unique=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     verified = Column(Boolean, default=False)
+    # Committed but its ledger block is not durable yet
+    ledger_pending = Column(Boolean, default=False)
     user = relationship("User", back_populates="bookings")
     event = relationship("Event", back_populates="bookings")
     tier = relationship("Tier", back_populates="bookings")
 
 class Rating(Base):
     __tablename__ = "ratings"
+    __table_args__ = (
+        # One rating per user per event; also serves the existing-rating lookup
+        Index("uq_ratings_event_id_user_id", "event_id", "user_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"))
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     rating = Column(Integer)
     event = relationship("Event", back_populates="ratings")
     user = relationship("User", back_populates="ratings")
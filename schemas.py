@@ -2,6 +2,7 @@
 from pydantic import BaseModel, EmailStr, validator
 from typing import Optional, List
 from datetime import datetime
+import math
 import re
 
 # --- Tier Schemas ---
@@ -16,6 +17,7 @@ class TierCreate(TierBase):
 class Tier(TierBase):
     id: int
     seats_sold: int
+    seats_held: int = 0
     class Config:
         from_attributes = True
 
@@ -56,6 +58,10 @@ class EventDetail(Event):
     total_collection: float
     average_rating: Optional[float] = None
 
+class EventPage(BaseModel):
+    items: List[EventDetail]
+    next_cursor: Optional[str] = None
+
 # --- Booking Schemas ---
 class BookingBase(BaseModel):
     user_phone: str
@@ -64,16 +70,42 @@ class BookingBase(BaseModel):
     qty: int
 
 class BookingCreate(BookingBase):
+    # Redeems a seat hold: the booking takes the held seats at the hold's quoted price
+    hold_token: Optional[str] = None
+
+    @validator('user_phone')
+    def validate_phone_number(cls, v):
+        if not re.match(r'^\d{10}$', v):
+            raise ValueError('Phone number must be exactly 10 digits.')
+        return v
+
+class HoldCreate(BaseModel):
+    user_phone: str
+    tier_id: int
+    qty: int
+    # Defaults to HOLD_MINUTES and is capped at MAX_HOLD_MINUTES
+    minutes: Optional[int] = None
+
     @validator('user_phone')
     def validate_phone_number(cls, v):
         if not re.match(r'^\d{10}$', v):
             raise ValueError('Phone number must be exactly 10 digits.')
         return v
 
+class SeatHold(BaseModel):
+    token: str
+    tier_id: int
+    event_id: int
+    qty: int
+    # Total price for qty, locked for the hold's lifetime
+    quoted_price: float
+    expires_at: datetime
+
 class Booking(BookingBase):
     id: int
     price_paid: float
     ticket_hash: str
+    ledger_pending: bool = False
     class Config:
         from_attributes = True
 
@@ -86,6 +118,38 @@ class BookingDetail(BaseModel):
     class Config:
         from_attributes = True
 
+class BookingPage(BaseModel):
+    items: List[BookingDetail]
+    next_cursor: Optional[str] = None
+
+class HistoricalBooking(BaseModel):
+    # A past sale imported from another system; event comes from the tier
+    user_phone: str
+    tier_id: int
+    qty: int
+    price_paid: float
+    ticket_hash: Optional[str] = None
+    created_at: Optional[datetime] = None
+    verified: bool = False
+
+    @validator('user_phone')
+    def validate_phone_number(cls, v):
+        if not re.match(r'^\d{10}$', v):
+            raise ValueError('Phone number must be exactly 10 digits.')
+        return v
+
+    @validator('qty')
+    def validate_qty(cls, v):
+        if v < 1:
+            raise ValueError('Quantity must be at least 1.')
+        return v
+
+    @validator('price_paid')
+    def validate_price_paid(cls, v):
+        if not math.isfinite(v) or v < 0:
+            raise ValueError('Price paid must be a non-negative amount.')
+        return v
+
 # --- Rating Schemas ---
 class RatingBase(BaseModel):
     rating: int
@@ -113,6 +177,35 @@ class VerifiedBookingDetail(BaseModel):
     user_phone: str
     qty: int
     ticket_hash: str
+    ledger_verified: bool = False
+    ledger_pending: bool = False
+
+class BatchVerifyRequest(BaseModel):
+    ticket_hashes: List[str]
+    # Scanners at a gate pass their event so tickets for other events are refused
+    event_id: Optional[int] = None
+
+class TicketScanResult(BaseModel):
+    ticket_hash: str
+    # admitted, already_used, wrong_event, not_found, or duplicate (repeated within the batch)
+    status: str
+    event_id: Optional[int] = None
+    user_phone: Optional[str] = None
+    qty: Optional[int] = None
+    ledger_verified: bool = False
+
+class BatchVerifyResponse(BaseModel):
+    results: List[TicketScanResult]
+    admitted: int
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportReport(BaseModel):
+    inserted: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
 
 class PriceRequest(BaseModel):
     tier_id: int
@@ -123,6 +216,19 @@ class PriceResponse(BaseModel):
     base_price: float
     quantity: int
 
+class BatchPriceRequest(BaseModel):
+    # Either explicit (tier_id, qty) pairs, or every tier of event_id for min_qty..max_qty
+    items: List[PriceRequest] = []
+    event_id: Optional[int] = None
+    min_qty: int = 1
+    max_qty: int = 1
+
+class PriceQuote(PriceResponse):
+    tier_id: int
+
+class BatchPriceResponse(BaseModel):
+    quotes: List[PriceQuote]
+
 class UserBase(BaseModel):
     email: EmailStr
 
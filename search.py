@@ -0,0 +1,117 @@
+# search.py
+import re
+from typing import Dict, Iterable, List
+
+from sqlalchemy import and_, bindparam, column, or_, text
+from sqlalchemy.orm import Session
+
+from . import models
+
+# SQLite keeps title/description/location in an FTS5 table whose rowid is the event id. Postgres
+# matches a tsvector expression instead, backed by a GIN index built on exactly that expression.
+SEARCH_TABLE = "events_fts"
+SEARCH_INDEX = "ix_events_search"
+# Up to this many text matches are passed to the page query as an id list; above it the page
+# walks the start_time index instead of reading every match
+BROAD_MATCH_THRESHOLD = 2000
+_PG_DOCUMENT = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(location, ''))"
+
+# Per database URL: "fts5", "postgresql", or None when only the LIKE fallback is available
+_backends: Dict[str, object] = {}
+
+def search_backend(db: Session):
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _backends:
+        if bind.dialect.name == "postgresql":
+            _backends[key] = "postgresql"
+        elif bind.dialect.name == "sqlite":
+            exists = db.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": SEARCH_TABLE}).first()
+            _backends[key] = "fts5" if exists else None
+        else:
+            _backends[key] = None
+    return _backends[key]
+
+def sqlite_has_fts5(db: Session) -> bool:
+    return "ENABLE_FTS5" in db.execute(text("PRAGMA compile_options")).scalars().all()
+
+def ensure_search_index(db: Session) -> bool:
+    # Creates the full-text index if it is missing; returns True when one was created
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql":
+        if db.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = :name"), {"name": SEARCH_INDEX}).first():
+            return False
+        # IF NOT EXISTS: several workers may start at once
+        db.execute(text(f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON events USING gin ({_PG_DOCUMENT})"))
+        db.commit()
+        return True
+    if bind.dialect.name != "sqlite" or search_backend(db) == "fts5":
+        return False
+    if not sqlite_has_fts5(db):
+        # SQLite built without FTS5: search falls back to LIKE
+        return False
+    db.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(title, description, location, tokenize='unicode61 remove_diacritics 2')"))
+    _backends[str(bind.url)] = "fts5"
+    rebuild_search_index(db)
+    return True
+
+def rebuild_search_index(db: Session) -> int:
+    count = db.query(models.Event).filter(models.Event.deleted_at.is_(None)).count()
+    if search_backend(db) == "fts5":
+        db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+        db.execute(text(
+            f"INSERT INTO {SEARCH_TABLE}(rowid, title, description, location) "
+            "SELECT id, coalesce(title, ''), coalesce(description, ''), coalesce(location, '') FROM events WHERE deleted_at IS NULL"
+        ))
+    db.commit()
+    return count
+
+def index_events(db: Session, events: Iterable[dict]):
+    # Call inside the transaction that writes the events; each dict needs id, title, description, location
+    if search_backend(db) != "fts5":
+        return
+    rows = [{
+        "id": event["id"],
+        "title": event.get("title") or "",
+        "description": event.get("description") or "",
+        "location": event.get("location") or "",
+    } for event in events]
+    if rows:
+        db.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), [{"id": row["id"]} for row in rows])
+        db.execute(text(f"INSERT INTO {SEARCH_TABLE}(rowid, title, description, location) VALUES (:id, :title, :description, :location)"), rows)
+
+def unindex_events(db: Session, event_ids: List[int]):
+    if search_backend(db) == "fts5" and event_ids:
+        db.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": list(event_ids)}
+        )
+
+def search_terms(q: str) -> List[str]:
+    return re.findall(r"\w+", q.lower())
+
+def text_filter(db: Session, q: str):
+    # Every word must match, as a prefix, in the title, description or location
+    terms = search_terms(q)
+    if not terms:
+        return None
+    backend = search_backend(db)
+    if backend == "fts5":
+        match = " ".join(f'"{term}"*' for term in terms)
+        ids = db.execute(
+            text(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match LIMIT :cap"),
+            {"match": match, "cap": BROAD_MATCH_THRESHOLD + 1}
+        ).scalars().all()
+        if len(ids) <= BROAD_MATCH_THRESHOLD:
+            return models.Event.id.in_(ids)
+        # Reading and sorting every match of a broad query is the slow plan; walking events in
+        # start_time order stops after one page. "id + 0" keeps the primary key from driving it.
+        matches = text(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match").bindparams(match=match).columns(column("rowid"))
+        return (models.Event.id + 0).in_(matches)
+    if backend == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        return text(f"{_PG_DOCUMENT} @@ to_tsquery('simple', :tsquery)").bindparams(tsquery=tsquery)
+    return and_(*[
+        or_(models.Event.title.ilike(f"%{term}%"), models.Event.description.ilike(f"%{term}%"), models.Event.location.ilike(f"%{term}%"))
+        for term in terms
+    ])
@@ -0,0 +1,32 @@
+# serialization.py
+import json
+from datetime import date, datetime
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder below gives the same JSON, only slower
+    orjson = None
+
+# Listing and booking pages are built as plain dicts straight from column rows and encoded here in
+# one pass, instead of one pydantic model per row followed by a second validation against
+# response_model. The output matches what the schemas would produce, so response_model stays on
+# those routes for the OpenAPI docs.
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+class FastJSONResponse(Response):
+    # Returned directly from a route, so FastAPI neither validates nor re-encodes the content
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,75 @@
+# conftest.py
+import os
+import shutil
+import tempfile
+
+# The package reads DATABASE_URL, LEDGER_DIR and the model paths at import time, so they are pointed
+# at a scratch directory before anything from it is imported
+WORKDIR = tempfile.mkdtemp(prefix="eventmgmt-tests-")
+os.makedirs(os.path.join(WORKDIR, "frontend"))
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(WORKDIR, 'test.db')}",
+    LEDGER_DIR=os.path.join(WORKDIR, "ledgers"),
+    RESPONSE_CACHE_DIR=os.path.join(WORKDIR, "cache"),
+    MODEL_PATH=os.path.join(WORKDIR, "pricing_model.joblib"),
+    COMPILED_MODEL_PATH=os.path.join(WORKDIR, "pricing_model.compiled.joblib"),
+    FRONTEND_DIR=os.path.join(WORKDIR, "frontend"),
+    METRICS_ENABLED="0",
+)
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from .. import blockchain, crud, models, schemas
+from ..cache import quote_cache, seat_counter
+from ..database import SessionLocal, engine
+
+@pytest.fixture(scope="session", autouse=True)
+def workdir():
+    yield WORKDIR
+    engine.dispose()
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+@pytest.fixture
+def db():
+    # Every test starts from empty tables, ledgers and caches
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    shutil.rmtree(blockchain.LEDGER_DIR, ignore_errors=True)
+    blockchain.clear_ticket_indexes()
+    quote_cache.clear()
+    seat_counter.clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def make_event(db):
+    def make(title="Test Event", tiers=(("GA", 100.0, 100),), sponsor_ids=(), hours_ahead=48):
+        start = datetime.utcnow() + timedelta(hours=hours_ahead)
+        return crud.create_event(db, schemas.EventCreate(
+            title=title, description="A test event", location="Pune",
+            start_time=start, end_time=start + timedelta(hours=3),
+            tiers=[schemas.TierCreate(name=name, price=price, total_seats=seats) for name, price, seats in tiers],
+            sponsor_ids=list(sponsor_ids)
+        ))
+    return make
+
+@contextmanager
+def count_statements():
+    # Collects every SQL statement the engine sends while the block runs
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
@@ -0,0 +1,56 @@
+# test_booking_load.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .. import blockchain, crud, models, schemas
+from ..database import SessionLocal
+
+LOAD_TEST_BOOKINGS = int(os.getenv("LOAD_TEST_BOOKINGS", "2000"))
+LOAD_TEST_THREADS = int(os.getenv("LOAD_TEST_THREADS", "32"))
+LOAD_TEST_SEATS = LOAD_TEST_BOOKINGS // 4
+
+def test_concurrent_bookings_never_oversell(db, make_event):
+    # Four times more booking attempts than seats, from many threads at once, on a single tier
+    event = make_event(tiers=(("GA", 50.0, LOAD_TEST_SEATS),))
+    tier_id = event.tiers[0].id
+    # A few hundred distinct phones, so concurrent first bookings also race to create the user
+    requests = [schemas.BookingCreate(user_phone=f"{9100000000 + i % 300}", event_id=event.id, tier_id=tier_id, qty=1)
+                for i in range(LOAD_TEST_BOOKINGS)]
+    start_line = threading.Barrier(LOAD_TEST_THREADS)
+    sold_out, unexpected = [], []
+
+    def book(i):
+        if i < LOAD_TEST_THREADS:
+            start_line.wait()
+        session = SessionLocal()
+        try:
+            crud.book_ticket(session, requests[i])
+            return True
+        except ValueError as e:
+            sold_out.append(str(e))
+        except Exception as e:
+            unexpected.append(repr(e))
+        finally:
+            session.close()
+        return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(LOAD_TEST_THREADS) as pool:
+        booked = sum(pool.map(book, range(LOAD_TEST_BOOKINGS)))
+    elapsed = time.perf_counter() - start
+    print(f"\n{LOAD_TEST_BOOKINGS} booking attempts on {LOAD_TEST_THREADS} threads: {booked} booked, "
+          f"{len(sold_out)} sold out, {LOAD_TEST_BOOKINGS / elapsed:.0f} attempts/s, {booked / elapsed:.0f} bookings/s")
+
+    assert unexpected == []
+    assert set(sold_out) <= {"Not enough tickets available in this tier"}
+    assert booked == LOAD_TEST_SEATS
+    assert booked + len(sold_out) == LOAD_TEST_BOOKINGS
+    db.expire_all()
+    tier = db.get(models.Tier, tier_id)
+    assert tier.seats_sold == LOAD_TEST_SEATS
+    assert db.query(models.Booking).join(models.User).filter(models.Booking.tier_id == tier_id).count() == LOAD_TEST_SEATS
+    chain = blockchain.SimpleChain(event_id=event.id)
+    assert chain.verify_chain() is None
+    assert chain.last_block.index == LOAD_TEST_SEATS
@@ -0,0 +1,90 @@
+# test_bulk.py
+import asyncio
+import io
+
+from sqlalchemy import select
+
+from .. import blockchain, bulk, models
+from ..async_crud import import_stream
+from ..database import AsyncSessionLocal
+
+EVENTS_CSV = (
+    'title,description,location,start_time,end_time,tiers\r\n'
+    'Jazz Night,"Doors at 7.\r\nBring ""cash"", no cards.",Pune,2030-01-01T19:00,2030-01-01T22:00,"[{""name"": ""GA"", ""price"": 50, ""total_seats"": 10}]"\r\n'
+    'Broken Row,Fine,Pune,not-a-date,2030-01-02T22:00,"[]"\r\n'
+    'Folk Fest,"Two\r\n\r\nparagraphs",Goa,2030-01-03T10:00,2030-01-03T18:00,"[{""name"": ""GA"", ""price"": 20, ""total_seats"": 5}]"\r\n'
+)
+
+def _import_events_csv(db, text, chunk_size=bulk.IMPORT_CHUNK_SIZE):
+    # Same file handling as manage.py import
+    return bulk.import_lines(db, io.StringIO(text, newline=""), "csv", bulk.import_event_chunk, chunk_size=chunk_size)
+
+def test_csv_quoted_fields_may_span_lines(db):
+    report = _import_events_csv(db, EVENTS_CSV)
+    assert report.inserted == 2
+    assert [(e.row, e.error.split(":")[0]) for e in report.errors] == [(4, "start_time")]
+    descriptions = dict(db.query(models.Event.title, models.Event.description).all())
+    assert descriptions == {"Jazz Night": 'Doors at 7.\r\nBring "cash", no cards.', "Folk Fest": "Two\r\n\r\nparagraphs"}
+
+def test_streamed_csv_matches_file_import(db):
+    # The upload arrives in arbitrary byte chunks that split records and lines
+    data = EVENTS_CSV.encode()
+
+    async def chunks():
+        for start in range(0, len(data), 7):
+            yield data[start:start + 7]
+
+    async def run():
+        async with AsyncSessionLocal() as session:
+            return await import_stream(session, chunks(), "csv", bulk.import_event_chunk)
+
+    report = asyncio.run(run())
+    assert report.inserted == 2
+    assert [e.row for e in report.errors] == [4]
+    assert db.query(models.Event.description).filter(models.Event.title == "Jazz Night").scalar() == 'Doors at 7.\r\nBring "cash", no cards.'
+
+def test_csv_unterminated_quote_is_reported(db):
+    report = _import_events_csv(db, 'title,description\r\nOpen,"never closed\r\nstill open\r\n')
+    assert report.inserted == 0
+    assert [(e.row, e.error) for e in report.errors] == [(2, "Unterminated quoted field")]
+
+def test_database_error_only_fails_its_own_row(db, monkeypatch):
+    real_index_events = bulk.index_events
+
+    def index_events(session, events):
+        if any(ev["title"] == "Folk Fest" for ev in events):
+            raise RuntimeError("disk I/O error")
+        real_index_events(session, events)
+
+    monkeypatch.setattr(bulk, "index_events", index_events)
+    report = _import_events_csv(db, EVENTS_CSV.replace("not-a-date", "2030-01-02T19:00"))
+    assert report.inserted == 2
+    assert [(e.row, e.error) for e in report.errors] == [(5, "Rejected by the database: RuntimeError")]
+    assert sorted(db.scalars(select(models.Event.title))) == ["Broken Row", "Jazz Night"]
+
+def test_booking_rows_are_validated(db, make_event):
+    tier = make_event(tiers=(("GA", 100.0, 10),)).tiers[0]
+    lines = [
+        f'{{"user_phone": "9000000001", "tier_id": {tier.id}, "qty": 1, "price_paid": 100}}',
+        f'{{"user_phone": "12345", "tier_id": {tier.id}, "qty": 1, "price_paid": 100}}',
+        f'{{"user_phone": "9000000002", "tier_id": {tier.id}, "qty": 1, "price_paid": -5}}',
+        f'{{"user_phone": "9000000003", "tier_id": {tier.id}, "qty": 1, "price_paid": NaN}}',
+        f'{{"user_phone": "9000000004", "tier_id": {tier.id}, "qty": 0, "price_paid": 100}}',
+    ]
+    report = bulk.import_lines(db, lines, "ndjson", bulk.import_booking_chunk)
+    assert report.inserted == 1
+    assert [(e.row, e.error.split(":")[0]) for e in report.errors] == [
+        (2, "user_phone"), (3, "price_paid"), (4, "price_paid"), (5, "qty")
+    ]
+
+def test_failed_ledger_write_leaves_bookings_pending(db, make_event, monkeypatch):
+    tier = make_event(tiers=(("GA", 100.0, 10),)).tiers[0]
+
+    def fail(self, entries):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(blockchain.SimpleChain, "add_blocks", fail)
+    lines = [f'{{"user_phone": "900000000{i}", "tier_id": {tier.id}, "qty": 1, "price_paid": 100}}' for i in range(3)]
+    report = bulk.import_lines(db, lines, "ndjson", bulk.import_booking_chunk)
+    assert report.inserted == 3
+    assert db.query(models.Booking).filter(models.Booking.ledger_pending.is_(True)).count() == 3
@@ -0,0 +1,58 @@
+# test_cache.py
+from fastapi.testclient import TestClient
+
+from .. import crud, schemas
+from ..cache import QuoteCache, quote_cache, response_cache
+from ..main import app
+
+def test_quote_priced_across_an_invalidation_is_not_cached():
+    cache = QuoteCache(maxsize=16, ttl=60)
+    generation = cache.generation()
+    # A booking on the event commits while the quote is being priced
+    cache.invalidate_event(7)
+    cache.put(1, 7, 2, "stale quote", generation)
+    assert cache.get(1, 2) is None
+
+def test_invalidation_discards_cached_quotes_for_that_event_only():
+    cache = QuoteCache(maxsize=16, ttl=60)
+    cache.put(1, 7, 1, "event 7 quote", cache.generation())
+    cache.put(2, 8, 1, "event 8 quote", cache.generation())
+    cache.invalidate_event(7)
+    assert cache.get(1, 1) is None
+    assert cache.get(2, 1) == "event 8 quote"
+
+def test_invalidation_records_stay_bounded_without_serving_stale_quotes():
+    cache = QuoteCache(maxsize=4, ttl=60)
+    generation = cache.generation()
+    cache.put(1, 1, 1, "quote", generation)
+    for event_id in range(1, 100):
+        cache.invalidate_event(event_id)
+    assert len(cache._invalidated) == 4
+    # Event 1's record was forgotten, but its quote still predates the invalidation
+    assert cache.get(1, 1) is None
+    cache.put(1, 1, 1, "quote", generation)
+    assert cache.get(1, 1) is None
+
+def test_booking_invalidates_cached_quotes(db, make_event):
+    ev = make_event()
+    request = schemas.PriceRequest(tier_id=ev.tiers[0].id, qty=1)
+    # Quotes are only cached once the pricing model is loaded
+    quote_cache.put(request.tier_id, ev.id, request.qty, "cached", quote_cache.generation())
+    assert crud.get_dynamic_price(db, request) == "cached"
+    crud.book_ticket(db, schemas.BookingCreate(user_phone="9000000001", event_id=ev.id, tier_id=request.tier_id, qty=1))
+    assert crud.get_dynamic_price(db, request) != "cached"
+
+def test_sponsor_list_etag_changes_only_on_writes(db):
+    client = TestClient(app)
+    # Cached bodies outlive each test's tables, so start from a fresh generation
+    response_cache.bump("sponsors")
+    client.post("/api/sponsors", json={"name": "Acme"})
+    first = client.get("/api/sponsors")
+    assert first.status_code == 200 and [s["name"] for s in first.json()] == ["Acme"]
+    etag = first.headers["etag"]
+
+    assert client.get("/api/sponsors", headers={"If-None-Match": etag}).status_code == 304
+    client.post("/api/sponsors", json={"name": "Globex"})
+    changed = client.get("/api/sponsors", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert [s["name"] for s in changed.json()] == ["Acme", "Globex"]
@@ -0,0 +1,21 @@
+# test_database.py
+import pytest
+
+from ..database import _async_url, _sync_url
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./event.db", "sqlite+aiosqlite:///./event.db"),
+    ("sqlite:///:memory:", "sqlite+aiosqlite:///:memory:"),
+    ("postgres://app:secret@db:5432/events", "postgresql+asyncpg://app:secret@db:5432/events"),
+    ("postgresql://app:secret@db/events", "postgresql+asyncpg://app:secret@db/events"),
+    ("postgresql+psycopg2://app@db/events", "postgresql+asyncpg://app@db/events"),
+    ("postgresql+psycopg://app@db/events", "postgresql+asyncpg://app@db/events"),
+    ("postgresql://app@db/events?sslmode=require", "postgresql+asyncpg://app@db/events?ssl=require"),
+    ("postgresql+asyncpg://app@db/events", "postgresql+asyncpg://app@db/events"),
+])
+def test_async_url_uses_the_async_driver(url, expected):
+    assert _async_url(_sync_url(url)) == expected
+
+def test_sync_url_accepts_postgres_scheme():
+    assert _sync_url("postgres://app@db/events") == "postgresql://app@db/events"
+    assert _sync_url("sqlite:///./event.db") == "sqlite:///./event.db"
@@ -0,0 +1,66 @@
+# test_delete.py
+import os
+
+import pytest
+
+from .. import blockchain, bulk, crud, models, schemas
+from ..blockchain import LedgerWriter
+
+def book(db, ev, phone="9000000001"):
+    booking, entry = crud.commit_booking(db, schemas.BookingCreate(user_phone=phone, event_id=ev.id, tier_id=ev.tiers[0].id, qty=1))
+    return booking, entry
+
+def test_soft_deleted_event_is_not_served(db, make_event):
+    ev = make_event()
+    booking, entry = book(db, ev)
+    crud.write_ledger_entry(entry)
+    assert crud.mark_event_deleted(db, ev.id)
+
+    assert crud.verify_ticket(db, booking.ticket_hash) is None
+    scan = crud.verify_and_mark_tickets(db, schemas.BatchVerifyRequest(ticket_hashes=[booking.ticket_hash]))
+    assert scan.admitted == 0 and scan.results[0].status == "not_found"
+    assert crud.get_bookings_for_event(db, ev.id)["items"] == []
+    with pytest.raises(ValueError, match="Event not found"):
+        crud.create_event_rating(db, ev.id, schemas.RatingCreate(user_phone="9000000001", rating=5))
+
+def test_bulk_import_rejects_bookings_for_deleted_events(db, make_event):
+    ev = make_event()
+    tier = ev.tiers[0]
+    assert crud.mark_event_deleted(db, ev.id)
+    line = f'{{"user_phone": "9000000001", "tier_id": {tier.id}, "qty": 1, "price_paid": 100}}'
+    report = bulk.import_lines(db, [line], "ndjson", bulk.import_booking_chunk)
+    assert report.inserted == 0
+    assert [(e.row, e.error) for e in report.errors] == [(1, "Tier not found")]
+
+    # An event deleted after the chunk read its tiers is caught by the seat reservation
+    booking = schemas.HistoricalBooking(user_phone="9000000001", tier_id=tier.id, qty=1, price_paid=100)
+    with pytest.raises(ValueError, match="deleted during import"):
+        bulk._insert_bookings(db, [(1, booking, {"id": tier.id, "event_id": ev.id, "name": tier.name})])
+    db.rollback()
+    assert db.query(models.Booking).count() == 0
+
+def test_archive_writes_only_that_events_queued_blocks(db, make_event, monkeypatch):
+    deleted, other = make_event(title="Deleted"), make_event(title="Other")
+    writer = LedgerWriter(on_written=crud._mark_entries_written, creates_ledger=crud._event_is_live)
+    writer.write([book(db, deleted)[1]])
+    _, deleted_entry = book(db, deleted, phone="9000000003")
+    _, other_entry = book(db, other)
+    # Queued as a running writer would hold them, without a thread draining the queue
+    writer._queue.put(deleted_entry)
+    writer._queue.put(other_entry)
+    monkeypatch.setattr(crud, "ledger_writer", writer)
+
+    assert crud.mark_event_deleted(db, deleted.id)
+    archived = crud.archive_event_ledger(deleted.id)
+    assert writer.pending() == 1
+    assert len(archived) == 1
+    with open(archived[0]) as f:
+        assert deleted_entry["ticket_hash"] in f.read()
+
+    # A block another worker still had queued must not recreate the archived ledger
+    _, late_entry = book(db, other, phone="9000000002")
+    assert writer.write([dict(late_entry, event_id=deleted.id)]) == []
+    assert not os.path.exists(blockchain._chain_file(deleted.id, blockchain.LEDGER_DIR))
+    # Live events still get new ledgers
+    assert writer.write([other_entry]) == []
+    assert blockchain.lookup_ticket(other.id, other_entry["ticket_hash"]) is not None
@@ -0,0 +1,63 @@
+# test_export.py
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from .. import async_crud, crud, schemas
+from ..main import app
+
+@pytest.fixture
+def event_with_bookings(db, make_event, monkeypatch):
+    # Five bookings with a batch size of two: two full yield_per batches and a partial one
+    monkeypatch.setattr(async_crud, "EXPORT_BATCH_SIZE", 2)
+    ev = make_event(tiers=(("GA", 100.0, 100), ("VIP", 250.0, 10)))
+    bookings = [
+        crud.book_ticket(db, schemas.BookingCreate(user_phone=f"900000000{i}", event_id=ev.id, tier_id=ev.tiers[i % 2].id, qty=i + 1))
+        for i in range(5)
+    ]
+    crud.verify_and_mark_tickets(db, schemas.BatchVerifyRequest(ticket_hashes=[bookings[1].ticket_hash]))
+    expected = [
+        (b.id, b.ticket_hash, b.user_phone, ev.tiers[i % 2].name, b.qty, b.price_paid, i == 1)
+        for i, b in enumerate(bookings)
+    ]
+    return ev, expected
+
+def test_ndjson_export_matches_bookings_across_batches(event_with_bookings):
+    ev, expected = event_with_bookings
+    response = TestClient(app).get(f"/api/events/{ev.id}/bookings/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [
+        (r["booking_id"], r["ticket_hash"], r["user_phone"], r["tier_name"], r["qty"], r["price_paid"], r["verified"])
+        for r in rows
+    ] == expected
+    assert all(r["created_at"] for r in rows)
+
+def test_csv_export_matches_bookings_across_batches(event_with_bookings):
+    ev, expected = event_with_bookings
+    response = TestClient(app).get(f"/api/events/{ev.id}/bookings/export", params={"format": "csv"})
+    assert response.status_code == 200
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header == async_crud.EXPORT_COLUMNS
+    assert [
+        (int(r[0]), r[1], r[2], r[3], int(r[4]), float(r[5]), r[7] == "1") for r in rows
+    ] == expected
+
+def test_export_streams_one_chunk_per_batch(event_with_bookings):
+    ev, _ = event_with_bookings
+
+    async def collect():
+        return [chunk async for chunk in async_crud.export_event_bookings(ev.id, "ndjson")]
+
+    assert [chunk.count("\n") for chunk in asyncio.run(collect())] == [2, 2, 1]
+
+def test_export_of_a_deleted_event_is_not_found(db, event_with_bookings):
+    ev, _ = event_with_bookings
+    assert crud.mark_event_deleted(db, ev.id)
+    assert TestClient(app).get(f"/api/events/{ev.id}/bookings/export").status_code == 404
+    assert TestClient(app).get("/api/events/999/bookings/export", params={"format": "csv"}).status_code == 404
@@ -0,0 +1,80 @@
+# test_holds.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from .. import crud, models, schemas
+
+@pytest.fixture
+def model_ready(monkeypatch):
+    # Stands in for a loaded pricing model that quotes the base price
+    monkeypatch.setattr(crud, "get_model", lambda: object())
+    monkeypatch.setattr(crud, "predict_price", lambda model, booked, hours, base_price: base_price)
+
+def hold(db, tier, phone="9000000001"):
+    return crud.create_hold(db, schemas.HoldCreate(user_phone=phone, tier_id=tier.id, qty=1))
+
+def test_holds_are_refused_while_the_model_loads(db, make_event, monkeypatch):
+    monkeypatch.setattr(crud, "get_model", lambda: None)
+    tier = make_event().tiers[0]
+    with pytest.raises(ValueError, match="Pricing is not ready"):
+        hold(db, tier)
+    assert db.query(models.SeatHold).count() == 0
+
+def test_active_holds_per_phone_are_limited(db, make_event, model_ready, monkeypatch):
+    monkeypatch.setattr(crud, "MAX_ACTIVE_HOLDS_PER_PHONE", 2)
+    tier = make_event().tiers[0]
+    hold(db, tier)
+    hold(db, tier)
+    with pytest.raises(ValueError, match="at most 2 holds"):
+        hold(db, tier)
+    db.refresh(tier)
+    assert tier.seats_held == 2
+    # Other phones are unaffected, and expired holds no longer count
+    hold(db, tier, phone="9000000002")
+    db.query(models.SeatHold).update({models.SeatHold.expires_at: datetime.utcnow() - timedelta(minutes=1)})
+    db.commit()
+    assert hold(db, tier).quoted_price == 100.0
+
+def book(db, tier, token=None, phone="9000000001", qty=1):
+    return crud.book_ticket(db, schemas.BookingCreate(user_phone=phone, event_id=tier.event_id, tier_id=tier.id, qty=qty, hold_token=token))
+
+def test_redeemed_hold_books_at_the_locked_price(db, make_event, model_ready, monkeypatch):
+    tier = make_event().tiers[0]
+    seat_hold = hold(db, tier)
+    # Demand moved the price after the quote was given
+    monkeypatch.setattr(crud, "predict_price", lambda model, booked, hours, base_price: base_price * 3)
+    assert book(db, tier, seat_hold.token).price_paid == seat_hold.quoted_price == 100.0
+    assert book(db, tier, phone="9000000002").price_paid > seat_hold.quoted_price
+    db.refresh(tier)
+    assert (tier.seats_held, tier.seats_sold) == (0, 2)
+    assert db.query(models.SeatHold).count() == 0
+
+def test_hold_is_redeemed_once_and_only_by_its_own_booking(db, make_event, model_ready):
+    tier = make_event().tiers[0]
+    seat_hold = crud.create_hold(db, schemas.HoldCreate(user_phone="9000000001", tier_id=tier.id, qty=2))
+    with pytest.raises(ValueError, match="Hold not found or expired"):
+        book(db, tier, seat_hold.token, qty=1)
+    with pytest.raises(ValueError, match="Hold not found or expired"):
+        book(db, tier, seat_hold.token, phone="9000000002", qty=2)
+    book(db, tier, seat_hold.token, qty=2)
+    with pytest.raises(ValueError, match="Hold not found or expired"):
+        book(db, tier, seat_hold.token, qty=2)
+    db.refresh(tier)
+    assert (tier.seats_held, tier.seats_sold) == (0, 2)
+    assert db.query(models.Booking).count() == 1
+
+def test_sweeper_releases_expired_holds_for_booking(db, make_event, model_ready):
+    tier = make_event(tiers=(("GA", 100.0, 1),)).tiers[0]
+    seat_hold = hold(db, tier)
+    with pytest.raises(ValueError, match="Not enough tickets"):
+        book(db, tier, phone="9000000002")
+    db.query(models.SeatHold).update({models.SeatHold.expires_at: datetime.utcnow() - timedelta(minutes=1)})
+    db.commit()
+
+    assert crud.release_expired_holds(db) == 1
+    db.refresh(tier)
+    assert tier.seats_held == 0
+    with pytest.raises(ValueError, match="Hold not found or expired"):
+        book(db, tier, seat_hold.token)
+    assert book(db, tier, phone="9000000002").price_paid == 100.0
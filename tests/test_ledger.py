@@ -0,0 +1,129 @@
+# test_ledger.py
+import os
+import threading
+from datetime import datetime, timedelta
+
+from .. import blockchain, crud, models, schemas
+from ..blockchain import LedgerWriter, SimpleChain
+
+def ticket(i, padding=0):
+    return {"ticket_hash": f"ticket-{i}", "event_id": 1, "user_phone": "9000000001", "qty": 1, "price_paid": 10.0, "note": "x" * padding}
+
+def test_torn_write_is_dropped_when_the_last_block_spans_chunks(tmp_path):
+    # Blocks longer than the 4096-byte read step put the chunk boundary inside the last complete line
+    chain = SimpleChain(event_id=1, ledger_dir=str(tmp_path))
+    chain.add_blocks([ticket(i, padding=6000) for i in range(3)])
+    intact_size = os.path.getsize(chain.chain_file)
+    with open(chain.chain_file, 'ab') as f:
+        f.write(b'{"index": 4, "timestamp": 1.0, "da')
+
+    reopened = SimpleChain(event_id=1, ledger_dir=str(tmp_path))
+    assert reopened.last_block.index == 3
+    assert os.path.getsize(chain.chain_file) == intact_size
+    assert reopened.add_block(ticket(3)).index == 4
+    assert reopened.verify_chain() is None
+
+def test_ledger_holding_only_a_torn_write_restarts_at_genesis(tmp_path):
+    chain_file = os.path.join(str(tmp_path), "blockchain_event_1.jsonl")
+    with open(chain_file, 'wb') as f:
+        f.write(b'{"index": 0, "times')
+    chain = SimpleChain(event_id=1, ledger_dir=str(tmp_path))
+    assert chain.last_block.index == 0
+    assert chain.verify_chain() is None
+
+def test_verify_ledger_does_not_modify_files(tmp_path):
+    ledger_dir = str(tmp_path)
+    chain = SimpleChain(event_id=1, ledger_dir=ledger_dir)
+    chain.add_block(ticket(0))
+    assert blockchain.verify_ledger(1, ledger_dir) is None
+
+    with open(chain.chain_file, 'ab') as f:
+        f.write(b'{"index": 2')
+    torn_size = os.path.getsize(chain.chain_file)
+    assert "torn write" in blockchain.verify_ledger(1, ledger_dir)
+    assert os.path.getsize(chain.chain_file) == torn_size
+
+    assert blockchain.verify_ledger(2, ledger_dir) == "ledger file is missing"
+    assert not os.path.exists(os.path.join(ledger_dir, "blockchain_event_2.jsonl"))
+
+def test_stale_index_offsets_are_rebuilt(tmp_path):
+    ledger_dir = str(tmp_path)
+    chain = SimpleChain(event_id=1, ledger_dir=ledger_dir)
+    chain.add_blocks([ticket(i) for i in range(5)])
+    assert blockchain.lookup_ticket(1, "ticket-4", ledger_dir)["ticket_hash"] == "ticket-4"
+
+    # Rewrite the ledger with different line lengths, leaving the old offsets in memory and in the .idx
+    blockchain._ledger_locks.clear()
+    os.remove(chain.chain_file)
+    rewritten = SimpleChain(event_id=1, ledger_dir=ledger_dir)
+    rewritten.add_blocks([ticket(i, padding=37) for i in range(5)])
+    blockchain.clear_ticket_indexes()
+    index_file = os.path.splitext(chain.chain_file)[0] + ".idx"
+    with open(index_file, 'rb') as f:
+        old_lines = f.read().split(b"\n")[:5]
+    with open(index_file, 'wb') as f:
+        f.write(b"\n".join(old_lines) + b"\n")
+
+    for i in range(5):
+        data = blockchain.lookup_ticket(1, f"ticket-{i}", ledger_dir)
+        assert data["ticket_hash"] == f"ticket-{i}" and len(data["note"]) == 37
+    assert blockchain.lookup_ticket(1, "ticket-9", ledger_dir) is None
+    with open(index_file, 'rb') as f:
+        assert len(f.read().splitlines()) == 5
+
+def test_ticket_indexes_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(blockchain, "TICKET_INDEX_MAX_ENTRIES", 10)
+    ledger_dir = str(tmp_path)
+    for event_id in range(1, 5):
+        SimpleChain(event_id=event_id, ledger_dir=ledger_dir).add_blocks([ticket(i) for i in range(4)])
+    for event_id in range(1, 5):
+        assert blockchain.lookup_ticket(event_id, "ticket-3", ledger_dir) is not None
+    assert sum(len(index.entries) for index in blockchain._ticket_indexes.values()) <= 10 + 4
+    assert blockchain.lookup_ticket(1, "ticket-0", ledger_dir) is not None
+    # The running total matches the cached indexes once each has been fetched since it last grew
+    for chain_file in list(blockchain._ticket_indexes):
+        blockchain.get_ticket_index(chain_file)
+    assert blockchain._ticket_index_entries == sum(index.counted_entries for index in blockchain._ticket_indexes.values())
+    assert blockchain._ticket_index_entries <= 10 + 4
+
+def test_skip_written_never_appends_a_ticket_twice(tmp_path):
+    chain = SimpleChain(event_id=1, ledger_dir=str(tmp_path))
+    chain.add_blocks([ticket(0), ticket(1)])
+    added = chain.add_blocks([ticket(1), ticket(2)], skip_written=True)
+    assert [block.data["ticket_hash"] for block in added] == ["ticket-2"]
+    assert chain.add_blocks([ticket(0)], skip_written=True) == []
+    assert [block.index for block in chain.iter_blocks()] == [0, 1, 2, 3]
+
+def test_recovery_leaves_recent_bookings_to_the_live_writer(db, make_event):
+    ev = make_event()
+    booking, entry = crud.commit_booking(db, schemas.BookingCreate(user_phone="9000000001", event_id=ev.id, tier_id=ev.tiers[0].id, qty=1))
+    assert crud.recover_pending_ledger_entries(db) == (0, 0)
+
+    # Once it is old enough, a block the writer did append meanwhile is only marked, not added again
+    SimpleChain(event_id=ev.id).add_blocks([entry])
+    db.query(models.Booking).update({models.Booking.created_at: datetime.utcnow() - timedelta(minutes=5)})
+    db.commit()
+    assert crud.recover_pending_ledger_entries(db) == (1, 0)
+    assert blockchain.verify_ledger(ev.id) is None
+    assert sum(1 for block in SimpleChain(event_id=ev.id).iter_blocks()) == 2
+    assert db.query(models.Booking.ledger_pending).scalar() is False
+
+def test_writer_retries_failed_batches(db, monkeypatch):
+    real_add_blocks, attempts = SimpleChain.add_blocks, []
+
+    def flaky_add_blocks(self, data_items, skip_written=False):
+        attempts.append(len(data_items))
+        if len(attempts) < 3:
+            raise OSError("No space left on device")
+        return real_add_blocks(self, data_items, skip_written)
+
+    monkeypatch.setattr(SimpleChain, "add_blocks", flaky_add_blocks)
+    written = threading.Event()
+    writer = LedgerWriter(on_written=lambda entries: written.set(), retry_seconds=0.01)
+    writer.start()
+    try:
+        writer.submit(ticket(0))
+        assert written.wait(5)
+    finally:
+        writer.stop()
+    assert attempts == [1, 1, 1]
@@ -0,0 +1,55 @@
+# test_listing.py
+import pytest
+
+from .. import crud, schemas
+from .conftest import count_statements
+
+@pytest.fixture
+def listed_events(db, make_event):
+    sponsor = crud.create_sponsor(db, schemas.SponsorCreate(name="Acme"))
+    events = [
+        make_event(title=f"Event {i}", tiers=(("GA", 100.0, 50), ("VIP", 250.0, 10)), sponsor_ids=[sponsor.id])
+        for i in range(60)
+    ]
+    for i, ev in enumerate(events[:10]):
+        phone = f"90000000{i:02d}"
+        crud.book_ticket(db, schemas.BookingCreate(user_phone=phone, event_id=ev.id, tier_id=ev.tiers[0].id, qty=2))
+        crud.create_event_rating(db, ev.id, schemas.RatingCreate(user_phone=phone, rating=i % 5 + 1))
+    return events
+
+@pytest.mark.parametrize("limit", [1, 5, 50])
+def test_list_events_statement_count_does_not_grow_with_limit(db, listed_events, limit):
+    # One page query (events joined to event_stats), then tiers and sponsors for the whole page
+    with count_statements() as statements:
+        page = crud.list_events(db, limit=limit)
+    assert len(page["items"]) == limit
+    assert len(statements) == 3
+
+def test_search_events_statement_count_does_not_grow_with_limit(db, listed_events):
+    counts = []
+    for limit in (5, 50):
+        with count_statements() as statements:
+            crud.search_events(db, q="test", min_price=50, limit=limit)
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+def test_list_events_reports_totals_and_average_rating(db, listed_events):
+    items = {item["id"]: item for item in crud.list_events(db, limit=60)["items"]}
+    booked = items[listed_events[3].id]
+    assert booked["total_collection"] > 0
+    assert booked["average_rating"] == 4
+    unbooked = items[listed_events[30].id]
+    assert unbooked["total_collection"] == 0.0
+    assert unbooked["average_rating"] is None
+    assert [tier["name"] for tier in unbooked["tiers"]] == ["GA", "VIP"]
+    assert [sponsor["name"] for sponsor in unbooked["sponsors"]] == ["Acme"]
+
+def test_list_events_pages_cover_every_event_once(db, listed_events):
+    seen, cursor = [], None
+    while True:
+        page = crud.list_events(db, cursor=cursor, limit=7)
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(ev.id for ev in listed_events)
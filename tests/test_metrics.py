@@ -0,0 +1,65 @@
+# test_metrics.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from .. import crud, metrics, schemas
+from ..database import async_engine, engine
+from ..main import app
+
+@pytest.fixture
+def metrics_on(monkeypatch):
+    # The suite runs with METRICS_ENABLED=0, so the engines were never instrumented
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    engines = [engine, async_engine.sync_engine]
+    for target in engines:
+        metrics.instrument_engine(target)
+    yield
+    for target in engines:
+        event.remove(target, "before_cursor_execute", metrics._before_cursor_execute)
+        event.remove(target, "after_cursor_execute", metrics._after_cursor_execute)
+        event.remove(target, "handle_error", metrics._handle_error)
+
+def observed(histogram, *labels):
+    # (observation count, sum) so far for one label set
+    series = histogram._series.get(labels)
+    return (series[2], series[1]) if series else (0, 0)
+
+def test_request_records_its_statements_and_latency(db, metrics_on):
+    crud.create_sponsor(db, schemas.SponsorCreate(name="Acme"))
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    labels = ("GET", "/api/sponsors")
+    per_request = (metrics.request_seconds, metrics.request_sql_statements, metrics.request_sql_seconds)
+    before = [observed(h, *labels) for h in per_request]
+    sql_before = observed(metrics.sql_statement_seconds)[0]
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        client = TestClient(app)
+        assert client.get("/api/sponsors").status_code == 200
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    after = [observed(h, *labels) for h in per_request]
+    assert statements
+    assert [count - count_before for (count, _), (count_before, _) in zip(after, before)] == [1, 1, 1]
+    assert after[1][1] - before[1][1] == len(statements)
+    assert observed(metrics.sql_statement_seconds)[0] - sql_before == len(statements)
+
+    exposed = client.get("/metrics").text
+    count, total = observed(metrics.request_sql_statements, *labels)
+    assert f'eventmgmt_http_request_sql_statements_count{{method="GET",route="/api/sponsors"}} {count}' in exposed
+    assert f'eventmgmt_http_request_sql_statements_sum{{method="GET",route="/api/sponsors"}} {total}' in exposed
+    assert 'eventmgmt_http_request_duration_seconds_bucket{method="GET",route="/api/sponsors",le="+Inf"}' in exposed
+
+def test_failed_statement_does_not_leave_its_start_time(db, metrics_on):
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        assert conn.info["query_start"] == []
+        conn.execute(text("SELECT 1"))
+        assert conn.info["query_start"] == []
@@ -0,0 +1,91 @@
+# test_ml_pricing.py
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+
+from .. import ml_pricing
+
+FEATURES = ["tickets_booked", "hours_to_event", "base_price"]
+
+@pytest.fixture(scope="module")
+def pipeline(tmp_path_factory):
+    return ml_pricing.train_and_save_model(str(tmp_path_factory.mktemp("model") / "pricing_model.joblib"))
+
+@pytest.fixture(scope="module")
+def compiled(pipeline):
+    return ml_pricing.compile_model(pipeline)
+
+def sample_features(n, seed=0):
+    # Covers the training range and beyond it, where every tree ends in its outermost leaves
+    rng = np.random.RandomState(seed)
+    return np.column_stack([
+        rng.randint(0, 600, size=n),
+        np.concatenate([rng.exponential(scale=48, size=n - 4), [0.1, 0.0, 1e4, 1e6]]),
+        rng.uniform(1, 600, size=n),
+    ]).astype(np.float64)
+
+def test_compiled_model_matches_pipeline(pipeline, compiled):
+    X = sample_features(5000)
+    expected = pipeline.predict(pd.DataFrame(X, columns=FEATURES))
+    np.testing.assert_allclose(compiled.predict(X), expected, rtol=1e-12, atol=1e-9)
+
+def test_compiled_model_matches_pipeline_on_split_thresholds(pipeline, compiled):
+    # Values exactly on a split threshold must take the same branch as sklearn
+    reg = pipeline.named_steps["reg"]
+    scaler = pipeline.named_steps["scaler"]
+    rows = []
+    for est in reg.estimators_[:20]:
+        tree = est[0].tree_
+        for node in np.flatnonzero(tree.children_left != -1):
+            row = scaler.mean_.copy()
+            feature = tree.feature[node]
+            row[feature] = tree.threshold[node] * scaler.scale_[feature] + scaler.mean_[feature]
+            rows.append(row)
+    X = np.array(rows)
+    expected = pipeline.predict(pd.DataFrame(X, columns=FEATURES))
+    np.testing.assert_allclose(compiled.predict(X), expected, rtol=1e-12, atol=1e-9)
+
+def test_predict_price_scalar_and_batch_agree(compiled):
+    X = sample_features(200, seed=1)
+    batch = ml_pricing.predict_price(compiled, X[:, 0], X[:, 1], X[:, 2])
+    scalars = [ml_pricing.predict_price(compiled, *row) for row in X]
+    assert isinstance(scalars[0], float)
+    np.testing.assert_array_equal(batch, scalars)
+
+def test_memory_mapped_artifact_predicts_the_same(compiled, tmp_path):
+    path = str(tmp_path / "compiled.joblib")
+    joblib.dump(compiled, path)
+    loaded = joblib.load(path, mmap_mode="r")
+    X = sample_features(500, seed=2)
+    np.testing.assert_array_equal(loaded.predict(X), compiled.predict(X))
+
+def test_compiled_artifact_is_rebuilt_after_retraining(pipeline, tmp_path):
+    model_path, compiled_path = str(tmp_path / "model.joblib"), str(tmp_path / "compiled.joblib")
+    joblib.dump(pipeline, model_path)
+    first = ml_pricing.load_compiled_model(compiled_path, model_path)
+    assert ml_pricing.load_compiled_model(compiled_path, model_path).source_hash == first.source_hash
+
+    # A retrained model must not be shadowed by the artifact compiled from the old one
+    df = ml_pricing.generate_synthetic_data(500)
+    retrained = clone(pipeline).set_params(reg__n_estimators=20).fit(df[FEATURES], df["price"])
+    joblib.dump(retrained, model_path)
+    reloaded = ml_pricing.load_compiled_model(compiled_path, model_path)
+    assert reloaded.source_hash == ml_pricing._file_hash(model_path) != first.source_hash
+    X = sample_features(200, seed=3)
+    np.testing.assert_allclose(reloaded.predict(X), retrained.predict(pd.DataFrame(X, columns=FEATURES)), rtol=1e-12, atol=1e-9)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["compiled.joblib", "model.joblib"]
+
+def test_background_loader_retries_failed_loads(monkeypatch):
+    calls = []
+
+    def flaky_warm_model():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OSError("artifact unreadable")
+
+    monkeypatch.setattr(ml_pricing, "warm_model", flaky_warm_model)
+    monkeypatch.setattr(ml_pricing, "MODEL_RETRY_SECONDS", 0)
+    ml_pricing._load_in_background()
+    assert len(calls) == 3
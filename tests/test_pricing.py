@@ -0,0 +1,38 @@
+# test_pricing.py
+import pytest
+
+from .. import crud, schemas
+
+def test_batch_quotes_every_tier_and_quantity(db, make_event):
+    ev = make_event(tiers=(("GA", 100.0, 50), ("VIP", 300.0, 5)))
+    quotes = crud.get_dynamic_prices(db, schemas.BatchPriceRequest(event_id=ev.id, min_qty=1, max_qty=3)).quotes
+    assert [(quote.tier_id, quote.quantity) for quote in quotes] == [
+        (tier.id, qty) for tier in ev.tiers for qty in (1, 2, 3)
+    ]
+    # No model loaded in tests, so quotes are at base price
+    assert all(quote.dynamic_price == quote.base_price for quote in quotes)
+
+def test_batch_refuses_oversized_range_before_building_rows(db, make_event):
+    ev = make_event()
+    with pytest.raises(ValueError, match="at most"):
+        crud.get_dynamic_prices(db, schemas.BatchPriceRequest(event_id=ev.id, min_qty=1, max_qty=10**9))
+
+def test_batch_refuses_too_many_items(db, make_event):
+    tier_id = make_event().tiers[0].id
+    items = [schemas.PriceRequest(tier_id=tier_id, qty=1)] * (crud.MAX_BATCH_QUOTES + 1)
+    with pytest.raises(ValueError, match="at most"):
+        crud.get_dynamic_prices(db, schemas.BatchPriceRequest(items=items))
+
+@pytest.mark.parametrize("qty", [0, -3])
+def test_quotes_refuse_non_positive_quantities(db, make_event, qty):
+    tier_id = make_event().tiers[0].id
+    with pytest.raises(ValueError, match="at least 1"):
+        crud.get_dynamic_prices(db, schemas.BatchPriceRequest(items=[schemas.PriceRequest(tier_id=tier_id, qty=qty)]))
+    with pytest.raises(ValueError, match="at least 1"):
+        crud.get_dynamic_price(db, schemas.PriceRequest(tier_id=tier_id, qty=qty))
+
+def test_batch_refuses_items_together_with_event_id(db, make_event):
+    ev = make_event()
+    batch = schemas.BatchPriceRequest(event_id=ev.id, items=[schemas.PriceRequest(tier_id=ev.tiers[0].id, qty=1)])
+    with pytest.raises(ValueError, match="not both"):
+        crud.get_dynamic_prices(db, batch)
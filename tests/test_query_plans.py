@@ -0,0 +1,97 @@
+# test_query_plans.py
+import re
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, inspect, text
+
+from .. import crud, models, schemas
+from ..database import engine
+
+# Tables that grow with sales; a full SCAN of any of them on a hot path is a missing index
+LARGE_TABLES = ("bookings", "ratings", "tiers", "event_sponsor", "users")
+
+@contextmanager
+def query_plans():
+    # Collects SQLite's EXPLAIN QUERY PLAN for every SELECT the engine runs while the block runs
+    statements, plans = [], []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield plans
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            plans.append((statement, [row[-1] for row in rows]))
+
+def table_scans(plans):
+    pattern = re.compile(rf"^SCAN ({'|'.join(LARGE_TABLES)})\b(?! USING (COVERING )?INDEX)")
+    return [(statement, line) for statement, lines in plans for line in lines if pattern.match(line)]
+
+def uses_index(plans, index_name):
+    return any(index_name in line for _, lines in plans for line in lines)
+
+@pytest.fixture
+def booked_event(db, make_event):
+    sponsor = crud.create_sponsor(db, schemas.SponsorCreate(name="Acme"))
+    events = [make_event(title=f"Event {i}", tiers=(("GA", 80.0, 100), ("VIP", 200.0, 20)), sponsor_ids=[sponsor.id])
+              for i in range(5)]
+    bookings = [
+        crud.book_ticket(db, schemas.BookingCreate(user_phone=f"90000000{i:02d}", event_id=ev.id, tier_id=ev.tiers[0].id, qty=1))
+        for i, ev in enumerate(events * 4)
+    ]
+    return events[0], bookings[0]
+
+def test_event_booking_page_searches_by_event(db, booked_event):
+    ev, _ = booked_event
+    with query_plans() as plans:
+        crud.get_bookings_for_event(db, ev.id, limit=2)
+    assert table_scans(plans) == []
+    assert uses_index(plans, "ix_bookings_event_id_id")
+
+def test_rating_lookups_use_indexes(db, booked_event):
+    ev, booking = booked_event
+    with query_plans() as plans:
+        crud.create_event_rating(db, ev.id, schemas.RatingCreate(user_phone=booking.user_phone, rating=4))
+    assert table_scans(plans) == []
+    assert uses_index(plans, "ix_bookings_user_id_event_id")
+    assert uses_index(plans, "uq_ratings_event_id_user_id")
+
+def test_event_listing_loads_tiers_and_sponsors_by_index(db, booked_event):
+    with query_plans() as plans:
+        crud.list_events(db, limit=3)
+    assert table_scans(plans) == []
+    assert uses_index(plans, "ix_tiers_event_id")
+    assert uses_index(plans, "uq_event_sponsor_event_id_sponsor_id")
+
+def test_ticket_verification_searches_by_ticket_hash(db, booked_event):
+    _, booking = booked_event
+    with query_plans() as plans:
+        assert crud.verify_ticket(db, booking.ticket_hash) is not None
+    assert table_scans(plans) == []
+
+def test_ledger_recovery_reads_only_pending_bookings(db, booked_event):
+    with query_plans() as plans:
+        crud.recover_pending_ledger_entries(db)
+    assert table_scans(plans) == []
+    assert uses_index(plans, "ix_bookings_ledger_pending")
+
+def test_migration_removes_duplicate_sponsor_links_before_indexing(db, make_event):
+    sponsor = crud.create_sponsor(db, schemas.SponsorCreate(name="Acme"))
+    ev = make_event(sponsor_ids=[sponsor.id])
+    links = models.event_sponsor_association
+    # A database from before the unique index could hold the same link several times
+    db.execute(text("DROP INDEX uq_event_sponsor_event_id_sponsor_id"))
+    db.execute(links.insert(), [{"event_id": ev.id, "sponsor_id": sponsor.id}] * 2)
+    db.commit()
+
+    created = crud.create_missing_indexes(db)
+    assert "uq_event_sponsor_event_id_sponsor_id" in created
+    assert db.execute(links.select()).all() == [(ev.id, sponsor.id)]
+    assert "uq_event_sponsor_event_id_sponsor_id" in {index["name"] for index in inspect(engine).get_indexes("event_sponsor")}
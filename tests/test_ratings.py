@@ -0,0 +1,48 @@
+# test_ratings.py
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from .. import crud, models, schemas
+
+@pytest.fixture
+def booked(db, make_event):
+    ev = make_event()
+    crud.book_ticket(db, schemas.BookingCreate(user_phone="9000000001", event_id=ev.id, tier_id=ev.tiers[0].id, qty=1))
+    return ev
+
+def test_rating_again_updates_the_existing_rating(db, booked):
+    crud.create_event_rating(db, booked.id, schemas.RatingCreate(user_phone="9000000001", rating=2))
+    updated = crud.create_event_rating(db, booked.id, schemas.RatingCreate(user_phone="9000000001", rating=5))
+    assert updated.rating == 5
+    assert db.query(models.Rating).count() == 1
+
+def test_rating_insert_race_retries_once_as_an_update(db, booked, monkeypatch):
+    # The first commit loses to a concurrent insert of the same rating; the retry must update it
+    real_commit, calls = db.commit, []
+
+    def racing_commit():
+        calls.append(1)
+        if len(calls) == 1:
+            db.rollback()
+            user = db.query(models.User).filter(models.User.phone == "9000000001").one()
+            db.add(models.Rating(event_id=booked.id, user_id=user.id, rating=1))
+            real_commit()
+            raise IntegrityError("INSERT INTO ratings", {}, Exception("UNIQUE constraint failed"))
+        real_commit()
+
+    monkeypatch.setattr(db, "commit", racing_commit)
+    rating = crud.create_event_rating(db, booked.id, schemas.RatingCreate(user_phone="9000000001", rating=4))
+    assert rating.rating == 4
+    assert db.query(models.Rating).count() == 1
+
+def test_rating_integrity_error_that_persists_is_raised(db, booked, monkeypatch):
+    attempts = []
+
+    def failing_commit():
+        attempts.append(1)
+        raise IntegrityError("INSERT INTO ratings", {}, Exception("constraint failed"))
+
+    monkeypatch.setattr(db, "commit", failing_commit)
+    with pytest.raises(IntegrityError):
+        crud.create_event_rating(db, booked.id, schemas.RatingCreate(user_phone="9000000001", rating=4))
+    assert len(attempts) == 2
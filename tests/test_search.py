@@ -0,0 +1,33 @@
+# test_search.py
+import pytest
+from sqlalchemy import text
+
+from .. import crud, search
+
+@pytest.fixture
+def fresh_index(db):
+    # Other tests run on the LIKE fallback, so the FTS table only lives for the test
+    def reset():
+        db.execute(text(f"DROP TABLE IF EXISTS {search.SEARCH_TABLE}"))
+        db.commit()
+        search._backends.pop(str(db.get_bind().url), None)
+
+    reset()
+    yield
+    reset()
+
+def test_index_created_by_another_worker_is_not_mistaken_for_missing_fts5(db, fresh_index, make_event):
+    make_event(title="Harbour Lights")
+    assert search.ensure_search_index(db)
+    # A second worker that checked before the table existed creates it again
+    search._backends[str(db.get_bind().url)] = None
+    assert search.ensure_search_index(db)
+    assert search.search_backend(db) == "fts5"
+    assert [ev["title"] for ev in crud.search_events(db, q="harbour")["items"]] == ["Harbour Lights"]
+
+def test_sqlite_without_fts5_falls_back_to_like(db, fresh_index, make_event, monkeypatch):
+    monkeypatch.setattr(search, "sqlite_has_fts5", lambda session: False)
+    make_event(title="Harbour Lights")
+    assert not search.ensure_search_index(db)
+    assert search.search_backend(db) is None
+    assert [ev["title"] for ev in crud.search_events(db, q="harbour")["items"]] == ["Harbour Lights"]
@@ -0,0 +1,62 @@
+# test_stats.py
+from sqlalchemy import insert
+
+from .. import crud, models, schemas
+
+def book(db, ev, phone):
+    return crud.book_ticket(db, schemas.BookingCreate(user_phone=phone, event_id=ev.id, tier_id=ev.tiers[0].id, qty=1))
+
+def stats(db, event_id):
+    db.expire_all()
+    row = db.get(models.EventStats, event_id)
+    return row and (row.total_collection, row.booking_count, row.rating_sum, row.rating_count)
+
+def rate(db, ev, phone, rating):
+    crud.create_event_rating(db, ev.id, schemas.RatingCreate(user_phone=phone, rating=rating))
+
+def test_rating_update_changes_the_sum_by_the_difference(db, make_event):
+    ev = make_event()
+    for phone in ("9000000001", "9000000002"):
+        book(db, ev, phone)
+    rate(db, ev, "9000000001", 2)
+    rate(db, ev, "9000000002", 4)
+    rate(db, ev, "9000000001", 5)
+    assert stats(db, ev.id)[2:] == (9, 2)
+
+def test_missing_stats_row_is_seeded_from_bookings_and_ratings(db, make_event):
+    # An event from before the event_stats table existed
+    ev = make_event()
+    first = book(db, ev, "9000000001")
+    rate(db, ev, "9000000001", 4)
+    db.query(models.EventStats).delete()
+    db.commit()
+
+    second = book(db, ev, "9000000002")
+    assert stats(db, ev.id) == (first.price_paid + second.price_paid, 2, 4, 1)
+    rate(db, ev, "9000000001", 2)
+    assert stats(db, ev.id)[2:] == (2, 1)
+
+def test_stats_seeded_by_a_concurrent_writer_still_get_the_delta(db, make_event, monkeypatch):
+    ev = make_event()
+    db.query(models.EventStats).delete()
+    db.commit()
+    real_flush = db.flush
+
+    def flush_after_other_writer(*args, **kwargs):
+        # The other writer's row was computed before this booking existed
+        db.execute(insert(models.EventStats).values(event_id=ev.id, total_collection=0.0, booking_count=0, rating_sum=0, rating_count=0))
+        monkeypatch.setattr(db, "flush", real_flush)
+        real_flush(*args, **kwargs)
+
+    monkeypatch.setattr(db, "flush", flush_after_other_writer)
+    booking = book(db, ev, "9000000001")
+    assert stats(db, ev.id) == (booking.price_paid, 1, 0, 0)
+
+def test_migration_seeds_only_events_without_stats(db, make_event):
+    seeded, missing = make_event(title="Seeded"), make_event(title="Missing")
+    book(db, missing, "9000000001")
+    db.query(models.EventStats).filter(models.EventStats.event_id == missing.id).delete()
+    db.commit()
+    assert crud.seed_missing_event_stats(db) == 1
+    assert stats(db, missing.id)[1] == 1
+    assert stats(db, seeded.id) == (0.0, 0, 0, 0)
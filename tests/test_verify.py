@@ -0,0 +1,78 @@
+# test_verify.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from .. import async_crud, crud, schemas
+from ..database import AsyncSessionLocal, SessionLocal
+from .conftest import count_statements
+
+@pytest.fixture
+def tickets(db, make_event):
+    # Two events with one written ticket each
+    events = [make_event(title="Main Stage"), make_event(title="Side Stage")]
+    hashes = []
+    for i, ev in enumerate(events):
+        booking = crud.book_ticket(db, schemas.BookingCreate(user_phone=f"900000000{i}", event_id=ev.id, tier_id=ev.tiers[0].id, qty=2))
+        hashes.append(booking.ticket_hash)
+    return events, hashes
+
+def scan(db, ticket_hashes, event_id=None):
+    batch = schemas.BatchVerifyRequest(ticket_hashes=ticket_hashes, event_id=event_id)
+    return crud.verify_and_mark_tickets(db, batch)
+
+def test_batch_statuses(db, tickets):
+    (main, side), (main_ticket, side_ticket) = tickets
+    response = scan(db, [main_ticket, "no-such-ticket", main_ticket, side_ticket], event_id=main.id)
+    assert [(r.status, r.ledger_verified) for r in response.results] == [
+        ("admitted", True), ("not_found", False), ("duplicate", False), ("wrong_event", True)
+    ]
+    assert response.admitted == 1
+    assert response.results[0].qty == 2 and response.results[0].user_phone == "9000000000"
+
+    # The ticket for the other event was not marked and still gets in at its own gate
+    again = scan(db, [main_ticket, side_ticket], event_id=side.id)
+    assert [r.status for r in again.results] == ["wrong_event", "admitted"]
+    assert [r.status for r in scan(db, [main_ticket, side_ticket]).results] == ["already_used", "already_used"]
+
+def test_unknown_tickets_skip_the_update(db, tickets):
+    with count_statements() as statements:
+        response = scan(db, ["no-such-ticket"])
+    assert [r.status for r in response.results] == ["not_found"]
+    assert not any(s.lstrip().upper().startswith("UPDATE") for s in statements)
+
+def test_concurrent_scans_admit_a_ticket_once(db, tickets):
+    _, (main_ticket, _) = tickets
+
+    def scan_at_gate(_):
+        session = SessionLocal()
+        try:
+            return scan(session, [main_ticket]).admitted
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert sum(pool.map(scan_at_gate, range(8))) == 1
+
+def test_async_batch_reads_the_ledger_off_the_event_loop(db, tickets, monkeypatch):
+    _, (main_ticket, side_ticket) = tickets
+    real_lookup, threads = crud.lookup_ticket, []
+
+    def lookup(event_id, ticket_hash):
+        threads.append(threading.current_thread())
+        return real_lookup(event_id, ticket_hash)
+
+    monkeypatch.setattr(crud, "lookup_ticket", lookup)
+
+    async def run():
+        async with AsyncSessionLocal() as session:
+            batch = schemas.BatchVerifyRequest(ticket_hashes=[main_ticket, side_ticket, "no-such-ticket"])
+            return await async_crud.verify_and_mark_tickets(session, batch), threading.current_thread()
+
+    response, loop_thread = asyncio.run(run())
+    assert [(r.status, r.ledger_verified) for r in response.results] == [
+        ("admitted", True), ("admitted", True), ("not_found", False)
+    ]
+    assert len(threads) == 2 and loop_thread not in threads
@@ -1,8 +1,36 @@
 # utils.py
-import hashlib, secrets
+import base64, hashlib, json, secrets
 
 def gen_ticket_hash(user_email: str, event_id: int, timestamp: str, nonce: str = None) -> str:
     nonce = nonce or secrets.token_hex(8)
     raw = f"{user_email}|{event_id}|{timestamp}|{nonce}"
     return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
+
+def gen_hold_token() -> str:
+    return secrets.token_urlsafe(24)
+
+def encode_cursor(last_id: int, **sort_keys) -> str:
+    # sort_keys carries the other ordering columns of the last row when pages are not ordered by id alone
+    raw = json.dumps({"id": last_id, **sort_keys}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _load_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+    if not isinstance(data, dict) or not isinstance(data.get("id"), int):
+        raise ValueError("Invalid pagination cursor")
+    return data
+
+def decode_cursor(cursor: str) -> int:
+    return _load_cursor(cursor)["id"]
+
+def decode_sort_cursor(cursor: str, key: str):
+    # Returns (sort key value, id) for a cursor made by encode_cursor(last_id, **{key: value})
+    data = _load_cursor(cursor)
+    if key not in data:
+        raise ValueError("Invalid pagination cursor")
+    return data[key], data["id"]